@@ -0,0 +1,119 @@
+"""
+Batch mode
+==========
+
+Runs `contacts` and `notes` commands from a file or a pipe, one per line,
+through the same controllers as the prompt, without the prompt itself or the
+intro:
+
+    python main.py --batch cleanup.cmds
+    grep -v birthday cleanup.cmds | python main.py
+
+Blank lines and lines starting with `#` are skipped. Nothing is asked: a
+command that would need input fails instead, and the batch stops at the
+first command that fails or shows an error, with exit code 1. The changes
+are synced to disk once, when the batch ends. While a daemon (`daemon.py`)
+serves the books, the commands are sent to it instead. How long every
+command took is reported on stderr, stdout is left to the command output.
+"""
+
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from typing import Callable, TextIO
+
+from client import SOCKET_FILE, DaemonNotRunning, is_running, send
+from contacts import cntcts_controller
+from context import data_cxt_mngr
+from exceptions import CommandFailed
+from notes import notes_controller
+from output import output_error, output_format
+from output.output import error_count
+from utils.session import set_interactive
+
+
+def run_batch(
+    commands: TextIO,
+    storage="file",
+    report: TextIO | None = sys.stderr,
+    socket_file: str | Path = SOCKET_FILE,
+) -> int:
+    """
+    Runs the commands, returns the exit code: 0 if all of them succeeded.
+    The timings are written to `report`, unless it's None.
+    """
+    if is_running(socket_file):
+        # The daemon holds the books, whatever is written next to it would
+        # be overwritten by its next save
+        timings, failed = run_lines(commands, partial(send_command, socket_file))
+    else:
+        set_interactive(False)
+        try:
+            timings, failed = run_commands(commands, storage)
+        finally:
+            set_interactive(True)
+    if report is not None:
+        print_timings(timings, failed, report)
+    return 1 if failed else 0
+
+
+def run_commands(commands: TextIO, storage: str) -> tuple[list, bool]:
+    with data_cxt_mngr(storage=storage, deferred=True) as (book, notes, _):
+        controllers = make_controllers(book, notes)
+        return run_lines(commands, partial(run_command, controllers))
+
+
+def run_lines(commands: TextIO, run: Callable[[str], bool]) -> tuple[list, bool]:
+    """Runs the lines until one fails, returns their timings and whether one did."""
+    timings = []
+    failed = False
+    for number, line in enumerate(commands, start=1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        start = time.perf_counter()
+        failed = not run(line)
+        timings.append((number, time.perf_counter() - start, line.strip()))
+        if failed:
+            break
+    return timings, failed
+
+
+def send_command(socket_file: str | Path, line: str) -> bool:
+    """Runs one command line by the daemon, False if it failed."""
+    try:
+        answer = send(line.strip(), output_format(), socket_file)
+    except DaemonNotRunning:
+        output_error("The daemon stopped, the remaining commands were not run.")
+        return False
+    sys.stdout.write(answer["output"])
+    sys.stderr.write(answer["errors"])
+    return answer["ok"]
+
+
+def make_controllers(book, notes) -> dict[str, Callable]:
+    return {"contacts": cntcts_controller(book), "notes": notes_controller(notes)}
+
+
+def run_command(controllers: dict[str, Callable], line: str) -> bool:
+    """Runs one command line, False if it failed or showed an error."""
+    # Same parsing as the prompt
+    command, *args = line.strip().lower().split()
+    errors = error_count()
+    try:
+        if command in controllers:
+            controllers[command](*args or ["all"])
+        else:
+            output_error(f"Unknown command: {command}")
+    except CommandFailed:
+        return False
+    return error_count() == errors
+
+
+def print_timings(timings: list[tuple[int, float, str]], failed: bool, report: TextIO):
+    report.write(f"{'line':>6} {'seconds':>9}  command\n")
+    for number, seconds, line in timings:
+        report.write(f"{number:>6} {seconds:>9.4f}  {line}\n")
+    total = sum(seconds for _, seconds, _ in timings)
+    status = f"stopped at line {timings[-1][0]}" if failed else "ok"
+    report.write(f"{'total':>6} {total:>9.4f}  {len(timings)} commands, {status}\n")
@@ -0,0 +1,11 @@
+"""
+Benchmarks
+==========
+
+Standalone timing scripts for large books, run them from the `src` folder:
+
+    python -m benchmarks.bench_snapshot 100000
+"""
+
+# `common` and `contacts` import each other, the app always loads contacts first
+import contacts  # noqa: F401, E402
@@ -0,0 +1,74 @@
+"""
+Name lookups and phone/email ownership checks: full scan vs the book index.
+
+    python -m benchmarks.bench_lookup [contacts] [lookups]
+"""
+
+import sys
+import time
+
+from .fixtures import make_book
+
+
+def scan_name(book, name: str):
+    """How `find` worked before the index."""
+    normalized = " ".join(name.lower().split())
+    for record in book.data.values():
+        if " ".join(str(record.name).lower().split()) == normalized:
+            return record
+    return None
+
+
+def scan_phone(book, phone: str) -> bool:
+    """How `is_phone_owned` worked before the index."""
+    all_phones = [
+        phone.value for record in book.data.values() for phone in record.phones
+    ]
+    return phone in all_phones
+
+
+def scan_email(book, email: str) -> bool:
+    all_emails = [
+        email.value for record in book.data.values() for email in record.emails
+    ]
+    return email in all_emails
+
+
+def per_call(func, values: list[str]) -> float:
+    start = time.perf_counter()
+    for value in values:
+        func(value)
+    return (time.perf_counter() - start) / len(values)
+
+
+def main(size: int = 100_000, lookups: int = 20):
+    book = make_book(size)
+    # Half hits, half misses
+    phones = [f"067{i * 7919 % size:07d}" for i in range(lookups // 2)]
+    phones += [f"099{i:07d}" for i in range(lookups - len(phones))]
+    emails = [f"contact{i * 2}@example.com" for i in range(lookups // 2)]
+    emails += [f"nobody{i}@example.com" for i in range(lookups - len(emails))]
+    names = [f"Contact {i * 7919 % size}" for i in range(lookups // 2)]
+    names += [f"Nobody {i}" for i in range(lookups - len(names))]
+
+    start = time.perf_counter()
+    for index in (book.index.names, book.index.phones, book.index.emails):
+        index.build()
+    build_time = time.perf_counter() - start
+    assert all(book.is_phone_owned(phone) for phone in phones[: lookups // 2])
+
+    print(f"{size} contacts, {lookups} lookups, index built in {build_time:.3f}s")
+    print(f"{'':8}{'scan, ms':>12}{'index, us':>12}")
+    for name, scan, indexed, values in (
+        ("name", scan_name, book.find, names),
+        ("phone", scan_phone, book.is_phone_owned, phones),
+        ("email", scan_email, book.is_email_owned, emails),
+    ):
+        scan_time = per_call(lambda value: scan(book, value), values)
+        index_time = per_call(indexed, values * 1000)
+        print(f"{name:8}{scan_time * 1e3:>12.2f}{index_time * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,47 @@
+"""
+Memory of the domain model: bytes per contact and per note.
+
+    python -m benchmarks.bench_memory [contacts] [notes]
+
+At 1M fixture contacts (the book dict and keys included) the model took
+1022 B per contact with a __dict__ per object, and 818 B slotted.
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from .fixtures import make_book, make_notes
+
+# Bytes per fixture contact the slotted model has to stay under
+TARGET = 850
+
+
+def traced(func, *args) -> tuple[object, int]:
+    """Result of the call and the memory it still holds."""
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main(size: int = 1_000_000, notes_size: int = 100_000):
+    book, book_size = traced(make_book, size)
+    objects = sum(1 for _ in gc.get_objects())
+    notes, notes_size_bytes = traced(make_notes, notes_size)
+
+    print(f"{size} contacts: {book_size / 2**20:.1f} MB, {book_size / size:.0f} B each")
+    print(
+        f"{notes_size} notes: {notes_size_bytes / 2**20:.1f} MB, "
+        f"{notes_size_bytes / notes_size:.0f} B each"
+    )
+    print(f"gc-tracked objects with the contacts loaded: {objects}")
+    verdict = "ok" if book_size / size <= TARGET else "OVER"
+    print(f"target {TARGET} B per contact: {verdict}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,68 @@
+"""
+Notes search: joining and lower-casing every note vs the full-text index,
+and the BM25 top 10 of a selective and of a match-everything query.
+
+    python -m benchmarks.bench_notes [notes] [searches]
+"""
+
+import sys
+import time
+
+from .fixtures import make_notes
+
+
+def scan(notes, query: str) -> dict:
+    """How `find_notes_by_query` worked before the index."""
+    query = query.lower()
+    return {
+        id: note
+        for id, note in notes.data.items()
+        if query
+        in " ".join(
+            [
+                note.title._value,
+                note.context._value,
+                " ".join(tag._value for tag in note.tags),
+            ]
+        ).lower()
+    }
+
+
+def per_call(func, values: list[str]) -> float:
+    start = time.perf_counter()
+    for value in values:
+        func(value)
+    return (time.perf_counter() - start) / len(values)
+
+
+def main(size: int = 100_000, searches: int = 20):
+    notes = make_notes(size)
+    start = time.perf_counter()
+    notes.index.build()
+    build_time = time.perf_counter() - start
+    numbers = [i * 7919 % size for i in range(searches)]
+    assert notes.find_notes_by_query('"number 42"') == scan(notes, "number 42")
+
+    print(f"{size} notes, {searches} searches, index built in {build_time:.3f}s")
+    print(f"{'':12}{'scan, ms':>12}{'index, ms':>12}")
+    for name, query, scanned in (
+        ("terms", "number {}", lambda n: scan(notes, f"number {n}")),
+        ("phrase", '"number {}"', lambda n: scan(notes, f"number {n}")),
+        # Without the index an alternative is one more pass
+        ("or", "{} OR {}1", lambda n: scan(notes, str(n)) | scan(notes, f"{n}1")),
+    ):
+        scan_time = per_call(scanned, numbers)
+        index_time = per_call(
+            notes.find_notes_by_query, [query.format(n, n) for n in numbers]
+        )
+        print(f"{name:12}{scan_time * 1e3:>12.2f}{index_time * 1e3:>12.2f}")
+    for query in ("number {}", "note"):
+        ranked = per_call(
+            notes.rank_notes, [query.format(n) for n in numbers[: searches // 4 or 1]]
+        )
+        print(f"top 10 of {query!r}: {ranked * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,75 @@
+"""
+Contacts table rendering: every column built then popped vs the projected
+renderer, for all columns and for `contacts all name phones`.
+
+    python -m benchmarks.bench_render [rows ...]
+"""
+
+import io
+import sys
+import time
+
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+import output.rich_table as rich_table
+from output import default_contacts_table_fields, display_contacts_table
+
+from .fixtures import make_book
+
+
+def display_all_then_pop(records, user_fields: list = []):
+    """How `display_contacts_table` worked before the columns were projected."""
+    table = Table(
+        title="Contacts",
+        show_lines=False,
+        header_style="bold white",
+        row_styles=["on black", "on grey11"],
+        box=box.ROUNDED,
+    )
+    table.add_column("Name", style="bold cyan", max_width=12)
+    table.add_column("Phones", style="green", max_width=12)
+    table.add_column("Birthday", style="magenta", max_width=12)
+    table.add_column("Emails", style="yellow", max_width=20)
+    table.add_column("Address", style="yellow", max_width=25)
+    table.add_column("Tags", style="red", max_width=12)
+    table.add_column("Photo", style="red", max_width=15)
+    for record in records:
+        table.add_row(
+            str(record.name).capitalize(),
+            " ".join([p.value for p in record.phones]) if record.phones else "—",
+            str(record.birthday) if record.birthday else "—",
+            ", ".join([e.value for e in record.emails]) if record.emails else "—",
+            str(record.address) if record.address else "—",
+            ", ".join([str(tag) for tag in record.tags]) if record.tags else "—",
+            f"📷 {record.photo.value}" if record.photo else "—",
+        )
+    if user_fields:
+        for index in reversed(range(len(default_contacts_table_fields))):
+            if default_contacts_table_fields[index] not in user_fields:
+                table.columns.pop(index)
+    rich_table.console.print(table)
+
+
+def timed(func, *args) -> float:
+    rich_table.console = Console(file=io.StringIO(), width=160)
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes: list[int]):
+    book = make_book(max(sizes))
+    records = list(book.data.values())
+    print(f"{'rows':>7} {'columns':<12} {'all + pop':>10} {'projected':>10}")
+    for size in sizes:
+        rows = records[:size]
+        for label, fields in (("all", []), ("name phones", ["Name", "Phones"])):
+            before = timed(display_all_then_pop, rows, fields)
+            after = timed(display_contacts_table, rows, fields)
+            print(f"{size:>7} {label:<12} {before:9.2f}s {after:9.2f}s")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
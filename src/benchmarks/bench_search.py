@@ -0,0 +1,72 @@
+"""
+Contact search: per-record partial_ratio vs the ranked corpus search, and
+regex search with and without the trigram index.
+
+    python -m benchmarks.bench_search [contacts] [query] [regex]
+"""
+
+import re
+import sys
+import time
+
+from rapidfuzz import fuzz
+
+from contacts import PhoneBookService
+from contacts.indexes import search_text
+
+from .fixtures import make_book
+
+
+def scan(book, query: str) -> list:
+    """How fuzzy `find_contacts` worked before the cached corpus."""
+    query = query.lower()
+    return [
+        record
+        for record in book.data.values()
+        if fuzz.partial_ratio(query, search_text(record)) > 75
+    ]
+
+
+def scan_regex(book, pattern: str) -> list:
+    """Regex search verifying every record."""
+    pattern = re.compile(pattern, re.IGNORECASE)
+    corpus = book.search_corpus()
+    return [key for key, text in corpus.items() if pattern.search(text)]
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(
+    size: int = 500_000, query: str = "contakt 4242", regex: str = r"contact42\d+@"
+):
+    book = make_book(size)
+    service = PhoneBookService(book)
+
+    scanned, scan_time = timed(scan, book, query)
+    _, corpus_time = timed(book.search_corpus)
+    top, search_time = timed(service.find_contacts, query, mode="fuzzy", limit=10)
+    _, all_time = timed(service.find_contacts, query, mode="fuzzy")
+    regex_scanned, regex_scan_time = timed(scan_regex, book, regex)
+    _, trigrams_time = timed(book.index.trigrams.build)
+    found, regex_time = timed(service.find_contacts, regex, mode="regex")
+    assert len(found) == len(regex_scanned)
+
+    print(f"{size} contacts, query {query!r}, {len(scanned)} matches")
+    print(f"per-record scan      {scan_time:8.3f}s")
+    print(f"corpus build (once)  {corpus_time:8.3f}s")
+    print(f"ranked, top 10       {search_time:8.3f}s")
+    print(f"ranked, all matches  {all_time:8.3f}s")
+    print("best:", ", ".join(str(record.name) for record in top))
+    print(f"regex {regex!r}, {len(found)} matches")
+    print(f"verify every record  {regex_scan_time:8.3f}s")
+    print(f"trigram build (once) {trigrams_time:8.3f}s")
+    print(f"trigram candidates   {regex_time:8.3f}s")
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    main(size, *sys.argv[2:4])
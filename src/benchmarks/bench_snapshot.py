@@ -0,0 +1,57 @@
+"""
+Pickle vs binary snapshot: save/load time and file size.
+
+    python -m benchmarks.bench_snapshot [contacts]
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from storage.snapshot import dump_books, load_books
+
+from .fixtures import make_book, make_notes
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(size: int = 100_000):
+    book = make_book(size)
+    notes = make_notes(size // 10)
+
+    with tempfile.TemporaryDirectory() as folder:
+        pickled = os.path.join(folder, "books.pkl")
+        snapshot = os.path.join(folder, "books.snapshot")
+
+        def pickle_save():
+            with open(pickled, "wb") as file:
+                pickle.dump((book, notes), file)
+
+        def pickle_load():
+            with open(pickled, "rb") as file:
+                return pickle.load(file)
+
+        _, pickle_save_time = timed(pickle_save)
+        _, pickle_load_time = timed(pickle_load)
+        _, snapshot_save_time = timed(dump_books, book, notes, snapshot)
+        (loaded, _), snapshot_load_time = timed(load_books, snapshot)
+        assert len(loaded.data) == size
+
+        print(f"{size} contacts, {size // 10} notes")
+        print(f"{'':10}{'save, s':>10}{'load, s':>10}{'size, KB':>12}")
+        for name, save_time, load_time, path in (
+            ("pickle", pickle_save_time, pickle_load_time, pickled),
+            ("snapshot", snapshot_save_time, snapshot_load_time, snapshot),
+        ):
+            size_kb = os.path.getsize(path) / 1024
+            print(f"{name:10}{save_time:>10.3f}{load_time:>10.3f}{size_kb:>12.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,78 @@
+"""
+Startup: the cold `import controller` and the time until the first prompt
+of `main.py --fast`, each in a fresh interpreter started in an empty
+directory (empty books, nothing read from or written to `src/data`). Also
+lists the heavy modules that got loaded before the prompt, there should be
+none.
+
+    python -m benchmarks.bench_startup [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent
+# Loaded by the commands that need them, never before the first prompt
+HEAVY_MODULES = (
+    "rapidfuzz",
+    "output.help_",
+    "tests.test_contacts",
+    "unittest",
+    "utils.export_import",
+)
+
+# Stops at the first prompt instead of waiting for input
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import controller
+imported = time.perf_counter() - start
+
+def first_prompt(*args, **kwargs):
+    print(json.dumps({{
+        "import": imported,
+        "prompt": time.perf_counter() - start,
+        "heavy": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+    }}), file=sys.stderr)
+    raise EOFError
+
+controller.prompt = first_prompt
+controller.bootstrap(fast=True)
+"""
+
+
+def measure() -> dict:
+    """Seconds to import the controller and to reach the prompt, one run."""
+    env = dict(os.environ, PYTHONPATH=str(SRC), PYTHONDONTWRITEBYTECODE="1")
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=directory,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    # The probe's line is the last one, the app may log before it
+    return json.loads(result.stderr.strip().splitlines()[-1])
+
+
+def main(runs: int):
+    results = [measure() for _ in range(runs)]
+    for label in ("import", "prompt"):
+        times = [result[label] for result in results]
+        print(
+            f"{label:<7} median {statistics.median(times):.3f}s"
+            f"  min {min(times):.3f}s  max {max(times):.3f}s"
+        )
+    heavy = sorted({name for result in results for name in result["heavy"]})
+    print(f"heavy modules before the prompt: {', '.join(heavy) or 'none'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,54 @@
+"""
+Memory of tag assignments: a Tag object per assignment vs interned Tags.
+
+    python -m benchmarks.bench_tags [assignments]
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from common import Tag
+
+from .fixtures import TAGS
+
+
+class PlainTag:
+    """How Tag was stored before interning: one object per assignment."""
+
+    def __init__(self, value: str):
+        self._value = value.lower().strip()
+
+
+def assign(tag_class, assignments: int, seed: int = 42) -> tuple[list, int, float]:
+    """Tag lists of 4 tags each, as records and notes hold them."""
+    rng = random.Random(seed)
+    values = [rng.choice(TAGS) for _ in range(assignments)]
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tags = [
+        [tag_class(value) for value in values[i : i + 4]]
+        for i in range(0, assignments, 4)
+    ]
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tags, size, elapsed
+
+
+def main(assignments: int = 1_000_000):
+    _, plain_size, plain_time = assign(PlainTag, assignments)
+    tags, interned_size, interned_time = assign(Tag, assignments)
+    distinct = len({id(tag) for group in tags for tag in group})
+
+    print(f"{assignments} tag assignments, {distinct} distinct Tag objects")
+    print(f"{'':10}{'MB':>10}{'build, s':>10}")
+    print(f"{'per tag':10}{plain_size / 2**20:>10.1f}{plain_time:>10.3f}")
+    print(f"{'interned':10}{interned_size / 2**20:>10.1f}{interned_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,49 @@
+import io
+import random
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+
+from common import Tag
+from contacts import ContactsBook, Record
+from notes import Note, Notes
+
+TAGS = ["work", "family", "friends", "gym", "school", "vip", "neighbours", "club"]
+
+
+def make_record(i: int, rng: random.Random) -> Record:
+    record = Record(f"Contact {i}")
+    record.add_phone(f"067{i:07d}")
+    if i % 3 == 0:
+        record.add_phone(f"050{i:07d}")
+    if i % 2 == 0:
+        record.add_email(f"contact{i}@example.com")
+    if i % 4 == 0:
+        record.add_address(f"{i} Main street, Kyiv")
+    if i % 5 != 0:
+        birthday = date(1970, 1, 1) + timedelta(days=rng.randrange(365 * 40))
+        record.add_birthday(birthday.strftime("%d.%m.%Y"))
+    for tag in rng.sample(TAGS, i % 3):
+        record.add_tag(Tag(tag))
+    return record
+
+
+def make_book(size: int, seed: int = 42) -> ContactsBook:
+    """Builds a book directly, without the debug output of add_record."""
+    rng = random.Random(seed)
+    book = ContactsBook()
+    for i in range(size):
+        record = make_record(i, rng)
+        book.data[str(record.name).lower()] = record
+    return book
+
+
+def make_notes(size: int, seed: int = 42) -> Notes:
+    rng = random.Random(seed)
+    notes = Notes()
+    # Note() echoes its context while looking for #tags
+    with redirect_stdout(io.StringIO()):
+        for i in range(size):
+            note = Note(title=f"Note {i}", context=f"Text of the note number {i}")
+            note.tags = [Tag(tag) for tag in rng.sample(TAGS, i % 3)]
+            notes.add_note(note)
+    return notes
@@ -0,0 +1,49 @@
+"""
+Books daemon client
+===================
+
+Sends one command to the daemon (`daemon.py`) and gives back its answer.
+Kept to the standard library so a one-shot command costs an interpreter
+start and a round trip, not loading the app and the books.
+
+Usage example:
+
+    send("contacts find ivan", output_format="plain")
+    # {'ok': True, 'output': 'Name | Phones | …', 'errors': ''}
+"""
+
+import json
+import socket
+from pathlib import Path
+
+SOCKET_FILE = Path("data/daemon.sock")
+
+
+# Not in `exceptions`: importing that package would load rich
+class DaemonNotRunning(Exception):
+    pass
+
+
+def send(
+    command: str, output_format: str = "rich", socket_file: str | Path = SOCKET_FILE
+) -> dict:
+    """The daemon's answer: `ok`, the `output` and the `errors` of the command."""
+    request = json.dumps({"command": command, "format": output_format})
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(str(socket_file))
+        except (FileNotFoundError, ConnectionRefusedError) as error:
+            # No socket, or one left behind by a daemon that was killed
+            raise DaemonNotRunning(str(socket_file)) from error
+        connection.sendall(request.encode() + b"\n")
+        with connection.makefile("rb") as answer:
+            return json.loads(answer.readline())
+
+
+def is_running(socket_file: str | Path = SOCKET_FILE) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(str(socket_file))
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+    return True
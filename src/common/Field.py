@@ -1,6 +1,16 @@
 class Field:
+    # No per-instance __dict__, subclasses declare their own (empty) __slots__
+    __slots__ = ("_value",)
+
     def __init__(self, value):
         self._value = value
 
     def __str__(self):
         return str(self._value)
+
+    def __getstate__(self):
+        return {"_value": self._value}
+
+    def __setstate__(self, state: dict):
+        # Fields pickled before __slots__ may carry attributes that are gone now
+        self._value = state.get("_value")
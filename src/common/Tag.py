@@ -17,12 +17,49 @@ Usage example:
     contact.add_tag(tag1)
     contact.add_tag(tag2)
     print(contact.list_tags())
+
+Tags are interned flyweights: there's one immutable instance per value, so
+a million tagged records share a handful of Tag objects and equal tags are
+the same object (`Tag("Work") is Tag("work")`). Pickles store just the value
+and are interned again on load.
 """
 
+from weakref import WeakValueDictionary
+
 
 class Tag:
-    def __init__(self, value: str):
-        self._value = value.lower().strip()
+    __slots__ = ("_value", "__weakref__")
+
+    # value -> the only Tag with it, dropped once nothing uses the tag
+    _pool: "WeakValueDictionary[str, Tag]" = WeakValueDictionary()
+
+    def __new__(cls, *args):
+        if not args:
+            # Unpickling a Tag saved before interning, __setstate__ follows
+            return super().__new__(cls)
+        value = args[0].lower().strip()
+        tag = cls._pool.get(value)
+        if tag is None:
+            tag = super().__new__(cls)
+            object.__setattr__(tag, "_value", value)
+            cls._pool[value] = tag
+        return tag
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Tag is immutable, create a new one instead")
+
+    def __reduce__(self):
+        return Tag, (self._value,)
+
+    def __setstate__(self, state: dict):
+        # Legacy pickles, see __new__; Record and Note re-intern their tags
+        object.__setattr__(self, "_value", state["_value"])
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     @property
     def tag(self):
@@ -32,8 +69,11 @@ class Tag:
         return self._value or ""
 
     def __eq__(self, other):
-        if isinstance(other, Tag) and self._value == other._value:
+        if self is other:
             return True
+        if isinstance(other, Tag):
+            # Only legacy, not yet re-interned tags get here
+            return self._value == other._value
         if isinstance(other, str) and self._value == other:
             return True
         return False
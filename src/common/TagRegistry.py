@@ -0,0 +1,110 @@
+"""
+Tag registry shared by contacts and notes
+=========================================
+
+Maps every normalized `Tag` value to the keys of the contacts and the ids of
+the notes tagged with it, so a tag lookup doesn't have to look at every
+record or note. The values are also kept sorted for prefix lookups.
+
+Like the book indexes the registry is never pickled: it's built from the
+attached books on the first lookup and then kept up to date from their
+mutation hooks (`ContactsBook.touch`, `Notes.touch` and friends), which are
+called after every `add_tag`, `edit_tag`, `remove_tag` or `delete_tag`.
+
+Usage example:
+
+    registry = TagRegistry()
+    registry.attach("contacts", book.data)
+    registry.attach("notes", notes.data)
+
+    registry.find("contacts", "Work")  # {'john doe'}  O(1)
+    registry.find_prefix("notes", "wo")  # {'1', '7'}  O(log n + k)
+"""
+
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from typing import Any
+
+
+def normalize_tag(tag) -> str:
+    """Same normalization as `Tag`, works for tags and plain strings."""
+    return str(tag).lower().strip()
+
+
+class TagRegistry:
+    def __init__(self):
+        # What every kind ("contacts", "notes") is built from: key -> item with `tags`
+        self.sources: dict[str, Mapping[str, Any]] = {}
+        # All None until the first lookup
+        self.owners: dict[str, dict[str, set[str]]] | None = None
+        self.tagged: dict[tuple[str, str], tuple[str, ...]] | None = None
+        # Sorted on the first prefix lookup, one sort is cheaper than insorts
+        self.values: list[str] | None = None
+
+    @property
+    def is_built(self) -> bool:
+        return self.owners is not None
+
+    def attach(self, kind: str, data: Mapping[str, Any]):
+        """(Re)attaches the items of one kind, the registry is rebuilt lazily."""
+        self.sources[kind] = data
+        self.owners = self.tagged = self.values = None
+
+    def build(self):
+        self.owners, self.tagged, self.values = {}, {}, None
+        for kind, data in self.sources.items():
+            for key, item in data.items():
+                self.__link(kind, key, item)
+
+    def update(self, kind: str, key: str, item: Any | None):
+        """Re-reads the tags of one item, None if it was deleted."""
+        if self.owners is None:
+            return
+        self.discard(kind, key)
+        if item is not None:
+            self.__link(kind, key, item)
+
+    def discard(self, kind: str, key: str):
+        if self.owners is None:
+            return
+        for value in self.tagged.pop((kind, key), ()):
+            owners = self.owners[value]
+            owners[kind].discard(key)
+            if not owners[kind]:
+                del owners[kind]
+            if not owners:
+                del self.owners[value]
+                if self.values is not None:
+                    del self.values[bisect_left(self.values, value)]
+
+    def find(self, kind: str, tag) -> set[str]:
+        """Keys of the items of the kind having exactly this tag."""
+        if self.owners is None:
+            self.build()
+        return set(self.owners.get(normalize_tag(tag), {}).get(kind, ()))
+
+    def find_prefix(self, kind: str, prefix) -> set[str]:
+        """Keys of the items of the kind having a tag starting with the prefix."""
+        if self.owners is None:
+            self.build()
+        if self.values is None:
+            self.values = sorted(self.owners)
+        prefix = normalize_tag(prefix)
+        found = set()
+        for value in self.values[bisect_left(self.values, prefix) :]:
+            if not value.startswith(prefix):
+                break
+            found.update(self.owners[value].get(kind, ()))
+        return found
+
+    def __link(self, kind: str, key: str, item: Any):
+        values = tuple({normalize_tag(tag) for tag in item.tags})
+        if not values:
+            return
+        self.tagged[(kind, key)] = values
+        for value in values:
+            if value not in self.owners:
+                self.owners[value] = {}
+                if self.values is not None:
+                    insort(self.values, value)
+            self.owners[value].setdefault(kind, set()).add(key)
@@ -9,10 +9,12 @@ from .input_prompts import (
     prompt_remove_details,
 )
 from .Tag import Tag
+from .TagRegistry import TagRegistry
 
 __all__ = [
     "Field",
     "Tag",
+    "TagRegistry",
     "prompt_for_field",
     "prompt_remove_details",
     "is_valid_field",
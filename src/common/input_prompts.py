@@ -1,6 +1,5 @@
 from collections import UserDict
 
-from prompt_toolkit import prompt
 from prompt_toolkit.completion import WordCompleter
 from prompt_toolkit.validation import Validator
 
@@ -12,7 +11,9 @@ from contacts.validators import (
     PhoneValidator,
     TagsValidator,
 )
+from exceptions import CommandFailed
 from output import output_error
+from utils.session import ask
 
 note_field_value_completers = {
     "title": WordCompleter([], ignore_case=True),
@@ -44,11 +45,11 @@ def get_new_note_details():
 def edit_note_prompt(notes: UserDict):
     fields = list(notes.data.keys())
     name_completer = WordCompleter(fields, ignore_case=True)
-    id = prompt("Which note do you want to edit [id]? ", completer=name_completer)
+    id = ask("Which note do you want to edit [id]? ", completer=name_completer)
 
     field_options = ["title", "context", "tags"]
     field_completer = WordCompleter(field_options, ignore_case=True)
-    field = prompt("Which field do you want to edit? ", completer=field_completer)
+    field = ask("Which field do you want to edit? ", completer=field_completer)
 
     
     record = notes.data[id] if id in notes.data.keys() else None
@@ -63,7 +64,7 @@ def edit_note_prompt(notes: UserDict):
 
     print(f"Current value for {field}: {current_value}")
 
-    new_value = prompt("New value: ", validator=get_field_validator(field))
+    new_value = ask("New value: ", validator=get_field_validator(field))
     return id, field, new_value.strip()
 
 
@@ -98,7 +99,7 @@ def is_valid_field(field: str) -> bool:
 # Autofill for fields for long add command
 def prompt_for_field(field: str) -> str:
     completer = field_value_completers.get(field)
-    return prompt(f"{field.capitalize()}: ", completer=completer)
+    return ask(f"{field.capitalize()}: ", completer=completer)
 
 
 # Get enew contact details for autofill purposes to avoid name field autofill
@@ -169,11 +170,11 @@ def get_existing_contact_details(book):
 def edit_contact_prompt(book):
     names = list(book.data.keys())
     name_completer = WordCompleter(names, ignore_case=True)
-    name = prompt("Which contact do you want to edit? ", completer=name_completer)
+    name = ask("Which contact do you want to edit? ", completer=name_completer)
 
     field_options = ["name", "phone", "email", "address", "birthday", "tags"]
     field_completer = WordCompleter(field_options, ignore_case=True)
-    field = prompt("Which field do you want to edit? ", completer=field_completer)
+    field = ask("Which field do you want to edit? ", completer=field_completer)
 
     record = book.find(name)
     if not record:
@@ -186,7 +187,7 @@ def edit_contact_prompt(book):
 
     print(f"Current value for {field}: {current_value}")
 
-    new_value = prompt("New value: ", validator=get_field_validator(field))
+    new_value = ask("New value: ", validator=get_field_validator(field))
     return name, field, new_value.strip()
 
 
@@ -223,7 +224,7 @@ def prompt_missing_args(
     result = provided_args.copy()
     for field in required_fields:
         if field not in result or not result[field]:
-            result[field] = prompt(f"Enter {field}: ")
+            result[field] = ask(f"Enter {field}: ")
     return result
 
 
@@ -234,7 +235,9 @@ def get_name_completer(book):
 def ask_field(label, validator=None, required=True, completer=None):
     while True:
         try:
-            value = prompt(f"{label}: ", completer=completer, validator=validator)
+            value = ask(f"{label}: ", completer=completer, validator=validator)
+        except CommandFailed:
+            raise
         except Exception as e:
             output_error(str(e))
             continue
@@ -267,7 +270,7 @@ def prompt_remove_details(book):
     from contacts.service import PhoneBookService
     from output.rich_table import display_contacts_table
 
-    name = prompt("Which contact do you want to modify? ")
+    name = ask("Which contact do you want to modify? ")
     record = book.find(name)
     book_service = PhoneBookService(book)
     results = book_service.find_contacts(name)
@@ -277,11 +280,11 @@ def prompt_remove_details(book):
         output_error(f"Contact '{name}' not found.")
         return None, None, None
 
-    field = prompt("What do you want to remove? (phone, email, tag, contact): ").lower()
+    field = ask("What do you want to remove? (phone, email, tag, contact): ").lower()
 
     if field == "contact":
         confirm = (
-            prompt(f"Are you sure you want to delete '{name}'? (yes/no): ")
+            ask(f"Are you sure you want to delete '{name}'? (yes/no): ")
             .strip()
             .lower()
         )
@@ -305,7 +308,7 @@ def prompt_remove_details(book):
     for idx, val in enumerate(values, 1):
         print(f"{idx}. {val}")
 
-    raw_input = prompt(f"Which {field} to remove? (number or exact value): ").strip()
+    raw_input = ask(f"Which {field} to remove? (number or exact value): ").strip()
 
     # Handle index selection
     if raw_input.isdigit():
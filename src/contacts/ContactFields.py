@@ -1,16 +1,26 @@
 import os
 import re
+from datetime import date as date_type
 from datetime import datetime as dt
 
 from common import Field
 from exceptions import WrongDateFormat, WrongEmailValue, WrongPhoneNumber
 
+from .validators import canonical_phone
+
 
 class Name(Field):
-    pass
+    __slots__ = ()
 
 
 class Phone(Field):
+    """
+    Kept as the E.164 number in an int (380671234567), so equality, dedup,
+    the ownership lookups and sorting are integer operations whatever the
+    formatting; `value` is the number as it was entered, for display.
+    """
+
+    __slots__ = ("_text",)
     __phone_pattern = re.compile(r"^\+?3?8?(0\d{9})$|^0\d{9}$")
 
     @staticmethod
@@ -20,48 +30,131 @@ class Phone(Field):
     def __init__(self, phone: str):
         self.value = phone
 
+    @classmethod
+    def from_text(cls, text: str) -> "Phone":
+        """Builds an already validated phone, skipping the validation."""
+        phone = cls.__new__(cls)
+        phone.__set(text)
+        return phone
+
     def __str__(self):
-        return self._value or ""
+        return self._text or ""
 
     @property
-    def value(self):
-        return self._value
+    def value(self) -> str:
+        return self._text
 
     @value.setter
-    def value(self, new_phone):
+    def value(self, new_phone: str):
         if not Phone.validate_phone_number(new_phone):
             raise WrongPhoneNumber(f"Wrong phone number {new_phone}.")
-        self._value = new_phone
+        self.__set(new_phone)
+
+    @property
+    def number(self) -> int:
+        return self._value
+
+    def __eq__(self, other):
+        if isinstance(other, Phone):
+            return self._value == other._value
+        if isinstance(other, str):
+            return self._value == canonical_phone(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._value)
+
+    def __getstate__(self):
+        return {"_value": self._value, "_text": self._text}
+
+    def __setstate__(self, state: dict):
+        # Pickled before phones were normalized: the text was the value
+        self.__set(state.get("_text", state.get("_value")))
+
+    def __set(self, text: str):
+        self._text = text
+        self._value = canonical_phone(text)
 
 
 class Birthday(Field):
+    """
+    Kept as a date ordinal with its month and day cached, so birthday queries,
+    sorting and the snapshot never parse it; `value` formats it for display.
+    """
+
+    __slots__ = ("_month", "_day")
     date_format_pattern = r"%d.%m.%Y"
 
     @staticmethod
-    def validate_date(date: str) -> bool:
+    def parse(date: str) -> dt | None:
         try:
-            dt.strptime(date, Birthday.date_format_pattern)
-            return (True) and (
-                dt.strptime(date, Birthday.date_format_pattern) < dt.now()
-            )
-        except ValueError:
-            return False
+            return dt.strptime(date, Birthday.date_format_pattern)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def validate_date(date: str) -> bool:
+        parsed = Birthday.parse(date)
+        return parsed is not None and parsed < dt.now()
 
     def __init__(self, date: str):
         self.value = date
 
+    @classmethod
+    def from_ordinal(cls, ordinal: int) -> "Birthday":
+        """Builds an already validated birthday, skipping the parsing."""
+        birthday = cls.__new__(cls)
+        birthday.__set(ordinal)
+        return birthday
+
     @property
-    def value(self):
-        return self._value
+    def value(self) -> str:
+        day = self.date
+        return f"{day.day:02}.{day.month:02}.{day.year:04}"
 
     @value.setter
     def value(self, date: str):
-        if not Birthday.validate_date(date):
+        parsed = Birthday.parse(date)
+        if parsed is None or parsed >= dt.now():
             raise WrongDateFormat(f"Wrong date format {date}")
-        self._value = date
+        self.__set(parsed.toordinal())
+
+    @property
+    def ordinal(self) -> int:
+        return self._value
+
+    @property
+    def date(self) -> date_type:
+        return date_type.fromordinal(self._value)
+
+    @property
+    def month(self) -> int:
+        return self._month
+
+    @property
+    def day(self) -> int:
+        return self._day
+
+    def __str__(self):
+        return self.value
+
+    def __setstate__(self, state: dict):
+        value = state.get("_value")
+        if isinstance(value, str):
+            # Pickled before birthdays were stored as ordinals
+            value = Birthday.parse(value).toordinal()
+        self.__set(value)
+
+    def __set(self, ordinal: int):
+        day = date_type.fromordinal(ordinal)
+        self._value = ordinal
+        self._month = day.month
+        self._day = day.day
 
 
 class Address(Field):
+    __slots__ = ()
+
     def __init__(self, address: str):
         self.value = address
 
@@ -87,6 +180,7 @@ class Address(Field):
 
 
 class Email(Field):
+    __slots__ = ()
     __email_pattern = re.compile(r"[^@]+@[^@]+\.[^@]+")
 
     def __str__(self):
@@ -116,6 +210,8 @@ class Email(Field):
 
 
 class Photo(Field):
+    __slots__ = ()
+
     def __init__(self, path: str):
         self.value = path
 
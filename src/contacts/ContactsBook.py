@@ -1,5 +1,7 @@
+from calendar import isleap
 from collections import UserDict
 from copy import deepcopy
+from datetime import date
 from datetime import datetime as dtdt
 from datetime import timedelta as td
 from typing import Dict
@@ -7,17 +9,39 @@ from typing import Dict
 from colorama import Fore
 
 from common.Tag import Tag
-from exceptions import RecordNotFound, TagNotFound
+from common.TagRegistry import TagRegistry
+from exceptions import RecordAlreadyExists, RecordNotFound, TagNotFound
+from storage import CONTACTS
 
-from .ContactFields import Birthday
+from .indexes import BookIndex, SortedIndex, normalize_email, normalize_name
 from .Records import Record
+from .undo import UndoHistory
+from .validators import canonical_phone
+
+
+def next_birthday(birthday: date, today: date) -> date:
+    """Nearest celebration day, Feb 29 birthdays fall on Feb 28 in common years."""
+    for year in (today.year, today.year + 1):
+        if (birthday.month, birthday.day) == (2, 29) and not isleap(year):
+            day = date(year, 2, 28)
+        else:
+            day = birthday.replace(year=year)
+        if day >= today:
+            return day
 
 
 class ContactsBook(UserDict):
+    # Write-ahead journal attached by the data context manager (never pickled)
+    journal = None
+    _history = None
+    _index = None
+    # Shared with the notes by the data context manager (never pickled)
+    _tags = None
+
     def __init__(self):
         self.data: Dict[str, Record] = {}
 
-    def add_record(self, record: Record):
+    def add_record(self, record: Record) -> str:
         # self.data[record.name._value] = record
 
         from rich import print  # optional, for pretty output
@@ -28,51 +52,167 @@ class ContactsBook(UserDict):
         print(f"[DEBUG] Tags: {[str(t) for t in record.tags]}")
 
         # Защита: копия объекта, чтобы избежать общих ссылок
-        key = str(record.name._value).lower()
+        key = normalize_name(str(record.name._value))
         self.data[key] = deepcopy(record)
+        self._reindex(key)
+        if self.journal:
+            self.journal.put(CONTACTS, key, self.data[key])
+        return key
+
+    def put_record(self, key: str, record: Record):
+        """Stores the record under the given key as is, used by undo/redo."""
+        self.data[key] = record
+        self._reindex(key)
+        if self.journal:
+            self.journal.put(CONTACTS, key, record)
+
+    @property
+    def history(self) -> UndoHistory:
+        if self._history is None:
+            self._history = UndoHistory()
+        return self._history
+
+    @property
+    def index(self) -> BookIndex:
+        """Lookup indexes, built on first use and kept up to date by the hooks."""
+        if self._index is None:
+            self._index = BookIndex(self.data)
+        return self._index
+
+    @property
+    def tag_registry(self) -> TagRegistry:
+        if self._tags is None:
+            self.tag_registry = TagRegistry()
+        return self._tags
+
+    @tag_registry.setter
+    def tag_registry(self, registry: TagRegistry):
+        registry.attach(CONTACTS, self.data)
+        self._tags = registry
+
+    def _reindex(self, key: str):
+        if self._tags is not None:
+            self._tags.update(CONTACTS, key, self.data.get(key))
+        if self._index is None:
+            return
+        record = self.data.get(key)
+        if record is None:
+            self._index.discard(key)
+        else:
+            self._index.add(key, record)
+
+    def touch(self, record: Record):
+        """Must be called after a record stored in the book was changed in place."""
+        key = self.key_of(record)
+        if key is None:
+            return
+        self._reindex(key)
+        if self.journal:
+            self.journal.put(CONTACTS, key, record)
+
+    def key_of(self, record: Record) -> str | None:
+        for key in self.index.names.find(normalize_name(str(record.name))):
+            if self.data.get(key) is record:
+                return key
+        # The name was changed in place, not through rename()
+        return next((k for k, rec in self.data.items() if rec is record), None)
+
+    def rename(self, record: Record, new_name: str) -> str:
+        """Renames the record and moves it under the key of its new name."""
+        new_key = normalize_name(new_name)
+        owner = self.find(new_name)
+        if owner is not None and owner is not record:
+            raise RecordAlreadyExists(f"Contact '{new_name}' already exists.")
+
+        old_key = self.key_of(record)
+        record.name._value = new_name
+        if old_key is None:
+            return new_key
+        if old_key != new_key:
+            self.delete(old_key)
+        self.put_record(new_key, record)
+        return new_key
+
+    def replace_data(self, data: Dict[str, Record]):
+        self.data = data
+        self._index = None
+        if self._tags is not None:
+            self._tags.attach(CONTACTS, data)
+        if self.journal:
+            self.journal.request_snapshot()
+
+    # Journal replay hooks
+    def restore_entry(self, key: str, record: Record):
+        self.data[key] = record
+        self._reindex(key)
+
+    def discard_entry(self, key: str):
+        self.data.pop(key, None)
+        self._reindex(key)
 
     def find(self, name: str) -> Record | None:
-        normalized = " ".join(name.lower().split())  # strips and collapses spaces
-        for record in self.data.values():
-            if " ".join(str(record.name).lower().split()) == normalized:
-                return record
-        return None
+        keys = self.index.names.find(normalize_name(name))
+        return self.data[keys[0]] if keys else None
+
+    def search_corpus(self) -> dict[str, str]:
+        """Search text of every record by its key, see `contacts.search`."""
+        return self.index.texts.corpus()
+
+    def search_candidates(self, literals: list[str]) -> list[str] | None:
+        """Keys of the records that may contain all literals, None if any may."""
+        return self.index.trigrams.candidates(literals)
+
+    def find_by_phone(self, phone: str) -> Record | None:
+        owners = self.index.phones.find(canonical_phone(phone))
+        return self.data[owners[0]] if owners else None
+
+    def find_by_email(self, email: str) -> Record | None:
+        owners = self.index.emails.find(normalize_email(email))
+        return self.data[owners[0]] if owners else None
+
+    def find_by_tag(self, tag: str, prefix: bool = False) -> set[str]:
+        """Keys of the records tagged with the tag (or a tag starting with it)."""
+        if prefix:
+            return self.tag_registry.find_prefix(CONTACTS, tag)
+        return self.tag_registry.find(CONTACTS, tag)
+
+    def sorted_index(self, field: str) -> SortedIndex:
+        """Keys of the records ordered by the field, see `SORT_KEYS`."""
+        return self.index.sorted[field]
+
+    def sorted_records(
+        self, field: str, reverse: bool = False, limit: int | None = None
+    ) -> list[Record]:
+        """Records ordered by the field (see `SORT_KEYS`), the first `limit`."""
+        keys = self.sorted_index(field).keys(reverse, limit)
+        return [self.data[key] for key in keys]
 
     def is_phone_owned(self, phone: str):
-        all_phones = [
-            phone.value for record in self.data.values() for phone in record.phones
-        ]
-        return bool(phone in all_phones)
+        return bool(self.index.phones.find(canonical_phone(phone)))
 
     def is_email_owned(self, email: str):
-        all_emails = [
-            email.value for record in self.data.values() for email in record.emails
-        ]
-        return bool(email in all_emails)
+        return bool(self.index.emails.find(normalize_email(email)))
 
     def delete(self, name):
         self.data.pop(name)
+        self._reindex(name)
+        if self.journal:
+            self.journal.delete(CONTACTS, name)
 
     def find_next_n_days_bithdays(self, days_to: int = 7) -> list[dict]:
         """
         Функція повернутає список всіх, у кого день народження вперед на days_to днів включаючи поточний день
         (за замовченням - 7 днів).
         """
-        date_format_pattern = Birthday.date_format_pattern
         today = dtdt.today().date()
         congrats_list = []
         # Проходимося по списку та аналізуємо дати народження кожного користувача
-        for name, record in self.data.items():
+        for name, record in self._birthday_candidates(today, days_to):
             if not record.birthday:
                 continue
-            # Перетворюємо формат дати народження зі строки на дату
-            user_birthday = dtdt.strptime(
-                record.birthday.value, date_format_pattern
-            ).date()
-            user_birthday_this_year = user_birthday.replace(year=today.year)
-            # Перевіряємо, чи вже минув день народження в цьому році
-            if user_birthday_this_year < today:
-                user_birthday_this_year = user_birthday.replace(year=today.year + 1)
+            user_birthday = record.birthday.date
+            # Найближчий день народження, якщо цього року вже минув - наступного
+            user_birthday_this_year = next_birthday(user_birthday, today)
             # Визначаємо різницю між днем народження та поточним днем
             days_to_user_birthday_this_year = (
                 user_birthday_this_year.toordinal() - today.toordinal()
@@ -98,11 +238,29 @@ class ContactsBook(UserDict):
                 )
         return congrats_list
 
+    def _birthday_candidates(self, today: date, days_to: int):
+        """Records with a birthday in the window, read from the day buckets."""
+        birthdays = self.index.birthdays
+        seen = set()
+        # A year has at most 366 distinct days, longer windows add nothing
+        for offset in range(min(days_to, 366)):
+            day = today + td(days=offset)
+            buckets = [(day.month, day.day)]
+            if (day.month, day.day) == (2, 28) and not isleap(day.year):
+                buckets.append((2, 29))
+            for bucket in buckets:
+                if bucket in seen:
+                    continue
+                seen.add(bucket)
+                for key in birthdays.find(bucket):
+                    yield key, self.data[key]
+
     # Add tag to contact with exception RecordNotFound raised if no such contact
     def add_tag_to_contact(self, name: str, tag: Tag):
         record = self.get(name)
         if record:
             record.add_tag(tag)
+            self.touch(record)
         else:
             raise RecordNotFound(f"Contact with name '{name}' not found.")
 
@@ -119,8 +277,17 @@ class ContactsBook(UserDict):
         if tag not in record.tags:
             raise TagNotFound(tag.value())
         record.remove_tag(tag)
+        self.touch(record)
 
     def __str__(self):
         if not self.data:
             return "Phone book is empty"
         return "\n".join(str(record) for record in self.data.values())
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("journal", None)
+        state.pop("_history", None)
+        state.pop("_index", None)
+        state.pop("_tags", None)
+        return state
@@ -14,6 +14,8 @@ from .ContactFields import Address, Birthday, Email, Name, Phone, Photo
 
 
 class Record:
+    __slots__ = ("name", "phones", "birthday", "tags", "address", "emails", "photo")
+
     def __init__(
         self,
         name: Name,
@@ -81,7 +83,10 @@ class Record:
             raise ValueError(f"Email {email} not found.")
 
     def add_phone(self, phone: str):
-        self.phones.append(Phone(phone))
+        phone = Phone(phone)
+        # The same number typed another way is still the same phone
+        if phone not in self.phones:
+            self.phones.append(phone)
 
     def edit_phone(self, previous_phone, new_phone):
         found_phone = self.find_phone(previous_phone)
@@ -92,13 +97,19 @@ class Record:
         self.phones.remove(found_phone)
 
     def find_phone(self, phone: str) -> Phone | None:
-        found_phone = next((item for item in self.phones if item.value == phone), None)
+        found_phone = next((item for item in self.phones if item == phone), None)
         return found_phone
 
-    def add_tag(self, tag: Tag):
+    def add_tag(self, tag: Tag | str):
+        if not isinstance(tag, Tag):
+            tag = Tag(tag)
         if tag not in self.tags:
             self.tags.append(tag)
 
+    def replace_tag(self, old_tag: Tag, new_tag: str):
+        """Tags are shared and immutable, so the edited one is swapped for a new."""
+        self.tags[self.tags.index(old_tag)] = Tag(new_tag)
+
     def remove_tag(self, tag: Tag):
         self.tags = [t for t in self.tags if t != tag]
 
@@ -106,7 +117,7 @@ class Record:
         return [str(tag) for tag in self.tags]
 
     def find_tag(self, tag: str) -> Tag | None:
-        found_tag = next((item for item in self.tags if item.value == tag), None)
+        found_tag = next((item for item in self.tags if item == tag), None)
         return found_tag
 
     # Return a list of string-convertible fields for elastic search to function properly
@@ -173,15 +184,19 @@ class Record:
             f"{emails}{tags}{address}{birthday}"
         )
 
-    def __setstate__(self, state):
-        self.__dict__.update(state)
-        if "emails" not in state:
-            self.emails = []
-        if "address" not in state:
-            self.address = None
-        if "birthday" not in state:
-            self.birthday = None
-        if "tags" not in state:
-            self.tags = []
-        if "photo" not in state:
-            self.photo = None
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in Record.__slots__}
+
+    def __setstate__(self, state: dict):
+        # Records pickled by older versions may miss the fields added later
+        self.name = state["name"]
+        self.phones = state.get("phones", [])
+        self.birthday = state.get("birthday")
+        # Tags pickled before interning come back as separate copies
+        self.tags = [
+            Tag(str(tag)) if isinstance(tag, Tag) else tag
+            for tag in state.get("tags", [])
+        ]
+        self.address = state.get("address")
+        self.emails = state.get("emails", [])
+        self.photo = state.get("photo")
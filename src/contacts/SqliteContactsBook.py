@@ -0,0 +1,354 @@
+"""
+ContactsBook stored in SQLite
+=============================
+
+Same interface as `ContactsBook`, but `data` is a mapping over the `contacts`
+table. Records are unpickled on access only, a small identity cache keeps the
+objects the user is working with, so in-place edits followed by
+`book.touch(record)` are written back.
+
+Sorted listings and their pages are read from the `contact_sort` index in
+order, substring and regex searches are narrowed by the trigram FTS5 table
+over `contact_texts`. The fuzzy search still scores the text of every
+contact: it's read from `contact_texts` without unpickling a record, but
+one search holds all the texts in memory while it runs.
+
+Usage example:
+
+    from storage.sqlite import connect
+    book = SqliteContactsBook(connect("books.sqlite3"))
+    book.find("john")
+"""
+
+import pickle
+import sqlite3
+from calendar import isleap
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import timedelta as td
+from typing import Any
+
+from exceptions import RecordNotFound
+from storage import CONTACTS
+from storage.sqlite import get_meta, set_meta
+
+from .ContactsBook import ContactsBook
+from .indexes import SORT_KEYS, normalize_email, normalize_name, search_text
+from .Records import Record
+from .validators import canonical_phone
+
+CACHE_SIZE = 1024
+FETCH_SIZE = 512
+# Bumped when the lookup tables or the way their values are normalized change
+LOOKUP_VERSION = 3
+# The trigram tokenizer can't match anything shorter
+GRAM = 3
+
+
+def birthday_md(record: Record) -> int | None:
+    """Month and day of the birthday packed as MMDD for range queries."""
+    if not record.birthday:
+        return None
+    return record.birthday.month * 100 + record.birthday.day
+
+
+class SqliteRecords(MutableMapping):
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.cache: OrderedDict[str, Record] = OrderedDict()
+
+    def __getitem__(self, key: str) -> Record:
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        row = self.connection.execute(
+            "SELECT record FROM contacts WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self.__remember(key, pickle.loads(row[0]))
+
+    def __setitem__(self, key: str, record: Record):
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.write(key, record)
+        self.__remember(key, record)
+
+    def __delitem__(self, key: str):
+        deleted = self.connection.execute(
+            "DELETE FROM contacts WHERE key = ?", (key,)
+        ).rowcount
+        self.cache.pop(key, None)
+        if not deleted:
+            raise KeyError(key)
+
+    def __iter__(self):
+        cursor = self.connection.execute("SELECT key FROM contacts ORDER BY rowid")
+        for (key,) in cursor:
+            yield key
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def __contains__(self, key) -> bool:
+        return key in self.cache or bool(
+            self.connection.execute(
+                "SELECT 1 FROM contacts WHERE key = ?", (key,)
+            ).fetchone()
+        )
+
+    # Bulk iteration streams rows instead of fetching records one by one
+    def items(self):
+        cursor = self.connection.execute(
+            "SELECT key, record FROM contacts ORDER BY rowid"
+        )
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            for key, blob in rows:
+                yield key, self.cache.get(key) or pickle.loads(blob)
+
+    def values(self):
+        return (record for _, record in self.items())
+
+    def write(self, key: str, record: Record):
+        """Upserts one record with its lookup rows, caller owns the transaction."""
+        self.connection.execute(
+            "INSERT INTO contacts (key, name, birthday_md, record) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET name = excluded.name, "
+            "birthday_md = excluded.birthday_md, record = excluded.record",
+            (
+                key,
+                normalize_name(str(record.name)),
+                birthday_md(record),
+                pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL),
+            ),
+        )
+        self.connection.execute("DELETE FROM phones WHERE key = ?", (key,))
+        self.connection.execute("DELETE FROM emails WHERE key = ?", (key,))
+        self.connection.executemany(
+            "INSERT INTO phones (phone, key) VALUES (?, ?)",
+            {(phone.number, key) for phone in record.phones},
+        )
+        self.connection.executemany(
+            "INSERT INTO emails (email, key) VALUES (?, ?)",
+            {(normalize_email(str(email.value)), key) for email in record.emails},
+        )
+        self.connection.execute("DELETE FROM contact_sort WHERE key = ?", (key,))
+        self.connection.executemany(
+            "INSERT INTO contact_sort (field, value, key) VALUES (?, ?, ?)",
+            [(field, key_of(record), key) for field, key_of in SORT_KEYS.items()],
+        )
+        self.connection.execute(
+            "INSERT INTO contact_texts (key, text) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET text = excluded.text",
+            (key, search_text(record)),
+        )
+
+    def key_of(self, record: Record) -> str | None:
+        return next((k for k, rec in self.cache.items() if rec is record), None)
+
+    def __remember(self, key: str, record: Record) -> Record:
+        self.cache[key] = record
+        self.cache.move_to_end(key)
+        if len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return record
+
+
+class SqliteSortedIndex:
+    """
+    `SortedIndex` over the `contact_sort` rows of one field: the keys and the
+    pages are read in order from the SQL index, nothing is kept in memory.
+    Records without a sort key come last in both directions, by their key.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, field: str):
+        self.connection = connection
+        self.field = field
+
+    def keys(self, reverse: bool = False, limit: int | None = None) -> list[str]:
+        """Record keys in order, the first `limit` of them if given."""
+        return [key for _, key in self.page(None, limit, reverse)]
+
+    def page(
+        self, after: tuple[Any, str] | None, size: int | None, reverse: bool = False
+    ) -> list[tuple[Any, str]]:
+        """
+        Up to `size` entries (all if None) following the `after` entry in the
+        walk order, see `SortedIndex.page`.
+        """
+        if after is not None and after[0] is None:
+            # Past the entries with a sort key already
+            return self.__missing(after[1], size)
+        order, past = ("DESC", "<") if reverse else ("ASC", ">")
+        where, params = "field = ? AND value IS NOT NULL", [self.field]
+        if after is not None:
+            where += f" AND (value, key) {past} (?, ?)"
+            params += after
+        page = self.connection.execute(
+            f"SELECT value, key FROM contact_sort WHERE {where} "
+            f"ORDER BY value {order}, key {order} LIMIT ?",
+            (*params, -1 if size is None else size),
+        ).fetchall()
+        if size is None or len(page) < size:
+            page += self.__missing(None, None if size is None else size - len(page))
+        return page
+
+    def __missing(self, after: str | None, size: int | None) -> list[tuple]:
+        where, params = "field = ? AND value IS NULL", [self.field]
+        if after is not None:
+            where += " AND key > ?"
+            params.append(after)
+        return self.connection.execute(
+            f"SELECT value, key FROM contact_sort WHERE {where} ORDER BY key LIMIT ?",
+            (*params, -1 if size is None else size),
+        ).fetchall()
+
+
+class SqliteContactsBook(ContactsBook):
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.data: SqliteRecords = SqliteRecords(connection)
+        if get_meta(connection, "lookup_version") < LOOKUP_VERSION:
+            self.__rebuild_lookups()
+
+    def __rebuild_lookups(self):
+        with self.connection:
+            self.connection.execute("BEGIN")
+            for key, record in list(self.data.items()):
+                self.data.write(key, record)
+            set_meta(self.connection, "lookup_version", LOOKUP_VERSION)
+
+    def touch(self, record: Record):
+        key = self.key_of(record)
+        if key is None:
+            # Never drop an edit silently
+            raise RecordNotFound(
+                f"Contact '{record.name}' is not in the book, the change isn't saved."
+            )
+        self.data[key] = record
+        self._reindex(key)
+
+    def key_of(self, record: Record) -> str | None:
+        key = normalize_name(str(record.name._value))
+        if key in self.data.cache and self.data.cache[key] is record:
+            return key
+        cached = self.data.key_of(record)
+        if cached is not None:
+            return cached
+        # Records from items()/values(), or evicted from the cache, aren't
+        # tracked by identity: they are found by their stored name
+        row = self.connection.execute(
+            "SELECT key FROM contacts WHERE name = ? LIMIT 1", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def replace_data(self, data: dict[str, Record]):
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.execute("DELETE FROM contacts")
+            for key, record in data.items():
+                self.data.write(key, record)
+        self.data.cache.clear()
+        if self._tags is not None:
+            self._tags.attach(CONTACTS, self.data)
+
+    def find(self, name: str) -> Record | None:
+        row = self.connection.execute(
+            "SELECT key FROM contacts WHERE name = ? LIMIT 1", (normalize_name(name),)
+        ).fetchone()
+        return self.data[row[0]] if row else None
+
+    def find_by_phone(self, phone: str) -> Record | None:
+        row = self.connection.execute(
+            "SELECT key FROM phones WHERE phone = ? LIMIT 1", (canonical_phone(phone),)
+        ).fetchone()
+        return self.data[row[0]] if row else None
+
+    def find_by_email(self, email: str) -> Record | None:
+        row = self.connection.execute(
+            "SELECT key FROM emails WHERE email = ? LIMIT 1", (normalize_email(email),)
+        ).fetchone()
+        return self.data[row[0]] if row else None
+
+    def search_corpus(self) -> dict[str, str]:
+        cursor = self.connection.execute(
+            "SELECT key, text FROM contact_texts ORDER BY rowid"
+        )
+        return dict(cursor)
+
+    def search_candidates(self, literals: list[str]) -> list[str] | None:
+        literals = [literal for literal in literals if len(literal) >= GRAM]
+        if not literals:
+            return None
+        # Every literal as an FTS5 string, the trigrams of all of them
+        match = " AND ".join(
+            '"' + literal.replace('"', '""') + '"' for literal in literals
+        )
+        cursor = self.connection.execute(
+            "SELECT key FROM contact_texts WHERE rowid IN "
+            "(SELECT rowid FROM contact_texts_fts WHERE contact_texts_fts MATCH ?) "
+            "ORDER BY rowid",
+            (match,),
+        )
+        return [key for (key,) in cursor]
+
+    def sorted_index(self, field: str) -> SqliteSortedIndex:
+        return SqliteSortedIndex(self.connection, field)
+
+    def is_phone_owned(self, phone: str):
+        return bool(
+            self.connection.execute(
+                "SELECT 1 FROM phones WHERE phone = ? LIMIT 1",
+                (canonical_phone(phone),),
+            ).fetchone()
+        )
+
+    def is_email_owned(self, email: str):
+        return bool(
+            self.connection.execute(
+                "SELECT 1 FROM emails WHERE email = ? LIMIT 1",
+                (normalize_email(email),),
+            ).fetchone()
+        )
+
+    def delete(self, name):
+        del self.data[name]
+        self._reindex(name)
+
+    def _birthday_candidates(self, today, days_to: int):
+        if days_to <= 0:
+            return []
+        if days_to >= 366:
+            where, params = "birthday_md IS NOT NULL", ()
+        else:
+            last = today + td(days=days_to - 1)
+            start = today.month * 100 + today.day
+            end = last.month * 100 + last.day
+            if end == 228 and not isleap(last.year):
+                # Feb 29 birthdays are celebrated on Feb 28 in common years
+                end = 229
+            if today.year == last.year:
+                where, params = "birthday_md BETWEEN ? AND ?", (start, end)
+            else:
+                # The window wraps over the New Year
+                where, params = "birthday_md >= ? OR birthday_md <= ?", (start, end)
+
+        cursor = self.connection.execute(
+            f"SELECT key, record FROM contacts WHERE {where}", params
+        )
+        return (
+            (key, self.data.cache.get(key) or pickle.loads(blob))
+            for key, blob in cursor
+        )
+
+    # Records are written as soon as they change, nothing to replay or pickle
+    def restore_entry(self, key: str, record: Record):
+        self.data[key] = record
+        self._reindex(key)
+
+    def discard_entry(self, key: str):
+        self.data.pop(key, None)
+        self._reindex(key)
+
+    def __getstate__(self):
+        raise TypeError("SqliteContactsBook is stored in SQLite and can't be pickled")
@@ -1,8 +1,20 @@
 from .ContactFields import Address, Birthday, Email, Name, Phone, Photo
 from .ContactsBook import ContactsBook
-from .controller import conntroller as cntcts_controller
 from .Records import Record
 from .service import PhoneBookService
+from .SqliteContactsBook import SqliteContactsBook
+
+
+# The controller is loaded on first use: it needs `common.input_prompts`,
+# which imports `contacts.validators`, so loading it here would make
+# `import common` fail when it comes before `import contacts`
+def __getattr__(name):
+    if name == "cntcts_controller":
+        from .controller import conntroller
+
+        return conntroller
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "ContactsBook",
@@ -15,4 +27,5 @@ __all__ = [
     "Record",
     "cntcts_controller",
     "PhoneBookService",
+    "SqliteContactsBook",
 ]
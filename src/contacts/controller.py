@@ -1,6 +1,5 @@
 import argparse
 import re
-from datetime import datetime as dt
 
 from colorama import Fore
 
@@ -11,29 +10,20 @@ from common.input_prompts import (
     prompt_for_field,
     prompt_remove_details,
 )
-from context import save_data
 from output import (
     output_error,
     output_info,
     output_warning,
     show_contact_card,
+    show_contact_cards,
 )
+from utils.session import ask
 
 from .ContactsBook import ContactsBook
+from .indexes import SORT_KEYS
+from .paging import DEFAULT_PAGE_SIZE
+from .search import DEFAULT_THRESHOLD
 from .service import PhoneBookService
-from .undo import load_undo_state
-
-global UNDONE
-UNDONE = False
-
-
-def handle_undo(book: ContactsBook):
-    restored_book = load_undo_state()
-    if not restored_book:
-        output_error("No undo available.")
-        return
-    save_data(restored_book)
-    output_info("Last operation undone.")
 
 
 # Allow complex values input in quotes like address
@@ -71,7 +61,7 @@ def select_field_value(record, field: str) -> str | None:
         print(f"{idx}. {val}")
 
     try:
-        index = int(input("Select value number to edit: "))
+        index = int(ask("Select value number to edit: "))
         if 1 <= index <= len(values):
             selected = values[index - 1]
             print(f"Selected: {selected}")
@@ -385,7 +375,7 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
 
                         try:
                             choice = int(
-                                input("Enter the number of the contact to remove: ")
+                                ask("Enter the number of the contact to remove: ")
                             )
                             if 1 <= choice <= len(names):
                                 selected_name = str(names[choice - 1].name)
@@ -422,7 +412,7 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
                                 print(f"{idx}. {match}")
                             try:
                                 choice = int(
-                                    input("Enter the number of the contact to remove: ")
+                                    ask("Enter the number of the contact to remove: ")
                                 )
                                 if 1 <= choice <= len(names):
                                     selected_name = str(names[choice - 1].name)
@@ -470,49 +460,47 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
                     )
 
             case "sort":
-                field = args[0].lower() if args else None
-                order = args[1].lower() if len(args) > 1 else "asc"
+                parser = argparse.ArgumentParser(prog="contacts sort", add_help=False)
+                parser.add_argument("--limit", type=int)
+                parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+                try:
+                    ns, remaining = parser.parse_known_args(args)
+                except SystemExit:
+                    return output_error(
+                        "Usage: contacts sort [Field] [asc|desc] [--limit N] [--page-size N]"
+                    )
+                field = remaining[0].lower() if remaining else None
+                order = remaining[1].lower() if len(remaining) > 1 else "asc"
                 reverse = order == "desc"
-                valid_fields = ["name", "phone", "email", "address", "birthday", "tags"]
+                valid_fields = list(SORT_KEYS)
 
                 if not field or field not in valid_fields:
                     return output_error(
                         f"❌ Please provide a valid field to sort by: {', '.join(valid_fields)}"
                     )
 
-                def get_sort_key(record):
-                    value = getattr(record, field, None)
-
-                    if field == "birthday":
-                        try:
-                            # Очікуємо, що value — об'єкт Birthday із .value типу datetime.date або str
-                            birthday_val = (
-                                value.value if hasattr(value, "value") else value
-                            )
-                            if isinstance(birthday_val, dt):
-                                return birthday_val
-                            return dt.strptime(str(birthday_val), "%d.%m.%Y")
-                        except Exception:
-                            return dt.max  # якщо не вдалося парсити — останнім
-
-                    if isinstance(value, list):
-                        return str(value[0]) if value else ""
-
-                    return str(value) if value else ""
-
-                sorted_records = sorted(
-                    book.data.values(), key=get_sort_key, reverse=reverse
+                # Сторінки йдуть прямо з відсортованого індексу
+                book_service.show_sorted_contacts(
+                    field, reverse, ns.limit, ns.page_size
                 )
 
-                if not sorted_records:
-                    return output_info("📭 No contacts to show.")
-                return book_service.show_sorted_contacts(sorted_records)
-
             case "phone":
                 book_service.show_contacts_phones(args)
 
             case "all":
-                book_service.show_all_contacts(args)
+                parser = argparse.ArgumentParser(prog="contacts all", add_help=False)
+                parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+                try:
+                    ns, fields = parser.parse_known_args(args)
+                except SystemExit:
+                    return output_error("Usage: contacts all [Fields] [--page-size N]")
+                book_service.show_all_contacts(fields, ns.page_size)
+
+            case "next":
+                book_service.show_next_page()
+
+            case "prev":
+                book_service.show_prev_page()
 
             case "show-birthday":
                 book_service.get_birthday(args)
@@ -520,9 +508,15 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
             case "birthdays":
                 book_service.show_next_n_days_birthdays(args)
 
+            case "ingest-photos":
+                book_service.ingest_photos(args)
+
             case "show":
+                if args == ["--all"]:
+                    # Галерея: фото декодуються заздалегідь у кілька потоків
+                    return show_contact_cards(book.data.values())
                 if not args or len(args) > 1:
-                    output_error("Usage: contacts show [NAME]")
+                    output_error("Usage: contacts show [NAME] | --all")
                     return
 
                 name = args[0]
@@ -535,7 +529,7 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
             case "find":
                 if not args:
                     print(
-                        "Usage: contacts find [--name NAME] [--phone PHONE] [--email EMAIL] [--birthday BIRTHDAY] [--tag TAG] or just search text"
+                        "Usage: contacts find [--name NAME] [--phone PHONE] [--email EMAIL] [--birthday BIRTHDAY] [--tag TAG] [--limit N] [--threshold SCORE] [--page-size N] or just search text"
                     )
                     return
 
@@ -545,6 +539,11 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
                 parser.add_argument("--email")
                 parser.add_argument("--birthday")
                 parser.add_argument("--tag")
+                parser.add_argument("--limit", type=int)
+                parser.add_argument(
+                    "--threshold", type=float, default=DEFAULT_THRESHOLD
+                )
+                parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
 
                 try:
                     ns, remaining = parser.parse_known_args(args)
@@ -563,31 +562,32 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
 
                     query = " ".join(remaining).strip()
 
-                    results = book_service.find_contacts(
-                        query=query, mode="smart", **filters
+                    book_service.show_found_contacts(
+                        query=query,
+                        page_size=ns.page_size,
+                        mode="smart",
+                        limit=ns.limit,
+                        threshold=ns.threshold,
+                        **filters,
                     )
 
-                    if results:
-                        from output import display_contacts_table
-
-                        display_contacts_table(results)
-                    else:
-                        print("No matching contacts found.")
-
                 except Exception as e:
                     print(f"Error while parsing or searching: {e}")
 
-            case "undo":
-                restored = load_undo_state()
-                global UNDONE
+            case "undo" | "redo":
+                steps = int(args[0]) if args and args[0].isdigit() else 1
+                if action == "undo":
+                    changes = book_service.undo(steps)
+                else:
+                    changes = book_service.redo(steps)
 
-                if restored and not UNDONE:
-                    # Overwrite the passed-in `book` object
-                    UNDONE = True
-                    book.data = restored.data
-                    output_info("Last operation has been undone!")
+                if changes:
+                    for change in changes:
+                        output_info(f"{action.capitalize()}: {change.description}")
+                    done = "undone" if action == "undo" else "redone"
+                    output_info(f"Last operation has been {done}!")
                 else:
-                    output_warning("Nothing to undo yet.")
+                    output_warning(f"Nothing to {action} yet.")
 
             case "photo":
                 if not args:
@@ -602,13 +602,12 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
                     return
 
                 name = prompt_for_field("name")
-                record = book.find(name)
-                if not record:
+                if not book.find(name):
                     output_error(f"Contact '{name}' not found.")
                     return
 
                 # Save the photo path in the record
-                record.photo = photo_path
+                book_service.edit_contact_field(name, "photo", photo_path)
                 output_info(f"Photo added to contact '{name}'.")
 
             case "export":
@@ -616,7 +615,7 @@ def conntroller(book: ContactsBook):  # consider renaming to `controller`
 
             case "import":
                 output_warning("All duplicates will be recovered!")
-                if input("Confirm import [y]: ") == "y":
+                if ask("Confirm import [y]: ") == "y":
                     book_service.import_contacts_to_csv(args)
                 else:
                     output_info("Import canceled!")
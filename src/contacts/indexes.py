@@ -0,0 +1,278 @@
+"""
+In-memory indexes of ContactsBook
+=================================
+
+Derived lookup tables that let the book answer "who is called like this",
+"who owns this phone/email" or "whose birthday is on this day" without
+scanning every record, plus the corpus of the fuzzy search and its trigram
+index for substring and regex searches. They are never pickled: each index
+is built from the book on its first lookup and then kept up to date from the
+book mutation hooks (`add_record`, `put_record`, `touch`, `delete` and the
+journal replay hooks).
+
+The name index also serves as the secondary key of the book: records stored
+under a key that isn't their canonical name (books saved before the keys were
+normalized) are still found in O(1).
+
+Usage example:
+
+    index = BookIndex(book.data)
+    index.names.find(normalize_name(" John  DOE "))  # ('john doe',)
+    index.phones.find(canonical_phone("+380671234567"))  # ('john doe',)
+    index.birthdays.find((2, 29))  # ('john doe',)
+    index.texts.corpus()  # {'john doe': 'john doe 0671234567 29.02.2000'}
+    index.trigrams.candidates(["doe 067"])  # ['john doe']
+    index.sorted["birthday"].keys(reverse=True, limit=10)  # 10 youngest
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain, islice
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+from .Records import Record
+from .trigrams import TrigramIndex
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def name_values(record: Record) -> Iterable[str]:
+    return (normalize_name(str(record.name)),)
+
+
+def search_text(record: Record) -> str:
+    """Everything a contact can be searched by, as one lower-cased string."""
+    return " ".join(field for field in record.get_all_fields() if field).lower()
+
+
+def birthday_values(record: Record) -> Iterable[tuple[int, int]]:
+    """(month, day) of the birthday, Feb 29 is kept as is."""
+    if not record.birthday:
+        return ()
+    return ((record.birthday.month, record.birthday.day),)
+
+
+def phone_values(record: Record) -> Iterable[int]:
+    return (phone.number for phone in record.phones)
+
+
+def email_values(record: Record) -> Iterable[str]:
+    return (normalize_email(str(email.value)) for email in record.emails)
+
+
+def first_text(items: list) -> str:
+    return str(items[0]) if items else ""
+
+
+# What `contacts sort <field>` orders by. None (no birthday or phone) goes last
+# in both directions, see `SortedIndex`
+SORT_KEYS: dict[str, Callable[[Record], Any]] = {
+    "name": lambda record: str(record.name),
+    "phone": lambda record: record.phones[0].number if record.phones else None,
+    "email": lambda record: first_text(record.emails),
+    "address": lambda record: str(record.address) if record.address else "",
+    "birthday": lambda record: record.birthday.ordinal if record.birthday else None,
+    "tags": lambda record: first_text(record.tags),
+}
+
+
+class LookupIndex:
+    """Normalized field value -> keys of the records holding it."""
+
+    def __init__(
+        self,
+        values_of: Callable[[Record], Iterable[Hashable]],
+        data: dict[str, Record],
+    ):
+        self.values_of = values_of
+        self.data = data
+        # Both are None until the first lookup
+        self.owners: dict[Hashable, tuple[str, ...]] | None = None
+        # What every record was indexed under, to unlink it after an edit
+        self.indexed: dict[str, tuple[Hashable, ...]] | None = None
+
+    def build(self):
+        owners = {}
+        indexed = {}
+        values_of = self.values_of
+        for key, record in self.data.items():
+            values = tuple(set(values_of(record)))
+            if values:
+                indexed[key] = values
+                for value in values:
+                    owners[value] = owners.get(value, ()) + (key,)
+        self.owners, self.indexed = owners, indexed
+
+    def add(self, key: str, record: Record):
+        if self.owners is None:
+            return
+        self.discard(key)
+        values = tuple(set(self.values_of(record)))
+        if not values:
+            return
+        self.indexed[key] = values
+        for value in values:
+            self.owners[value] = self.owners.get(value, ()) + (key,)
+
+    def discard(self, key: str):
+        if self.owners is None:
+            return
+        for value in self.indexed.pop(key, ()):
+            owners = tuple(owner for owner in self.owners[value] if owner != key)
+            if owners:
+                self.owners[value] = owners
+            else:
+                del self.owners[value]
+
+    def find(self, value: Hashable) -> tuple[str, ...]:
+        if self.owners is None:
+            self.build()
+        return self.owners.get(value, ())
+
+
+class TextIndex:
+    """Search text of every record, the corpus of the fuzzy search."""
+
+    def __init__(self, data: dict[str, Record]):
+        self.data = data
+        self.texts: dict[str, str] | None = None
+
+    def build(self):
+        self.texts = {key: search_text(record) for key, record in self.data.items()}
+
+    def add(self, key: str, record: Record):
+        if self.texts is not None:
+            self.texts[key] = search_text(record)
+
+    def discard(self, key: str):
+        if self.texts is not None:
+            self.texts.pop(key, None)
+
+    def corpus(self) -> dict[str, str]:
+        if self.texts is None:
+            self.build()
+        return self.texts
+
+
+class SortedIndex:
+    """
+    Keys of the records ordered by one field, kept sorted with bisect. The
+    records whose sort key is None come after the others in both directions,
+    ordered by their key.
+    """
+
+    def __init__(self, key_of: Callable[[Record], Any], data: dict[str, Record]):
+        self.key_of = key_of
+        self.data = data
+        # All are None until the first walk: (sort key, record key) in order,
+        # the keys of the records without a sort key and the sort key every
+        # record was inserted under, to find it again
+        self.entries: list[tuple[Any, str]] | None = None
+        self.missing: list[str] | None = None
+        self.values: dict[str, Any] | None = None
+
+    def build(self):
+        key_of = self.key_of
+        self.values = {key: key_of(record) for key, record in self.data.items()}
+        self.entries = sorted(
+            (value, key) for key, value in self.values.items() if value is not None
+        )
+        self.missing = sorted(
+            key for key, value in self.values.items() if value is None
+        )
+
+    def add(self, key: str, record: Record):
+        if self.entries is None:
+            return
+        self.discard(key)
+        value = self.key_of(record)
+        self.values[key] = value
+        if value is None:
+            insort(self.missing, key)
+        else:
+            insort(self.entries, (value, key))
+
+    def discard(self, key: str):
+        if self.entries is None or key not in self.values:
+            return
+        value = self.values.pop(key)
+        if value is None:
+            del self.missing[bisect_left(self.missing, key)]
+        else:
+            del self.entries[bisect_left(self.entries, (value, key))]
+
+    def walk(self, reverse: bool = False) -> Iterator[tuple[Any, str]]:
+        """All the entries in order, the ones without a sort key last."""
+        if self.entries is None:
+            self.build()
+        entries = reversed(self.entries) if reverse else self.entries
+        return chain(entries, ((None, key) for key in self.missing))
+
+    def keys(self, reverse: bool = False, limit: int | None = None) -> list[str]:
+        """Record keys in order, the first `limit` of them if given."""
+        return [key for _, key in islice(self.walk(reverse), limit)]
+
+    def page(
+        self, after: tuple[Any, str] | None, size: int, reverse: bool = False
+    ) -> list[tuple[Any, str]]:
+        """
+        Up to `size` entries following the `after` entry (the last one of the
+        previous page) in the walk order, found by bisect: the page stays
+        right even if records were added or removed since.
+        """
+        if self.entries is None:
+            self.build()
+        if after is not None and after[0] is None:
+            # Past the entries with a sort key already
+            start = bisect_right(self.missing, after[1])
+            return [(None, key) for key in self.missing[start : start + size]]
+        if not reverse:
+            start = 0 if after is None else bisect_right(self.entries, after)
+            page = self.entries[start : start + size]
+        else:
+            end = len(self.entries)
+            if after is not None:
+                end = bisect_left(self.entries, after)
+            page = self.entries[max(0, end - size) : end][::-1]
+        missing = self.missing[: size - len(page)]
+        return page + [(None, key) for key in missing]
+
+
+class BookIndex:
+    def __init__(self, data: dict[str, Record]):
+        self.names = LookupIndex(name_values, data)
+        self.phones = LookupIndex(phone_values, data)
+        self.emails = LookupIndex(email_values, data)
+        self.birthdays = LookupIndex(birthday_values, data)
+        self.texts = TextIndex(data)
+        self.trigrams = TrigramIndex(self.texts.corpus)
+        self.sorted = {
+            field: SortedIndex(key_of, data) for field, key_of in SORT_KEYS.items()
+        }
+
+    def add(self, key: str, record: Record):
+        for index in self.__indexes():
+            index.add(key, record)
+        # Trigrams are built from the texts, so the text is there when they are
+        if self.trigrams.is_built:
+            self.trigrams.add(key, self.texts.texts[key])
+
+    def discard(self, key: str):
+        for index in self.__indexes():
+            index.discard(key)
+        self.trigrams.discard(key)
+
+    def __indexes(self) -> tuple[LookupIndex | TextIndex | SortedIndex, ...]:
+        return (
+            self.names,
+            self.phones,
+            self.emails,
+            self.birthdays,
+            self.texts,
+            *self.sorted.values(),
+        )
@@ -0,0 +1,107 @@
+"""
+Paged contact listings
+======================
+
+`contacts all`, `contacts sort` and `contacts find` show one page at a time,
+`contacts next` and `contacts prev` move through the last listing. A page is
+fetched from where the previous one stopped (its cursor), so only the
+records of the visible page are read from the book and rendered:
+
+- a sorted listing walks the `SortedIndex` of its field, the cursor is the
+  last (sort key, record key) entry shown and the next page starts right
+  after it (keyset pagination);
+- `all` and `find` walk their keys in order, the cursor is the position.
+
+Usage example:
+
+    pager = Pager(by_sort_key(book.sorted_index("name"), book.data), 20)
+    pager.first()  # the first 20 records by name
+    pager.next()  # the next 20, None after the last page
+    pager.prev()  # back to the first 20
+"""
+
+from collections.abc import Iterable, Mapping
+from itertools import islice
+from typing import Any, Callable
+
+from .indexes import SortedIndex
+from .Records import Record
+
+DEFAULT_PAGE_SIZE = 50
+
+# (cursor, page size) -> (records of the page, cursor of the next page or None)
+Fetch = Callable[[Any, int], tuple[list[Record], Any]]
+
+
+def by_position(keys: Iterable[str], data: Mapping[str, Record]) -> Fetch:
+    """
+    Pages of the keys in their order, the cursor is a position. Keys removed
+    from the book since the listing was made are skipped.
+    """
+
+    def fetch(cursor: int | None, size: int) -> tuple[list[Record], int | None]:
+        records = []
+        for position, key in enumerate(islice(keys, cursor or 0, None), cursor or 0):
+            if key not in data:
+                continue
+            # One record more than shown tells if there is a next page
+            if len(records) == size:
+                return records, position
+            records.append(data[key])
+        return records, None
+
+    return fetch
+
+
+def by_sort_key(
+    index: SortedIndex, data: Mapping[str, Record], reverse: bool = False
+) -> Fetch:
+    """Pages of a sorted index, the cursor is the last entry shown."""
+
+    def fetch(cursor: tuple | None, size: int) -> tuple[list[Record], tuple | None]:
+        entries = index.page(cursor, size + 1, reverse)
+        following = entries[size - 1] if len(entries) > size else None
+        return [data[key] for _, key in entries[:size]], following
+
+    return fetch
+
+
+class Pager:
+    def __init__(self, fetch: Fetch, page_size: int = DEFAULT_PAGE_SIZE):
+        self.fetch = fetch
+        self.page_size = max(1, page_size)
+        # Cursors the pages shown so far started at, the last one is on screen
+        self.starts: list[Any] = []
+        self.following: Any = None
+
+    @property
+    def number(self) -> int:
+        return len(self.starts)
+
+    @property
+    def has_next(self) -> bool:
+        return self.following is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return len(self.starts) > 1
+
+    def first(self) -> list[Record]:
+        self.starts = [None]
+        return self.__load()
+
+    def next(self) -> list[Record] | None:
+        if not self.has_next:
+            return None
+        self.starts.append(self.following)
+        return self.__load()
+
+    def prev(self) -> list[Record] | None:
+        if not self.has_prev:
+            return None
+        self.starts.pop()
+        return self.__load()
+
+    def __load(self) -> list[Record]:
+        records, self.following = self.fetch(self.starts[-1], self.page_size)
+        return records
@@ -0,0 +1,64 @@
+"""
+Fuzzy search over the contacts corpus
+=====================================
+
+Scores the cached search texts of the book (`BookIndex.texts`) in one call
+to rapidfuzz instead of one Python-level `fuzz.partial_ratio` per record.
+With numpy installed `process.cdist` spreads the work over all CPU cores,
+otherwise `process.extract` scores the corpus in a single native loop.
+Both are imported by the first search, not when the app starts.
+
+Usage example:
+
+    rank_matches("jon", book.search_corpus(), limit=10)  # [('john', 100.0)]
+"""
+
+from collections.abc import Mapping
+from functools import cache
+
+DEFAULT_THRESHOLD = 75
+
+
+@cache
+def _numpy():
+    try:
+        import numpy
+    except ImportError:  # cdist returns numpy arrays, extract works without them
+        return None
+    return numpy
+
+
+def rank_matches(
+    query: str,
+    corpus: Mapping[str, str],
+    limit: int | None = None,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[tuple[str, float]]:
+    """Keys of the texts matching the query with their scores, best first."""
+    from rapidfuzz import fuzz, process
+
+    np = _numpy()
+    query = query.lower()
+    if np is None:
+        matches = process.extract(
+            query,
+            corpus,
+            scorer=fuzz.partial_ratio,
+            processor=None,
+            limit=limit,
+            score_cutoff=threshold,
+        )
+        return [(key, score) for _, score, key in matches]
+
+    keys = list(corpus)
+    scores = process.cdist(
+        [query],
+        list(corpus.values()),
+        scorer=fuzz.partial_ratio,
+        score_cutoff=threshold,
+        workers=-1,
+    )[0]
+    # Scores under the cutoff come back as 0
+    hits = np.flatnonzero(scores >= max(threshold, 1))
+    best = hits[np.argsort(-scores[hits], kind="stable")][:limit]
+    return [(keys[i], float(scores[i])) for i in best]
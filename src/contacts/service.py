@@ -1,7 +1,8 @@
+import os
 import re
+from copy import deepcopy
 
 from colorama import Fore
-from rapidfuzz import fuzz
 
 from contacts import Birthday, Email, Phone, Photo
 from decorators import error_handler
@@ -19,17 +20,24 @@ from output import (
     output_info,
     output_warning,
 )
-from utils.export_import import export_contacts_to_csv, import_contacts_from_csv
+from storage.photos import ingest_directory, is_stored, store_photo
 from utils.search import elastic_search
 
 from .ContactsBook import ContactsBook
+from .paging import DEFAULT_PAGE_SIZE, Fetch, Pager, by_position, by_sort_key
 from .Records import Record
-from .undo import save_undo_state
+from .search import DEFAULT_THRESHOLD, rank_matches
+from .trigrams import required_literals
+
+REGEX_SPECIALS = set(".^$*+?{}[]\\|()")
 
 
 class PhoneBookService:
     def __init__(self, book: ContactsBook):
         self.__book: ContactsBook = book
+        # The listing `show_next_page` and `show_prev_page` move through
+        self.__pager: Pager | None = None
+        self.__columns: list = []
 
     @property
     def book(self):
@@ -39,12 +47,30 @@ class PhoneBookService:
     def book(self, book: ContactsBook):
         self.book = book
 
+    def __snapshot(self, record: Record) -> tuple:
+        return self.book.key_of(record), deepcopy(record)
+
+    def __commit(self, description: str, before: tuple | None, record: Record):
+        """Persists an in-place change and remembers it for undo."""
+        self.book.touch(record)
+        after = self.__snapshot(record)
+        if after[0] is None or (before is not None and before[0] is None):
+            # An undo step without a key could never be undone
+            raise RecordNotFound(
+                f"Contact '{record.name}' is not in the book, the change isn't saved."
+            )
+        self.book.history.push(description, before, after)
+
     @error_handler
-    def add_contact_from_dict(self, data: dict):
-        save_undo_state(self.book)
-        global UNDONE
-        UNDONE = False
+    def undo(self, steps: int = 1) -> list:
+        return self.book.history.undo(self.book, steps)
 
+    @error_handler
+    def redo(self, steps: int = 1) -> list:
+        return self.book.history.redo(self.book, steps)
+
+    @error_handler
+    def add_contact_from_dict(self, data: dict):
         name = data.get("name")
         phone = data.get("phone")
         email = data.get("email")
@@ -75,26 +101,33 @@ class PhoneBookService:
             for tag in tags:
                 new_record.add_tag(tag)
 
-        self.book.add_record(
+        key = self.book.add_record(
             new_record
         )  #!!! HERE - in should pass new record to add_record() but somehow previous name is thereas well
+        self.book.history.push(
+            f"add {name}", None, (key, deepcopy(self.book.data[key]))
+        )
         # output_info(f"Contact {name} has been added successfully.")
 
     @error_handler
     def edit_contact_field(
         self, name: str, field: str, new_value: str, old_value: str = ""
     ):
-        save_undo_state(self.book)
-        global UNDONE
-        UNDONE = True
-
         record = self.book.find(name)
         if record is None:
             raise RecordNotFound(f"Contact {Fore.GREEN}{name}{Fore.RESET} not found.")
 
+        before = self.__snapshot(record)
+        updated = self.__update_field(record, field, new_value, old_value)
+        self.__commit(f"edit {field} of {name}", before, record)
+        return updated
+
+    def __update_field(
+        self, record: Record, field: str, new_value: str, old_value: str
+    ):
         match field:
             case "name":
-                record.name._value = new_value
+                self.book.rename(record, new_value)
                 return True
             case "phone":
                 if self.book.is_phone_owned(new_value):
@@ -104,7 +137,7 @@ class PhoneBookService:
 
                 if old_value:
                     for i, phone in enumerate(record.phones):
-                        if str(phone) == str(old_value):
+                        if phone == old_value:
                             record.phones[i] = Phone(new_value)
                             output_info(
                                 f"Phone {old_value} has been updated to {new_value}."
@@ -140,13 +173,16 @@ class PhoneBookService:
 
                 tag = record.find_tag(old_value)
                 if tag:
-                    tag.value = new_value
+                    record.replace_tag(tag, new_value)
                     output_info(f"Tag {old_value} has been updated to {new_value}.")
                     return True
                 else:
                     raise FieldNotFound(f"Tag {old_value} not found.")
 
             case "photo":
+                # Kept once in the photo store, whichever copy it came from
+                if Photo.validate_path(new_value) and os.path.isfile(new_value):
+                    new_value = store_photo(new_value)
                 record.add_photo(new_value)
                 return True
 
@@ -156,7 +192,10 @@ class PhoneBookService:
                 )
 
     @error_handler
-    def show_all_contacts(self, args: list[str] = []) -> None:
+    def show_all_contacts(
+        self, args: list[str] = [], page_size: int = DEFAULT_PAGE_SIZE
+    ) -> None:
+        columns = []
         if args:
             final_collumns = ["Name"]
             unknown_fields = ""
@@ -172,14 +211,107 @@ class PhoneBookService:
                 output_info(
                     f"There are no {unknown_fields[:-2]} among ContactsBook fields!"
                 )
-            display_contacts_table(self.book.data.values(), final_collumns)
+            columns = final_collumns
+        self.__show_pages(
+            by_position(self.book.data, self.book.data), page_size, columns
+        )
+
+    @error_handler
+    def show_sorted_contacts(
+        self,
+        field: str,
+        reverse: bool = False,
+        limit: int | None = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> None:
+        if limit is None:
+            fetch = by_sort_key(self.book.sorted_index(field), self.book.data, reverse)
         else:
-            display_contacts_table(self.book.data.values())
+            # Top N is one short walk of the index, paged by position
+            keys = self.book.sorted_index(field).keys(reverse, limit)
+            fetch = by_position(keys, self.book.data)
+        self.__show_pages(fetch, page_size, empty="📭 No contacts to show.")
+
+    @error_handler
+    def show_found_contacts(
+        self, query: str = "", page_size: int = DEFAULT_PAGE_SIZE, **options
+    ) -> None:
+        """`find_contacts` shown page by page, see there for the options."""
+        keys = self.find_contact_keys(query, **options)
+        if not keys:
+            return output_info("No matching contacts found.")
+        self.__show_pages(by_position(keys, self.book.data), page_size)
+
+    @error_handler
+    def show_next_page(self) -> None:
+        self.__turn_page(self.__pager and self.__pager.next)
+
+    @error_handler
+    def show_prev_page(self) -> None:
+        self.__turn_page(self.__pager and self.__pager.prev)
+
+    def __show_pages(
+        self, fetch: Fetch, page_size: int, columns: list = [], empty: str = None
+    ):
+        """Shows the first page, an empty book shows `empty` if given."""
+        self.__pager = Pager(fetch, page_size)
+        self.__columns = columns
+        records = self.__pager.first()
+        if not records and empty:
+            return output_info(empty)
+        self.__show_page(records)
+
+    def __turn_page(self, turn):
+        if turn is None:
+            return output_info("Nothing to page through, list some contacts first.")
+        records = turn()
+        if records is None:
+            return output_info("No more pages that way.")
+        self.__show_page(records)
+
+    def __show_page(self, records: list[Record]):
+        pager = self.__pager
+        hints = [
+            hint
+            for hint, shown in (
+                ("contacts prev", pager.has_prev),
+                ("contacts next", pager.has_next),
+            )
+            if shown
+        ]
+        caption = f"Page {pager.number}" + (f" · {' / '.join(hints)}" if hints else "")
+        display_contacts_table(records, self.__columns, caption=caption)
 
     @error_handler
-    def show_sorted_contacts(self, sorted: ContactsBook) -> None:
-        self.sorted = sorted
-        display_contacts_table(self.sorted)
+    def ingest_photos(self, args: list):
+        """
+        Stores every photo of a directory once and points the contacts using
+        one of its files at the stored copy.
+        """
+        directory = args[0] if args else "photo"
+        if not os.path.isdir(directory):
+            raise FieldNotFound(f"Directory {directory} not found.")
+        stored = {
+            os.path.abspath(source): target
+            for source, target in ingest_directory(directory).items()
+        }
+        moved = 0
+        # Fetched by key: the SQLite book only tracks records it handed out
+        # that way, an edit of a record from values() couldn't be saved
+        for key in list(self.book.data):
+            record = self.book.data[key]
+            if not record.photo or is_stored(record.photo.value):
+                continue
+            target = stored.get(os.path.abspath(record.photo.value))
+            if target:
+                before = self.__snapshot(record)
+                record.photo = Photo(target)
+                self.__commit(f"store photo of {record.name}", before, record)
+                moved += 1
+        output_info(
+            f"{len(stored)} photos stored as {len(set(stored.values()))} unique, "
+            f"{moved} contacts now use the store."
+        )
 
     @error_handler
     def show_next_n_days_birthdays(self, args: list):
@@ -226,15 +358,13 @@ class PhoneBookService:
         if record is None:
             raise RecordNotFound(f"Record not found with name: {name}")
 
+        before = self.__snapshot(record)
         record.add_birthday(date)
+        self.__commit(f"set birthday of {name}", before, record)
         output_info(f"Contact's {name} birthday was updated: {date}.")
 
     @error_handler
     def change_contacts_phone(self, args) -> None:
-        save_undo_state(self.book)
-        global UNDONE
-        UNDONE = True
-
         name, old_phone, new_phone = args
         record = self.book.find(name)
         if record is None:
@@ -246,21 +376,23 @@ class PhoneBookService:
                 f"Phone number {new_phone} not exist. You can add it using the 'add' command."
             )
 
+        before = self.__snapshot(record)
         phone.value = new_phone
+        self.__commit(f"change phone of {name}", before, record)
         output_info(
             f"Contact {name} has been updated with new phone number {new_phone}."
         )
 
     @error_handler
     def search_contacts(self, query: str):
-        return elastic_search(self.book.data.values(), query)
+        keys = self.book.search_candidates([query.lower()])
+        if keys is None:
+            return elastic_search(self.book.data.values(), query)
+        return elastic_search((self.book.data[key] for key in keys), query)
 
     @error_handler
     def contact_exists(self, name: str) -> bool:
-        return any(
-            str(record.name).lower() == name.lower()
-            for record in self.book.data.values()
-        )
+        return self.book.find(name) is not None
 
     @error_handler
     def validate_field(self, field: str, value: str) -> bool:
@@ -283,129 +415,163 @@ class PhoneBookService:
         return [record.name for record in self.book.data.values()]
 
     @error_handler
-    def find_contacts(self, query: str = "", mode="smart", **filters) -> list:
-        results = []
-
-        for record in self.book.data.values():
-            # 1. Apply field-specific filters first
-            if "name" in filters:
-                if filters["name"].lower() not in str(record.name).lower():
-                    continue
-
-            if "email" in filters:
-                if not any(
-                    filters["email"].lower() in str(e).lower()
-                    for e in getattr(record, "emails", [])
-                ):
-                    continue
+    def find_contacts(
+        self,
+        query: str = "",
+        mode="smart",
+        limit: int | None = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        **filters,
+    ) -> list:
+        keys = self.find_contact_keys(query, mode, limit, threshold, **filters)
+        return [self.book.data[key] for key in keys]
+
+    def find_contact_keys(
+        self,
+        query: str = "",
+        mode="smart",
+        limit: int | None = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        **filters,
+    ) -> list[str]:
+        """Keys of the records `find_contacts` returns, in the same order."""
+        corpus = self.book.search_corpus()
+
+        # 1. Apply field-specific filters first, the tag one from the registry
+        if "tag" in filters:
+            tagged = self.book.find_by_tag(filters.pop("tag"), prefix=True)
+            corpus = {key: corpus[key] for key in sorted(tagged) if key in corpus}
+        if filters:
+            corpus = {
+                key: text
+                for key, text in corpus.items()
+                if self.__matches_filters(self.book.data[key], filters)
+            }
+
+        # 2. Fallback: apply fuzzy or regex search if query is provided
+        if not query:
+            keys = list(corpus)
+        elif mode == "regex":
+            keys = self.__regex_matches(query, corpus)
+        elif mode == "fuzzy":
+            keys = [key for key, _ in rank_matches(query, corpus, limit, threshold)]
+        else:  # smart: regex matches first, then the fuzzy ones by score
+            keys = self.__regex_matches(query, corpus)
+            if limit is None or len(keys) < limit:
+                found = set(keys)
+                keys += [
+                    key
+                    for key, _ in rank_matches(query, corpus, limit, threshold)
+                    if key not in found
+                ]
 
-            if "tag" in filters:
-                if not any(
-                    filters["tag"].lower() in str(t).lower()
-                    for t in getattr(record, "tags", [])
-                ):
-                    continue
+        return keys[:limit]
 
-            if "phone" in filters:
-                if not any(
-                    filters["phone"].lower() in str(p).lower() for p in record.phones
-                ):
-                    continue
-
-            # 2. Fallback: apply fuzzy or regex search if query is provided
-            if query:
-                parts = [
-                    str(record.name),
-                    *[str(p) for p in getattr(record, "phones", [])],
-                    *[str(e) for e in getattr(record, "emails", [])],
-                    str(getattr(record, "birthday", "")) or "",
-                    str(getattr(record, "address", "")) or "",
-                    " ".join(str(t) for t in getattr(record, "tags", [])),
-                ]
-                full_text = " ".join(parts).lower()
+    @staticmethod
+    def __matches_filters(record: Record, filters: dict) -> bool:
+        if "name" in filters:
+            if filters["name"].lower() not in str(record.name).lower():
+                return False
+
+        if "email" in filters:
+            if not any(
+                filters["email"].lower() in str(e).lower()
+                for e in getattr(record, "emails", [])
+            ):
+                return False
 
-                if mode == "regex":
-                    try:
-                        if not re.search(query, full_text, re.IGNORECASE):
-                            continue
-                    except re.error:
-                        continue  # Skip if regex error
+        if "phone" in filters:
+            if not any(
+                filters["phone"].lower() in str(p).lower() for p in record.phones
+            ):
+                return False
 
-                elif mode == "fuzzy":
-                    if fuzz.partial_ratio(query.lower(), full_text) <= 75:
-                        continue
+        return True
 
-                else:  # smart
-                    try:
-                        if not re.search(query, full_text, re.IGNORECASE):
-                            if fuzz.partial_ratio(query.lower(), full_text) <= 75:
-                                continue
-                    except re.error:
-                        if fuzz.partial_ratio(query.lower(), full_text) <= 75:
-                            continue
+    def __regex_matches(self, query: str, corpus: dict[str, str]) -> list[str]:
+        if not REGEX_SPECIALS.intersection(query):
+            # Plain text, a substring test is the same match and much faster
+            query = query.lower()
+            literals = [query]
 
-            results.append(record)
+            def matches(text: str) -> bool:
+                return query in text
 
-        return results
+        else:
+            try:
+                matches = re.compile(query, re.IGNORECASE).search
+            except re.error:
+                return []  # Skip if regex error
+            literals = required_literals(query)
+
+        # Verify only the records having every trigram of the required literals
+        keys = self.book.search_candidates(literals)
+        if keys is None:
+            keys = corpus
+        return [key for key in keys if key in corpus and matches(corpus[key])]
 
     @error_handler
     def remove_contact_field(self, name: str, field: str, value: str) -> bool:
-        save_undo_state(self.book)
-        global UNDONE
-        UNDONE = True
-
         record = self.book.find(name)
         if not record:
             return False
 
+        before = self.__snapshot(record)
         match field:
             case "phone":
                 initial_len = len(record.phones)
-                record.phones = [p for p in record.phones if str(p) != value]
-                return len(record.phones) < initial_len
+                record.phones = [p for p in record.phones if p != value]
+                removed = len(record.phones) < initial_len
 
             case "email":
                 initial_len = len(getattr(record, "emails", []))
                 record.emails = [
                     e for e in getattr(record, "emails", []) if str(e) != value
                 ]
-                return len(record.emails) < initial_len
+                removed = len(record.emails) < initial_len
 
             case "tag":
                 initial_len = len(getattr(record, "tags", []))
                 record.tags = [
                     t for t in getattr(record, "tags", []) if str(t) != value
                 ]
-                return len(record.tags) < initial_len
+                removed = len(record.tags) < initial_len
 
             case _:
                 return False
 
+        if removed:
+            self.__commit(f"remove {field} of {name}", before, record)
+        return removed
+
     @error_handler
     def remove_contact(self, name: str | None) -> bool:
-        save_undo_state(self.book)
-        global UNDONE
-        UNDONE = True
-
         record = self.book.find(name)
         if not record:
             return False
 
         # Find the actual key that was used to store this contact
-        for key, rec in self.book.data.items():
-            if rec is record:
-                del self.book.data[key]
-                return True
+        key = self.book.key_of(record)
+        if key is None:
+            return False
 
-        return False
+        self.book.delete(key)
+        # The record left the book, nothing else refers to it
+        self.book.history.push(f"remove {name}", (key, record), None)
+        return True
 
     def export_contacts_to_csv(self, args: list[str]):
+        # csv and the export code are loaded on first use, not at startup
+        from utils.export_import import export_contacts_to_csv
+
         if args:
             export_contacts_to_csv(self.book, args)
         else:
             export_contacts_to_csv(self.book)
 
     def import_contacts_to_csv(self, args: list[str]):
+        from utils.export_import import import_contacts_from_csv
+
         if args:
             import_contacts_from_csv(self.book, args)
         else:
@@ -0,0 +1,137 @@
+"""
+Trigram Index
+=============
+
+Purpose:
+--------
+Narrows substring and regex searches the way code-search engines do: every
+text is split into overlapping 3-character grams, and each gram keeps a
+posting list of the texts containing it. A query is turned into the literals
+every match must contain, and only the texts having all their trigrams are
+verified with the real substring test or regex.
+
+Posting lists are compact `array("I")` of text ids in ascending order. An
+edited text gets a new id and the old one is left as a tombstone; the index is
+rebuilt from its source once most of the ids are stale.
+
+Usage Example:
+--------------
+    index = TrigramIndex(lambda: {"john": "john 0671234567"})
+    index.candidates(required_literals(r"john\\s+\\d+"))  # ['john']
+    index.candidates(["jo"])  # None, too short to narrow anything
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Mapping
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+GRAM = 3
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i : i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def required_literals(pattern: str) -> list[str]:
+    """Literal runs every match of the regex must contain (lower-cased)."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+    literals = []
+    _collect(parsed, literals)
+    return [literal.lower() for literal in literals if len(literal) >= GRAM]
+
+
+def _collect(items: Iterable, literals: list[str]):
+    run = []
+    for op, value in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(value))
+            continue
+        # Anything else ends the current run of plain characters
+        if run:
+            literals.append("".join(run))
+            run = []
+        if op is sre_parse.SUBPATTERN:
+            _collect(value[-1], literals)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and value[0] >= 1:
+            # Repeated at least once, so its own literals are required
+            _collect(value[2], literals)
+        # Branches, optional parts and classes can't require anything
+    if run:
+        literals.append("".join(run))
+
+
+class TrigramIndex:
+    def __init__(self, source: Callable[[], Mapping[str, str]]):
+        self.source = source
+        self.postings: dict[str, array] | None = None
+        self.ids: dict[str, int] = {}
+        self.keys: list[str | None] = []
+
+    @property
+    def is_built(self) -> bool:
+        return self.postings is not None
+
+    def build(self):
+        self.postings = {}
+        self.ids = {}
+        self.keys = []
+        for key, text in self.source().items():
+            self.__insert(key, text)
+
+    def add(self, key: str, text: str):
+        if not self.is_built:
+            return
+        self.discard(key)
+        self.__insert(key, text)
+
+    def discard(self, key: str):
+        if not self.is_built:
+            return
+        id = self.ids.pop(key, None)
+        if id is not None:
+            self.keys[id] = None
+
+    def candidates(self, literals: list[str]) -> list[str] | None:
+        """Keys of the texts having every trigram of the literals.
+
+        None means the literals are too short to narrow the search.
+        """
+        grams = set()
+        for literal in literals:
+            grams |= trigrams(literal)
+        if not grams:
+            return None
+        if not self.is_built or len(self.ids) * 2 < len(self.keys):
+            # First search, or most ids are tombstones of edited texts
+            self.build()
+
+        lists = sorted((self.postings.get(gram, array("I")) for gram in grams), key=len)
+        keys = []
+        for id in lists[0]:
+            key = self.keys[id]
+            if key is not None and all(_contains(ids, id) for ids in lists[1:]):
+                keys.append(key)
+        return keys
+
+    def __insert(self, key: str, text: str):
+        id = len(self.keys)
+        self.keys.append(key)
+        self.ids[key] = id
+        for gram in trigrams(text):
+            ids = self.postings.get(gram)
+            if ids is None:
+                ids = self.postings[gram] = array("I")
+            ids.append(id)
+
+
+def _contains(ids: array, id: int) -> bool:
+    i = bisect_left(ids, id)
+    return i < len(ids) and ids[i] == id
@@ -1,19 +1,96 @@
+"""
+Multi-level undo/redo for ContactsBook
+======================================
+
+Instead of pickling the whole book before every edit, each change keeps only
+the affected record before and after the change. Undo puts the "before" copy
+back, redo puts the "after" copy back, so every step costs O(record size)
+no matter how big the book is. Both stacks are bounded by `UNDO_LIMIT`.
+
+The history can be saved on exit, so undo also works after a restart.
+
+Usage example:
+
+    before = (key, deepcopy(record))
+    record.add_phone("0671234567")
+    book.history.push("add phone", before, (key, deepcopy(record)))
+    book.history.undo(book)
+"""
+
 import pickle
+from collections import deque, namedtuple
+from copy import deepcopy
 from pathlib import Path
 
 UNDO_FILE = Path("data/undo_state.pkl")
+UNDO_LIMIT = 100
+
+# before/after are (key, record copy) pairs, None when the record didn't exist
+Change = namedtuple("Change", ["description", "before", "after"])
+
+
+class UndoHistory:
+    def __init__(self, limit: int = UNDO_LIMIT):
+        self.done: deque[Change] = deque(maxlen=limit)
+        self.undone: deque[Change] = deque(maxlen=limit)
+
+    def push(self, description: str, before: tuple | None, after: tuple | None):
+        # A change without its record key couldn't be undone or redone
+        if any(state is not None and state[0] is None for state in (before, after)):
+            raise ValueError(f"Change {description!r} has no record key")
+        self.done.append(Change(description, before, after))
+        self.undone.clear()
+
+    def undo(self, book, steps: int = 1) -> list[Change]:
+        changes = []
+        while self.done and len(changes) < steps:
+            change = self.done.pop()
+            apply_state(book, remove=change.after, put=change.before)
+            self.undone.append(change)
+            changes.append(change)
+        return changes
+
+    def redo(self, book, steps: int = 1) -> list[Change]:
+        changes = []
+        while self.undone and len(changes) < steps:
+            change = self.undone.pop()
+            apply_state(book, remove=change.before, put=change.after)
+            self.done.append(change)
+            changes.append(change)
+        return changes
+
+    def clear(self):
+        self.done.clear()
+        self.undone.clear()
 
+    def save(self, filename=UNDO_FILE):
+        """Saves the history, it holds only the records that were changed."""
+        filename = Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, "wb") as file:
+            pickle.dump((list(self.done), list(self.undone)), file)
 
-def save_undo_state(book):
-    """Saves the current state of the address book before modification."""
-    UNDO_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(UNDO_FILE, "wb") as f:
-        pickle.dump(book, f)
+    def load(self, filename=UNDO_FILE):
+        """Restores the history of the previous session, ignoring unknown files."""
+        try:
+            with open(filename, "rb") as file:
+                state = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return
+        # Before the history the file held a pickled copy of the whole book
+        if not isinstance(state, tuple):
+            return
+        done, undone = state
+        self.done.extend(Change(*change) for change in done)
+        self.undone.extend(Change(*change) for change in undone)
 
 
-def load_undo_state():
-    """Restores the last saved state of the address book."""
-    if not UNDO_FILE.exists():
-        return None
-    with open(UNDO_FILE, "rb") as f:
-        return pickle.load(f)
+def apply_state(book, remove: tuple | None, put: tuple | None):
+    if remove is not None:
+        key, _ = remove
+        if key in book.data:
+            book.delete(key)
+    if put is not None:
+        key, record = put
+        # The history keeps its own copy, later edits must not change it
+        book.put_record(key, deepcopy(record))
@@ -13,7 +13,7 @@ class NameValidator(Validator):
         name = document.text.strip()
         if not name:
             raise ValidationError(message="Name cannot be empty.")
-        if name.lower() in (k.lower() for k in self.book.data.keys()):
+        if self.book.find(name) is not None:
             raise ValidationError(message=f"Contact '{name}' already exists.")
 
 
@@ -29,15 +29,8 @@ class PhoneValidator(Validator):
         if not is_valid_phone(phone):
             raise ValidationError(message="Invalid phone number format.")
 
-        if self.book:
-            for record in self.book.data.values():
-                if any(
-                    normalize_phone(p.value) == normalize_phone(phone)
-                    for p in record.phones
-                ):
-                    raise ValidationError(
-                        message=f"Phone number '{phone}' already exists."
-                    )
+        if self.book and self.book.is_phone_owned(phone):
+            raise ValidationError(message=f"Phone number '{phone}' already exists.")
 
 
 class EmailValidator(Validator):
@@ -48,10 +41,8 @@ class EmailValidator(Validator):
         email = document.text.strip()
         if email and not is_valid_email(email):
             raise ValidationError(message="Invalid email format.")
-        if self.book and email:
-            for record in self.book.data.values():
-                if any(e.value == email for e in getattr(record, "emails", [])):
-                    raise ValidationError(message=f"Email '{email}' already exists.")
+        if self.book and email and self.book.is_email_owned(email):
+            raise ValidationError(message=f"Email '{email}' already exists.")
 
 
 class BirthdayValidator(Validator):
@@ -103,7 +94,21 @@ def is_valid_email(email: str) -> bool:
     return re.match(r"[^@]+@[^@]+\.[^@]+", email) is not None
 
 
-# Normalize phone for the search and other needs
-def normalize_phone(p: str) -> str:
-    """Remove spaces, +38, and keep only digits"""
-    return re.sub(r"\D", "", p)[-10:]  # Keep last 9 digits (like 0671234567)
+NON_DIGITS = re.compile(r"\D")
+
+
+# What the phone pattern lets precede the national 0XXXXXXXXX, plus the
+# international 00 dialing prefix
+PHONE_PREFIXES = ("", "3", "8", "38", "0038")
+
+
+def canonical_phone(phone: str) -> int | None:
+    """
+    E.164 digits of a phone as an int whatever its formatting, None if it
+    isn't a Ukrainian number: '+38 (067) 123-45-67' -> 380671234567
+    """
+    digits = NON_DIGITS.sub("", str(phone))
+    national, prefix = digits[-10:], digits[:-10]
+    if len(national) != 10 or national[0] != "0" or prefix not in PHONE_PREFIXES:
+        return None
+    return int("38" + national)
@@ -1,15 +1,29 @@
+import os
 import pickle
 from collections import namedtuple
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 
+from common import TagRegistry
 from contacts import ContactsBook
+from contacts.SqliteContactsBook import SqliteContactsBook
+from contacts.undo import UNDO_FILE
 from notes import Notes
-from output import output_error
+from notes.SqliteNotes import SqliteNotes
+from output import output_error, output_info
+from storage import JOURNAL_FILE, Journal
+from storage.snapshot import SNAPSHOT_FILE, SnapshotError, dump_books, load_books
+from storage.sqlite import SQLITE_FILE, connect, deferred_sync
+
+CONTACTS_FILE = "contacts_book.pkl"
+NOTES_FILE = "notes_book.pkl"
 
 
 def save_data(data, filename=""):
-    with open(filename, "wb") as file:
+    # Write next to the target first, so a crash never leaves a half-written book
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, "wb") as file:
         pickle.dump(data, file)
+    os.replace(tmp_filename, filename)
 
 
 def load_data(filename=""):
@@ -30,20 +44,109 @@ def load_data(filename=""):
         return None
 
 
+def load_snapshot(snapshot_file=SNAPSHOT_FILE) -> tuple[ContactsBook, Notes]:
+    if os.path.exists(snapshot_file):
+        try:
+            return load_books(snapshot_file)
+        except SnapshotError as error:
+            output_error(f"{error}. Falling back to the pickled books.")
+
+    # Books saved before the binary snapshot format
+    book = load_data(CONTACTS_FILE) or ContactsBook()
+    notes = load_data(NOTES_FILE) or Notes()
+    return book, notes
+
+
+def migrate_to_sqlite(book: SqliteContactsBook, notes: SqliteNotes, journal_file):
+    """One-shot copy of the file books (with their journal) into SQLite."""
+    if not any(map(os.path.exists, (SNAPSHOT_FILE, CONTACTS_FILE, NOTES_FILE))):
+        return
+
+    old_book, old_notes = load_snapshot()
+    Journal(journal_file).replay(old_book, old_notes)
+
+    book.replace_data(old_book.data)
+    for id, note in old_notes.data.items():
+        notes.restore_entry(id, note)
+    output_info(
+        f"Migrated {len(old_book.data)} contacts and {len(old_notes.data)} notes to SQLite."
+    )
+
+
 @contextmanager
-def data_cxt_mngr():
+def data_cxt_mngr(
+    journal_file=JOURNAL_FILE, storage="file", undo_file=UNDO_FILE, deferred=False
+):
+    """
+    Loads the books and saves them on exit. `deferred` (batch mode) syncs the
+    changes to disk once, at the end, instead of after every command.
+    """
+    if storage == "sqlite":
+        with sqlite_cxt_mngr(
+            journal_file, undo_file=undo_file, deferred=deferred
+        ) as loaded_data:
+            yield loaded_data
+        return
+
     book = None
     notes = None
-    loaded_data = namedtuple("LoadedData", ["book", "notes"])
+    journal = None
+    loaded_data = namedtuple("LoadedData", ["book", "notes", "journal"])
+
+    def save_snapshot():
+        dump_books(book, notes, SNAPSHOT_FILE)
+
+    try:
+        book, notes = load_snapshot()
+
+        # Snapshot + everything that was changed after it
+        replayed = Journal(journal_file, snapshot=save_snapshot)
+        replayed.replay(book, notes)
+        journal = book.journal = notes.journal = replayed
+        book.tag_registry = notes.tag_registry = TagRegistry()
+        book.history.load(undo_file)
+        with journal.deferred() if deferred else nullcontext():
+            yield loaded_data(book, notes, journal)
+    except Exception as error:
+        print(f"An error occurred: {error}")
+        raise
+    finally:
+        # Everything is already in the journal, it's folded into a snapshot
+        # only when it grew big enough
+        if journal is not None:
+            book.history.save(undo_file)
+            journal.close()
+
+
+@contextmanager
+def sqlite_cxt_mngr(
+    journal_file=JOURNAL_FILE,
+    sqlite_file=SQLITE_FILE,
+    undo_file=UNDO_FILE,
+    deferred=False,
+):
+    loaded_data = namedtuple("LoadedData", ["book", "notes", "journal"])
+    is_new = not os.path.exists(sqlite_file)
+    connection = connect(sqlite_file)
+    # Set once the previous history was read, it's saved back from then on
+    history = None
     try:
-        book = load_data("contacts_book.pkl") or ContactsBook()
-        notes = load_data("notes_book.pkl") or Notes()
-        yield loaded_data(book, notes)
+        book = SqliteContactsBook(connection)
+        notes = SqliteNotes(connection)
+        book.tag_registry = notes.tag_registry = TagRegistry()
+        if is_new:
+            migrate_to_sqlite(book, notes, journal_file)
+        else:
+            book.history.load(undo_file)
+        history = book.history
+        # Every change is committed right away, no journal needed
+        with deferred_sync(connection) if deferred else nullcontext():
+            yield loaded_data(book, notes, None)
     except Exception as error:
         print(f"An error occurred: {error}")
         raise
     finally:
-        if book is not None:
-            save_data(book, "contacts_book.pkl")
-        if notes is not None:
-            save_data(notes, "notes_book.pkl")
+        # Like the file books: the history is kept even if the session failed
+        if history is not None:
+            history.save(undo_file)
+        connection.close()
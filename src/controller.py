@@ -13,8 +13,6 @@ from contacts import cntcts_controller
 from context import data_cxt_mngr
 from notes import notes_controller
 from output import output_warning
-from output.help_ import show_help_ascii_tree, show_help_panels
-from tests.test_contacts import run_all_tests
 
 console = Console()
 
@@ -38,6 +36,8 @@ COMMAND_TREE = {
         "phone",
         "change",
         "all",
+        "next",
+        "prev",
         "birthdays",
         "show-birthday",
         "remove",
@@ -48,6 +48,7 @@ COMMAND_TREE = {
         "remove birthday",
         "remove tags",
         "undo",
+        "redo",
         "find",
         "show",
         "sort name",
@@ -58,8 +59,18 @@ COMMAND_TREE = {
         "sort tags",
         "export",
         "import",
+        "ingest-photos",
+    ],
+    "notes": [
+        "create",
+        "edit",
+        "add-tags",
+        "remove",
+        "find",
+        "search",
+        "all",
+        "export",
     ],
-    "notes": ["create", "edit", "add-tags", "remove", "find", "all", "export"],
     "help": [],
     "help-tree": [],
     "test-contacts": [],
@@ -67,9 +78,6 @@ COMMAND_TREE = {
     "close": [],
 }
 
-global UNDONE
-UNDONE = False
-
 MATRIX_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890@#$%^&*()"
 
 # Optional styling (make suggestions gray)
@@ -151,8 +159,7 @@ def type_out_rich(text: Text, delay=0.03):
     print()
 
 
-def bootstrap():
-    init()
+def intro():
     matrix_rain(duration=3)
 
     type_out_rich(Text("Wake up, Neo...", style="bold green"))
@@ -164,12 +171,19 @@ def bootstrap():
     type_out_rich(Text("Follow the white rabbit.", style="bold green"))
     time.sleep(2)
 
+
+def bootstrap(storage="file", fast=False):
+    init()
+    # Fast start goes straight to the prompt, without the intro animation
+    if not fast:
+        intro()
+
     print()
     print(f"🔵 {Fore.GREEN}Welcome to the Matrix CLI Mode{Fore.GREEN} 🔵")
     print()
 
     # print(f"{Fore.BLUE}**** Welcome to the assistant bot! ****{Fore.RESET}")
-    with data_cxt_mngr() as (book, notes):
+    with data_cxt_mngr(storage=storage) as (book, notes, _):
         contacts_controller = cntcts_controller(book)
         nts_controller = notes_controller(notes)
 
@@ -207,11 +221,18 @@ def bootstrap():
                             nts_controller(*args)
                         else:
                             nts_controller("all")
+                    # Help and tests are loaded on first use, not at startup
                     case "help":
+                        from output.help_ import show_help_panels
+
                         show_help_panels()
                     case "help-tree":
+                        from output.help_ import show_help_ascii_tree
+
                         show_help_ascii_tree()
                     case "test-contacts":
+                        from tests.test_contacts import run_all_tests
+
                         run_all_tests()
                     case _:
                         output_warning(
@@ -0,0 +1,153 @@
+"""
+Books daemon
+============
+
+Loads the books once and serves `contacts` and `notes` commands over a Unix
+socket, so a one-shot command doesn't load and save the books itself:
+
+    python main.py --daemon &
+    python main.py contacts find ivan
+    python main.py --format tsv contacts all
+
+A request is one JSON line, `{"command": "contacts find ivan", "format":
+"plain"}`, the answer one JSON line, `{"ok": true, "output": "...",
+"errors": "..."}` with what the command wrote to stdout and to stderr.
+
+Connections are served by asyncio. The commands themselves run one at a
+time, in the order they came in, on a single worker thread, which also
+opens, saves and closes the books: clients never step on each other and the
+event loop keeps accepting connections while a command runs. Like in batch
+mode nothing is asked, a command missing an argument fails.
+
+The journal is synced in the background every `SAVE_INTERVAL` seconds, not
+after every change, and once more on SIGINT/SIGTERM. SQLite books commit
+every change anyway.
+"""
+
+import asyncio
+import json
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from batch import make_controllers, run_command
+from client import SOCKET_FILE, is_running
+from context import data_cxt_mngr
+from output import FORMATS, output_error, output_format, output_info, set_output_format
+from utils.session import set_interactive
+
+SAVE_INTERVAL = 5.0
+
+
+def failure(message: str) -> dict:
+    """The answer to a request no command was run for."""
+    return {"ok": False, "output": "", "errors": f"{message}\n"}
+
+
+class BooksDaemon:
+    def __init__(self, storage="file"):
+        self.storage = storage
+        # Everything touching the books runs here, one thing at a time
+        self.worker = ThreadPoolExecutor(max_workers=1)
+        self.books = ExitStack()
+        self.controllers = None
+        self.journal = None
+
+    def open(self):
+        book, notes, self.journal = self.books.enter_context(
+            data_cxt_mngr(storage=self.storage, deferred=self.storage == "file")
+        )
+        self.controllers = make_controllers(book, notes)
+
+    def execute(self, command: str, format_name: str) -> dict:
+        """Runs one command, with the client's output format, and captures it."""
+        if format_name not in FORMATS:
+            return failure(f"Unknown output format {format_name!r}")
+        previous = output_format()
+        output, errors = StringIO(), StringIO()
+        set_output_format(format_name)
+        try:
+            # tsv writes its messages to stderr, the client gets both back
+            with redirect_stdout(output), redirect_stderr(errors):
+                ok = run_command(self.controllers, command)
+        finally:
+            set_output_format(previous)
+        return {"ok": ok, "output": output.getvalue(), "errors": errors.getvalue()}
+
+    def save(self):
+        if self.journal is not None:
+            self.journal.flush()
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.worker, func, *args)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            line = await reader.readline()
+            if line:  # Nothing is sent by `is_running` checks
+                answer = await self.answer(line)
+                writer.write(json.dumps(answer, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass  # The client is gone, nobody to answer
+        finally:
+            writer.close()
+
+    async def answer(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            command = request["command"]
+            if not command.split():
+                raise ValueError("empty command")
+            format_name = request.get("format", "rich")
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return failure(f"Bad request: {error}")
+        return await self.run(self.execute, command, format_name)
+
+    async def save_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.run(self.save)
+
+    async def serve(
+        self,
+        socket_file: str | Path = SOCKET_FILE,
+        save_interval: float = SAVE_INTERVAL,
+        stop: asyncio.Event | None = None,
+    ):
+        """Serves until `stop` is set, or until SIGINT/SIGTERM without one."""
+        socket_file = Path(socket_file)
+        if stop is None:
+            stop = asyncio.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+
+        await self.run(self.open)
+        # A socket left behind by a daemon that was killed
+        socket_file.unlink(missing_ok=True)
+        socket_file.parent.mkdir(parents=True, exist_ok=True)
+        server = await asyncio.start_unix_server(self.handle, path=str(socket_file))
+        saver = asyncio.create_task(self.save_periodically(save_interval))
+        try:
+            await stop.wait()
+        finally:
+            saver.cancel()
+            server.close()
+            await server.wait_closed()
+            socket_file.unlink(missing_ok=True)
+            # The books are saved and closed by the thread that opened them
+            await self.run(self.books.close)
+            self.worker.shutdown()
+
+
+def run_daemon(storage="file", socket_file: str | Path = SOCKET_FILE) -> int:
+    if is_running(socket_file):
+        output_error(f"A daemon is already serving the books on {socket_file}.")
+        return 1
+    set_interactive(False)
+    output_info(f"Serving the books on {socket_file}, stop with Ctrl+C.")
+    asyncio.run(BooksDaemon(storage).serve(socket_file))
+    return 0
@@ -1,14 +1,15 @@
 from functools import wraps
 
-from colorama import Fore, Style
-
 from exceptions import (
+    CommandFailed,
     FieldNotFound,
     WrongPhoneNumber,
     NoteNotFoundError,
     InvalidDaysInput,
     WrongFileName,
 )
+from output import output_error
+from utils.session import is_interactive
 
 
 def error_handler(func):
@@ -16,19 +17,24 @@ def error_handler(func):
     def wrap(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except CommandFailed:
+            raise  # Already shown, the batch stops at this command
+        # Through the output sink: with --format tsv|jsonl the errors follow
+        # the same rule as every other message
         except KeyError:
-            print(f"{Fore.RED}Missing name or phone number.{Style.RESET_ALL}")
+            output_error("Missing name or phone number.")
         except ValueError:
-            print(f"{Fore.RED}Wrong arguments values.{Style.RESET_ALL}")
+            output_error("Wrong arguments values.")
         except IndexError:
-            print(
-                f"{Fore.RED}Some arguments was not provided. {Fore.RESET}Please provide {Fore.CYAN}[name]{Fore.RESET} and {Fore.CYAN}[phone]{Fore.RESET}. Example: "
-                f"{Fore.CYAN}add John +380112223344{Style.RESET_ALL}"
+            output_error(
+                "Some arguments was not provided. Please provide [name] and "
+                "[phone]. Example: add John +380112223344"
             )
-        except WrongPhoneNumber as error:
-            print(error)
-        except FieldNotFound as error:
-            print(error)
+        # These were shown when they were raised
+        except WrongPhoneNumber:
+            pass
+        except FieldNotFound:
+            pass
         except NoteNotFoundError:
             pass
         except InvalidDaysInput as error:
@@ -36,6 +42,9 @@ def error_handler(func):
         except WrongFileName as error:
             pass
         except Exception as error:
-            print("Unexpected error:", error)
+            output_error(f"Unexpected error: {error}")
+        # Only reached after an error was reported, a batch doesn't go on
+        if not is_interactive():
+            raise CommandFailed(func.__name__)
 
     return wrap
@@ -0,0 +1,2 @@
+class CommandFailed(Exception):
+    """Stops a batch at the failing command, its error is already shown."""
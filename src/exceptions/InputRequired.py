@@ -0,0 +1,12 @@
+from output import output_error
+
+from .CommandFailed import CommandFailed
+
+
+class InputRequired(CommandFailed):
+    def __init__(self, question: str):
+        output_error(
+            f"Input required: {question.strip()} "
+            "Give the command all its arguments, nothing can be asked here."
+        )
+        super().__init__(question)
@@ -0,0 +1,7 @@
+from output import output_error
+
+
+class RecordAlreadyExists(Exception):
+    def __init__(self, message="Record already exists"):
+        self.message = output_error(message)
+        super().__init__(self.message)
@@ -1,8 +1,11 @@
+from .CommandFailed import CommandFailed
 from .EmailAlreadyOwned import EmailAlreadyOwned
 from .FieldNotFound import FieldNotFound
+from .InputRequired import InputRequired
 from .InvalidDaysInput import InvalidDaysInput
 from .NoteNotFoundError import NoteNotFoundError
 from .PhoneAlreadyOwned import PhoneAlreadyOwned
+from .RecordAlreadyExists import RecordAlreadyExists
 from .RecordNotFound import RecordNotFound
 from .TagNotFound import TagNotFound
 from .WrongDateFormat import WrongDateFormat
@@ -15,6 +18,7 @@ __all__ = [
     "WrongPhoneNumber",
     "FieldNotFound",
     "RecordNotFound",
+    "RecordAlreadyExists",
     "WrongDateFormat",
     "PhoneAlreadyOwned",
     "NoteNotFoundError",
@@ -23,4 +27,6 @@ __all__ = [
     "TagNotFound",
     "NoteNotFoundError",
     "WrongFileName",
+    "CommandFailed",
+    "InputRequired",
 ]
@@ -1,8 +1,91 @@
-from controller import bootstrap
+import argparse
+import io
+import sys
+
+from client import DaemonNotRunning, is_running, send
+from output import FORMATS, set_output_format
+
+
+def run_once(command: str, storage: str, output_format: str) -> int:
+    """Runs one command by the daemon, or right here if none is running."""
+    try:
+        answer = send(command, output_format)
+    except DaemonNotRunning:
+        from batch import run_batch
+
+        set_output_format(output_format)
+        return run_batch(io.StringIO(command), storage=storage, report=None)
+    sys.stdout.write(answer["output"])
+    sys.stderr.write(answer.get("errors", ""))
+    return 0 if answer["ok"] else 1
 
 
 def main():
-    bootstrap()
+    parser = argparse.ArgumentParser(description="CLI Bot: Phone Book & Notes")
+    parser.add_argument(
+        "--storage",
+        choices=["file", "sqlite"],
+        default="file",
+        help="where books are kept (sqlite migrates existing books once)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="rich",
+        help="rich tables and panels, or plain/tsv/jsonl lines for scripting",
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="skip the intro animation and go straight to the prompt",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        type=argparse.FileType("r", encoding="utf-8"),
+        help="run the commands of FILE ('-' for stdin) without prompting, "
+        "piped stdin is run the same way",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep the books loaded and serve commands over a Unix socket",
+    )
+    parser.add_argument(
+        "command",
+        nargs=argparse.REMAINDER,
+        help="a contacts or notes command to run once, by the daemon if it's up",
+    )
+    args = parser.parse_args()
+    # Imported only by the mode that needs them, a one-shot command sent to
+    # the daemon loads neither the app nor the books
+    if args.command:
+        sys.exit(run_once(" ".join(args.command), args.storage, args.format))
+    set_output_format(args.format)
+    if args.daemon:
+        from daemon import run_daemon
+
+        sys.exit(run_daemon(storage=args.storage))
+    if args.batch is None and not sys.stdin.isatty():
+        args.batch = sys.stdin
+    if args.batch is not None:
+        from batch import run_batch
+
+        sys.exit(run_batch(args.batch, storage=args.storage))
+
+    if is_running():
+        # Two sessions would write the same journal, the daemon's wins
+        from output import output_error
+
+        output_error(
+            "A daemon is serving the books, stop it first or send it the "
+            "commands: main.py contacts all"
+        )
+        sys.exit(1)
+
+    from controller import bootstrap
+
+    bootstrap(storage=args.storage, fast=args.fast)
 
 
 if __name__ == "__main__":
@@ -8,6 +8,8 @@ from .NotesFields import Context, Date, Title
 
 
 class Note:
+    __slots__ = ("title", "context", "tags", "created_at", "updated_at", "__id")
+
     def __init__(self, title: str = "Without title", context: str = ""):
         self.title: Title = Title(title)
         self.context: Context = Context(context)        
@@ -49,8 +51,8 @@ class Note:
         self.updated_at.date = dtdt.now()
 
     def add_tag(self, tag: str):
-        if tag.lower() not in [tag.value for tag in self.tags]:
-            self.tags.append(Tag(tag.lower()))
+        if Tag(tag) not in self.tags:
+            self.tags.append(Tag(tag))
         else:
             print(f"[INFO]: The note with title '{self.tags}' already has such tag!")
 
@@ -75,5 +77,25 @@ class Note:
                     f"[INFO]: The note with title '{self.title}' doesn't have such tag!"
                 )
 
+    def __getstate__(self):
+        return {
+            "title": self.title,
+            "context": self.context,
+            "tags": self.tags,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            # Same key as in the __dict__ of the notes pickled before __slots__
+            "_Note__id": self.__id,
+        }
+
+    def __setstate__(self, state: dict):
+        self.title = state["title"]
+        self.context = state["context"]
+        # Tags pickled before interning come back as separate copies
+        self.tags = [Tag(str(tag)) for tag in state["tags"]]
+        self.created_at = state["created_at"]
+        self.updated_at = state["updated_at"]
+        self.__id = state["_Note__id"]
+
     def __str__(self):
         return f"{Fore.LIGHTBLUE_EX}{self.title}{Fore.RESET}: {self.context} {self.tags} {self.created_at} {self.updated_at}"
@@ -12,8 +12,12 @@ Usage example:
     To find a note-objects in the Notes by id, text or tag:
     notes.find_notes_by_id([note-id])
     notes.find_notes_by_query([some text in note])
+    notes.find_notes_by_query('"buy milk" OR bread')
     notes.find_notes_by_tag([tag from Tag-object])
 
+    To get the most relevant notes first, with snippets:
+    notes.rank_notes("milk bread", limit=10)
+
     To delete a note-objects from the Notes by id or title:
     notes.delete_note_by_id([note-id])
 
@@ -25,71 +29,115 @@ from typing import Dict
 
 from colorama import Fore
 
+from common import TagRegistry
 from exceptions import NoteNotFoundError
+from storage import NOTES
 
+from .fulltext import Hit, NotesIndex
 from .Note import Note
 
 
 class Notes(UserDict):
+    # Write-ahead journal attached by the data context manager (never pickled)
+    journal = None
+    # Full-text index, built on the first search (never pickled)
+    _index = None
+    # Shared with the contacts by the data context manager (never pickled)
+    _tags = None
+
     def __init__(self):
         self.__notes_counter = 0
         self.data: Dict[str, Note] = {}
 
+    @property
+    def index(self) -> NotesIndex:
+        if self._index is None:
+            self._index = NotesIndex(self.data)
+        return self._index
+
+    @property
+    def tag_registry(self) -> TagRegistry:
+        if self._tags is None:
+            self.tag_registry = TagRegistry()
+        return self._tags
+
+    @tag_registry.setter
+    def tag_registry(self, registry: TagRegistry):
+        registry.attach(NOTES, self.data)
+        self._tags = registry
+
+    @property
+    def notes_counter(self) -> int:
+        return self.__notes_counter
+
+    @notes_counter.setter
+    def notes_counter(self, value: int):
+        self.__notes_counter = value
+
     def add_note(self, note: Note):
         self.__notes_counter += 1
         note.id = self.__notes_counter
         self.data[str(self.__notes_counter)] = note
+        self._reindex(str(note.id))
+        if self.journal:
+            self.journal.put(NOTES, str(note.id), note)
+
+    def touch(self, note: Note):
+        """Must be called after a note stored in the notebook was changed in place."""
+        self._reindex(str(note.id))
+        if self.journal and str(note.id) in self.data:
+            self.journal.put(NOTES, str(note.id), note)
+
+    # Journal replay hooks
+    def restore_entry(self, id: str, note: Note):
+        self.data[id] = note
+        self.__notes_counter = max(self.__notes_counter, int(id))
+        self._reindex(id)
+
+    def discard_entry(self, id: str):
+        self.data.pop(id, None)
+        self._reindex(id)
+
+    def _reindex(self, id: str):
+        if self._tags is not None:
+            self._tags.update(NOTES, id, self.data.get(id))
+        if self._index is None:
+            return
+        if id in self.data:
+            self._index.add(id, self.data[id])
+        else:
+            self._index.discard(id)
+
+    def __select(self, ids: list[str]) -> dict:
+        return {id: self.data[id] for id in ids}
 
     def find_notes_by_id(self, id: str) -> dict | None:
         if id in self.data.keys():
             return {id: self.data[id]}
 
     def find_notes_by_context(self, query: str) -> dict:
-        query = query.lower()
-        result = [
-            (id, note)
-            for id, note in self.data.items()
-            if query in note.context._value.lower()
-        ]
-        return dict(result)
+        return self.__select(self.index.search(query, fields=("context",)))
 
     def find_notes_by_query(self, query: str) -> dict:
-        query = query.lower()
-        result = [
-            (id, note)
-            for id, note in self.data.items()
-            if query
-            in " ".join(
-                [
-                    note.title._value,
-                    note.context._value,
-                    " ".join([tag._value for tag in note.tags]),
-                ]
-            ).lower()
-        ]
-        return dict(result)
+        return self.__select(self.index.search(query))
 
     def find_notes_by_title(self, query: str) -> dict:
-        query = query.lower()
-        result = [
-            (id, note)
-            for id, note in self.data.items()
-            if query in note.title._value.lower()
-        ]
-        return dict(result)
+        return self.__select(self.index.search(query, fields=("title",)))
 
     def find_notes_by_tag(self, tag: str) -> dict:
-        tag = tag.lower()
-        result = [
-            (id, note)
-            for id, note in self.data.items()
-            if tag in " ".join([tag._value for tag in note.tags]).lower()
-        ]
-        return dict(result)
+        """Notes having a tag that starts with the given one."""
+        ids = self.tag_registry.find_prefix(NOTES, tag)
+        return self.__select(sorted(ids, key=int))
+
+    def rank_notes(self, query: str, limit: int | None = 10) -> list[Hit]:
+        return self.index.rank(query, limit)
 
     def delete_note_by_id(self, id: str):
         if id in self.data.keys():
             self.data.pop(id)
+            self._reindex(id)
+            if self.journal:
+                self.journal.delete(NOTES, id)
         else:
             raise NoteNotFoundError
 
@@ -108,4 +156,7 @@ class Notes(UserDict):
     def __getstate__(self):
         state = self.__dict__.copy()
         state["__notes_counter"] = self.__notes_counter
+        state.pop("journal", None)
+        state.pop("_index", None)
+        state.pop("_tags", None)
         return state
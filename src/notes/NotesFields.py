@@ -4,10 +4,8 @@ from common import Field
 
 
 class Title(Field):
-    def __init__(self, value: str):
-        super().__init__(value)
-        self._value = value
-        self._max_length = 50
+    __slots__ = ()
+    _max_length = 50
 
     @property
     def value(self) -> str:
@@ -24,10 +22,8 @@ class Title(Field):
 
 
 class Context(Field):
-    def __init__(self, value: str):
-        super().__init__(value)
-        self._value = value
-        self._max_length = 1000
+    __slots__ = ()
+    _max_length = 1000
 
     @property
     def value(self) -> str:
@@ -44,6 +40,7 @@ class Context(Field):
 
 
 class Date:
+    __slots__ = ("__date",)
     _date_format = "%Y-%m-%d %H:%M:%S"
 
     def __init__(self, date: datetime):
@@ -59,3 +56,10 @@ class Date:
 
     def __str__(self):
         return self.__date.strftime(Date._date_format)
+
+    def __getstate__(self):
+        return {"_Date__date": self.__date}
+
+    def __setstate__(self, state: dict):
+        # Same key as the __dict__ of the Dates pickled before __slots__
+        self.__date = state["_Date__date"]
@@ -0,0 +1,236 @@
+"""
+Notes stored in SQLite
+======================
+
+Same interface as `Notes`, but `data` is a mapping over the `notes` table.
+Lower-cased title/context/tags columns are kept next to the pickled note and
+indexed by the `notes_fts` FTS5 table, so searches don't have to unpickle
+every note; the queries are translated to FTS5 and mean the same as with
+`NotesIndex`. Ranked search (`rank_notes`) orders the matches with the FTS5
+`bm25()`, weighted by the same field `BOOSTS`, and unpickles only the top-k
+notes for their snippets. Tags have their own indexed table.
+
+Usage example:
+
+    from storage.sqlite import connect
+    notes = SqliteNotes(connect("books.sqlite3"))
+    notes.find_notes_by_tag("work")
+"""
+
+import pickle
+import sqlite3
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from common.TagRegistry import normalize_tag
+from storage.sqlite import get_meta, set_meta
+
+from .fulltext import (
+    BOOSTS,
+    FIELDS,
+    Hit,
+    match_snippet,
+    parse_query,
+    query_terms,
+    token_offsets,
+)
+from .Note import Note
+from .Notes import Notes
+
+CACHE_SIZE = 1024
+FETCH_SIZE = 512
+# Bumped when the way notes are put into `notes_fts` changes
+FTS_VERSION = 1
+
+
+def fts_query(query: str, fields: tuple[str, ...] = FIELDS) -> str | None:
+    """
+    The query in the FTS5 syntax limited to the fields, None if it has no
+    terms. Every term is a prefix, like in `NotesIndex`:
+    'a "b c" OR d' -> '{title} : (("a"* AND "b"* + "c"*) OR ("d"*))'
+    """
+    groups = [
+        " AND ".join(" + ".join(f'"{term}"*' for term in phrase) for phrase in group)
+        for group in parse_query(query)
+    ]
+    if not groups:
+        return None
+    alternatives = " OR ".join(f"({group})" for group in groups)
+    return f"{{{' '.join(fields)}}} : ({alternatives})"
+
+
+class SqliteNotesMap(MutableMapping):
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.cache: OrderedDict[str, Note] = OrderedDict()
+
+    def __getitem__(self, id: str) -> Note:
+        if id in self.cache:
+            self.cache.move_to_end(id)
+            return self.cache[id]
+        row = self.connection.execute(
+            "SELECT note FROM notes WHERE id = ?", (self.__row_id(id),)
+        ).fetchone()
+        if row is None:
+            raise KeyError(id)
+        return self.__remember(id, pickle.loads(row[0]))
+
+    def __setitem__(self, id: str, note: Note):
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.write(id, note)
+        self.__remember(id, note)
+
+    def __delitem__(self, id: str):
+        deleted = self.connection.execute(
+            "DELETE FROM notes WHERE id = ?", (self.__row_id(id),)
+        ).rowcount
+        self.cache.pop(id, None)
+        if not deleted:
+            raise KeyError(id)
+
+    def __iter__(self):
+        for (id,) in self.connection.execute("SELECT id FROM notes ORDER BY id"):
+            yield str(id)
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def items(self):
+        cursor = self.connection.execute("SELECT id, note FROM notes ORDER BY id")
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            for id, blob in rows:
+                yield str(id), self.cache.get(str(id)) or pickle.loads(blob)
+
+    def values(self):
+        return (note for _, note in self.items())
+
+    def write(self, id: str, note: Note):
+        """Upserts one note with its tags, caller owns the transaction."""
+        tags = [str(tag) for tag in note.tags]
+        self.connection.execute(
+            "INSERT INTO notes (id, title, context, tags, note) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET title = excluded.title, "
+            "context = excluded.context, tags = excluded.tags, note = excluded.note",
+            (
+                self.__row_id(id),
+                str(note.title.value).lower(),
+                str(note.context.value).lower(),
+                " ".join(tags).lower(),
+                pickle.dumps(note, protocol=pickle.HIGHEST_PROTOCOL),
+            ),
+        )
+        self.connection.execute(
+            "DELETE FROM note_tags WHERE id = ?", (self.__row_id(id),)
+        )
+        self.connection.executemany(
+            "INSERT INTO note_tags (tag, id) VALUES (?, ?)",
+            [(normalize_tag(tag), self.__row_id(id)) for tag in tags],
+        )
+
+    def select(self, where: str, *params) -> dict:
+        cursor = self.connection.execute(
+            f"SELECT id, note FROM notes WHERE {where} ORDER BY id", params
+        )
+        return {
+            str(id): self.cache.get(str(id)) or pickle.loads(blob)
+            for id, blob in cursor
+        }
+
+    @staticmethod
+    def __row_id(id: str) -> int:
+        return int(id) if str(id).isdigit() else -1
+
+    def __remember(self, id: str, note: Note) -> Note:
+        self.cache[id] = note
+        self.cache.move_to_end(id)
+        if len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return note
+
+
+class SqliteNotes(Notes):
+    def __init__(self, connection: sqlite3.Connection):
+        super().__init__()
+        self.connection = connection
+        self.data: SqliteNotesMap = SqliteNotesMap(connection)
+        if get_meta(connection, "fts_version") < FTS_VERSION:
+            # Databases from before the full-text table have it empty
+            with connection:
+                connection.execute("BEGIN")
+                connection.execute(
+                    "INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')"
+                )
+                set_meta(connection, "fts_version", FTS_VERSION)
+
+    def add_note(self, note: Note):
+        # The counter lives in the database, ids are never reused
+        note.id = get_meta(self.connection, "notes_counter") + 1
+        set_meta(self.connection, "notes_counter", note.id)
+        self.data[str(note.id)] = note
+        self._reindex(str(note.id))
+
+    def touch(self, note: Note):
+        if str(note.id) in self.data:
+            self.data[str(note.id)] = note
+        self._reindex(str(note.id))
+
+    def find_notes_by_context(self, query: str) -> dict:
+        return self.__match(query, ("context",))
+
+    def find_notes_by_query(self, query: str) -> dict:
+        return self.__match(query)
+
+    def find_notes_by_title(self, query: str) -> dict:
+        return self.__match(query, ("title",))
+
+    def find_notes_by_tag(self, tag: str) -> dict:
+        """Notes having a tag that starts with the given one."""
+        prefix = normalize_tag(tag)
+        if not prefix:
+            return self.data.select("id IN (SELECT id FROM note_tags)")
+        # The tags starting with the prefix sort before the prefix with its
+        # last character bumped: one range scan of the tag index
+        end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return self.data.select(
+            "id IN (SELECT id FROM note_tags WHERE tag >= ? AND tag < ?)", prefix, end
+        )
+
+    def __match(self, query: str, fields: tuple[str, ...] = FIELDS) -> dict:
+        match = fts_query(query, fields)
+        if match is None:
+            return {}
+        return self.data.select(
+            "id IN (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?)", match
+        )
+
+    def rank_notes(self, query: str, limit: int | None = 10) -> list[Hit]:
+        match = fts_query(query)
+        if match is None:
+            return []
+        # bm25() is lower for better matches
+        cursor = self.connection.execute(
+            "SELECT rowid, -bm25(notes_fts, ?, ?, ?) AS score FROM notes_fts "
+            "WHERE notes_fts MATCH ? ORDER BY score DESC, rowid LIMIT ?",
+            (*(BOOSTS[field] for field in FIELDS), match, limit or -1),
+        )
+        terms = query_terms(query)
+        hits = []
+        for id, score in cursor.fetchall():
+            text = str(self.data[str(id)].context._value)
+            tokens, starts = token_offsets(text)
+            hits.append(Hit(str(id), score, match_snippet(text, tokens, starts, terms)))
+        return hits
+
+    def restore_entry(self, id: str, note: Note):
+        self.data[id] = note
+        if int(id) > get_meta(self.connection, "notes_counter"):
+            set_meta(self.connection, "notes_counter", int(id))
+        self._reindex(id)
+
+    def discard_entry(self, id: str):
+        self.data.pop(id, None)
+        self._reindex(id)
+
+    def __getstate__(self):
+        raise TypeError("SqliteNotes is stored in SQLite and can't be pickled")
@@ -2,5 +2,14 @@ from .controller import controller as notes_controller
 from .Note import Note
 from .Notes import Notes
 from .NotesFields import Context, Date, Title
+from .SqliteNotes import SqliteNotes
 
-__all__ = ["Note", "Notes", "Title", "Context", "Date", "notes_controller"]
+__all__ = [
+    "Note",
+    "Notes",
+    "SqliteNotes",
+    "Title",
+    "Context",
+    "Date",
+    "notes_controller",
+]
@@ -1,3 +1,5 @@
+import argparse
+
 from colorama import Fore
 
 from common.input_prompts import (
@@ -104,6 +106,20 @@ def controller(notes: Notes):
                     case _:
                         print(f"{Fore.RED}Unknown field '{field}'.{Fore.RESET}")
 
+            case "search":
+                parser = argparse.ArgumentParser(prog="notes search", add_help=False)
+                parser.add_argument("--limit", type=int, default=10)
+                try:
+                    ns, remaining = parser.parse_known_args(args)
+                except SystemExit:
+                    output_error("Usage: notes search [--limit N] [Query]")
+                    return
+                query = " ".join(remaining).strip()
+                if not query:
+                    output_error("Usage: notes search [--limit N] [Query]")
+                    return
+                notes_service.search_notes(query, limit=ns.limit)
+
             case "export":
                 notes_service.export_notes_to_folder(args)
             case "all":
@@ -0,0 +1,334 @@
+"""
+Full-text index of Notes
+========================
+
+Purpose:
+--------
+A token-level inverted index over the title, context and tags of every note:
+each field keeps `term -> {note id: positions}`, so a query is answered from
+the posting lists of its terms instead of joining and lower-casing every note
+of the notebook. Like the contacts indexes it is never pickled, it's built on
+the first search and then kept up to date from the notebook mutation hooks
+(`add_note`, `touch`, `delete_note_by_id` and the journal replay hooks).
+
+Query language:
+---------------
+    milk bread          both terms (AND)
+    milk OR bread       either of them, `or` and `|` work too
+    "buy fresh milk"    the terms next to each other in one field (phrase)
+
+Every query term matches the indexed terms it is a prefix of ("grocer" finds
+"groceries"), which keeps the search-as-you-type feel of the old substring
+search.
+
+Ranking:
+--------
+`rank` orders the matches with BM25F: the term frequencies of the fields are
+length-normalized, weighted by `BOOSTS` and saturated together, so a word in
+the title counts more than the same word deep in a long context. Only the
+top-k notes get a snippet, cut around the matched words from the token
+offsets stored by the index.
+
+Usage Example:
+--------------
+    index = NotesIndex(notes.data)
+    index.search('"buy milk" OR bread')  # ['1', '3']
+    index.search("work", fields=("tags",))  # ['2']
+    index.rank("milk", limit=1)  # [Hit(id='1', score=0.97, snippet=...)]
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import namedtuple
+from collections.abc import Iterable, Mapping
+
+from .Note import Note
+
+FIELDS = ("title", "context", "tags")
+TOKEN = re.compile(r"\w+")
+QUERY_TOKEN = re.compile(r'"([^"]*)"?|(\S+)')
+OR_WORDS = ("OR", "|")
+# BM25F parameters: field weights, tf saturation and length normalization
+BOOSTS = {"title": 3.0, "tags": 2.0, "context": 1.0}
+K1 = 1.2
+B = 0.75
+SNIPPET_WIDTH = 80
+
+# Snippet text with the (start, end) of its highlighted words
+Snippet = namedtuple("Snippet", ["text", "spans"])
+Hit = namedtuple("Hit", ["id", "score", "snippet"])
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN.findall(text.lower())
+
+
+def note_texts(note: Note) -> dict[str, str]:
+    return {
+        "title": str(note.title._value),
+        "context": str(note.context._value),
+        "tags": " ".join(str(tag) for tag in note.tags),
+    }
+
+
+def token_offsets(text: str) -> tuple[list[str], tuple[int, ...]]:
+    """Lower-cased tokens of the text and where they start in it."""
+    tokens, starts = [], []
+    for match in TOKEN.finditer(text):
+        tokens.append(match.group().lower())
+        starts.append(match.start())
+    return tokens, tuple(starts)
+
+
+def cut_snippet(
+    text: str,
+    starts: tuple[int, ...],
+    hits: list[int],
+    width: int = SNIPPET_WIDTH,
+) -> Snippet:
+    """
+    The part of the text holding most of the hit tokens (indexes into
+    `starts`, in order) within `width` characters, with the hits highlighted.
+    """
+    text = text.replace("\n", " ")
+    if not hits:
+        return Snippet(text[:width] + ("…" if len(text) > width else ""), ())
+    # Sliding window over the hits, keep the one covering most of them
+    anchor, most, first = hits[0], 0, 0
+    for last in range(len(hits)):
+        while starts[hits[last]] - starts[hits[first]] > width // 2:
+            first += 1
+        if last - first + 1 > most:
+            anchor, most = hits[first], last - first + 1
+    begin = max(0, starts[anchor] - width // 4)
+    # Don't start in the middle of a word
+    while begin > 0 and not text[begin - 1].isspace():
+        begin -= 1
+    end = min(len(text), begin + width)
+    prefix = "…" if begin else ""
+    shift = len(prefix) - begin
+    spans = []
+    for hit in hits:
+        stop = TOKEN.match(text, starts[hit]).end()
+        if begin <= starts[hit] and stop <= end:
+            spans.append((starts[hit] + shift, stop + shift))
+    suffix = "…" if end < len(text) else ""
+    return Snippet(prefix + text[begin:end] + suffix, tuple(spans))
+
+
+def match_snippet(
+    text: str, tokens: list[str], starts: tuple[int, ...], terms: Iterable[str]
+) -> Snippet:
+    """The text cut around its tokens starting with one of the terms."""
+    prefixes = tuple(terms)
+    hits = [i for i, token in enumerate(tokens) if token.startswith(prefixes)]
+    return cut_snippet(text, starts, hits)
+
+
+def parse_query(query: str) -> list[list[tuple[str, ...]]]:
+    """
+    Alternatives (OR) of groups (AND) of phrases, a bare word is a phrase of
+    one term: 'a "b c" OR d' -> [[('a',), ('b', 'c')], [('d',)]]
+    """
+    alternatives = [[]]
+    for phrase, word in QUERY_TOKEN.findall(query):
+        # The prompt lower-cases the command line, so is `or`
+        if word.upper() in OR_WORDS:
+            alternatives.append([])
+            continue
+        terms = tuple(tokenize(phrase or word))
+        if terms:
+            alternatives[-1].append(terms)
+    return [group for group in alternatives if group]
+
+
+def query_terms(query: str) -> set[str]:
+    """Every term of the query, whatever phrase or alternative it is in."""
+    return {term for group in parse_query(query) for phrase in group for term in phrase}
+
+
+class FieldIndex:
+    """Postings of one field with its terms kept sorted for prefix lookups."""
+
+    def __init__(self):
+        self.postings: dict[str, dict[str, tuple[int, ...]]] = {}
+        # Sorted on the first prefix lookup, one sort is cheaper than insorts
+        self.terms: list[str] | None = None
+        # Tokens per note and their sum, for the BM25 length normalization
+        self.lengths: dict[str, int] = {}
+        self.total_length = 0
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / len(self.lengths) if self.lengths else 0.0
+
+    def add(self, id: str, tokens: list[str]):
+        self.lengths[id] = len(tokens)
+        self.total_length += len(tokens)
+        positions = {}
+        for position, term in enumerate(tokens):
+            positions.setdefault(term, []).append(position)
+        for term, found_at in positions.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                if self.terms is not None:
+                    insort(self.terms, term)
+            self.postings[term][id] = tuple(found_at)
+
+    def discard(self, id: str, tokens: Iterable[str]):
+        self.total_length -= self.lengths.pop(id, 0)
+        for term in set(tokens):
+            notes = self.postings.get(term)
+            if notes is None:
+                continue
+            notes.pop(id, None)
+            if not notes:
+                del self.postings[term]
+                if self.terms is not None:
+                    del self.terms[bisect_left(self.terms, term)]
+
+    def matching(self, prefix: str) -> list[dict[str, tuple[int, ...]]]:
+        """Postings of every term starting with the prefix."""
+        if self.terms is None:
+            self.terms = sorted(self.postings)
+        found = []
+        start = bisect_left(self.terms, prefix)
+        for term in self.terms[start:]:
+            if not term.startswith(prefix):
+                break
+            found.append(self.postings[term])
+        return found
+
+    def count(self, terms: tuple[str, ...]) -> int:
+        """Upper bound of the notes having the phrase."""
+        return min(sum(map(len, self.matching(term))) for term in terms)
+
+    def phrase(
+        self, terms: tuple[str, ...], within: set[str] | None = None
+    ) -> set[str]:
+        """Ids of the notes having the terms one after another."""
+        postings = [self.matching(term) for term in terms]
+        if within is None:
+            # The rarest term drives, the rest is membership tests
+            rarest = min(postings, key=lambda notes: sum(map(len, notes)))
+            within = set().union(*rarest)
+            if len(postings) == 1:
+                return within
+        ids = {
+            id
+            for id in within
+            if all(any(id in notes for notes in term) for term in postings)
+        }
+        if len(terms) == 1:
+            return ids
+        return {id for id in ids if self.__adjacent(id, postings)}
+
+    @staticmethod
+    def __adjacent(id: str, postings: list[list[dict]]) -> bool:
+        positions = [
+            {position for notes in term for position in notes.get(id, ())}
+            for term in postings
+        ]
+        return any(
+            all(start + i in found for i, found in enumerate(positions))
+            for start in positions[0]
+        )
+
+
+class NotesIndex:
+    def __init__(self, data: Mapping[str, Note]):
+        self.data = data
+        # Both are None until the first search
+        self.fields: dict[str, FieldIndex] | None = None
+        # Tokens every note was indexed under with their offsets, to unlink it
+        # after an edit and to cut the snippets
+        self.indexed: dict[str, dict[str, tuple[list, tuple]]] | None = None
+
+    @property
+    def is_built(self) -> bool:
+        return self.fields is not None
+
+    def build(self):
+        self.fields = {field: FieldIndex() for field in FIELDS}
+        self.indexed = {}
+        for id, note in self.data.items():
+            self.__index(id, note)
+
+    def add(self, id: str, note: Note):
+        if self.fields is None:
+            return
+        self.discard(id)
+        self.__index(id, note)
+
+    def discard(self, id: str):
+        if self.fields is None:
+            return
+        for field, (tokens, _) in self.indexed.pop(id, {}).items():
+            self.fields[field].discard(id, tokens)
+
+    def search(self, query: str, fields: Iterable[str] = FIELDS) -> list[str]:
+        """Ids of the notes matching the query, in ascending order."""
+        return sorted(self.__match(query, fields), key=int)
+
+    def rank(self, query: str, limit: int | None = 10) -> list[Hit]:
+        """Matches of the query, best BM25F score first, with their snippets."""
+        ids = self.__match(query, FIELDS)
+        if not ids:
+            return []
+        terms = query_terms(query)
+        scores = dict.fromkeys(ids, 0.0)
+        for term in terms:
+            # Notes having the term anywhere, for the idf
+            having = set()
+            # Weighted, length-normalized frequency of the term in the matches
+            weighted = {}
+            for name, field in self.fields.items():
+                average = field.average_length or 1.0
+                for notes in field.matching(term):
+                    having.update(notes)
+                    for id in ids.intersection(notes):
+                        norm = 1 - B + B * field.lengths[id] / average
+                        tf = BOOSTS[name] * len(notes[id]) / norm
+                        weighted[id] = weighted.get(id, 0.0) + tf
+            found = len(having)
+            idf = math.log(1 + (len(self.indexed) - found + 0.5) / (found + 0.5))
+            for id, tf in weighted.items():
+                scores[id] += idf * tf * (K1 + 1) / (tf + K1)
+        best = heapq.nlargest(
+            limit or len(scores),
+            scores.items(),
+            key=lambda item: (item[1], -int(item[0])),
+        )
+        return [Hit(id, score, self.snippet(id, terms)) for id, score in best]
+
+    def snippet(self, id: str, terms: Iterable[str]) -> Snippet:
+        """Context of the note around the words starting with the terms."""
+        tokens, starts = self.indexed[id]["context"]
+        return match_snippet(str(self.data[id].context._value), tokens, starts, terms)
+
+    def __match(self, query: str, fields: Iterable[str]) -> set[str]:
+        if self.fields is None:
+            self.build()
+        fields = [self.fields[field] for field in fields]
+        found = set()
+        for group in parse_query(query):
+            # Rarest phrase first, the others only check what is left
+            group.sort(key=lambda terms: sum(field.count(terms) for field in fields))
+            ids = None
+            for terms in group:
+                # A phrase never spans two fields
+                ids = set().union(*(field.phrase(terms, ids) for field in fields))
+                if not ids:
+                    break
+            found |= ids
+        return found
+
+    def __index(self, id: str, note: Note):
+        indexed = {}
+        for field, text in note_texts(note).items():
+            tokens, starts = token_offsets(text)
+            self.fields[field].add(id, tokens)
+            indexed[field] = (tokens, starts)
+        self.indexed[id] = indexed
@@ -2,6 +2,7 @@ from common import Tag
 from decorators import error_handler
 from exceptions import NoteNotFoundError
 from output import (
+    display_ranked_notes_table,
     notes_output,
     output_error,
     output_info,
@@ -10,7 +11,6 @@ from output import (
 from .Note import Note
 from .Notes import Notes
 from .NotesFields import Context, Title
-from utils.export_import import export_notes_to_folder
 
 
 class NotesBookService:
@@ -60,18 +60,20 @@ class NotesBookService:
         if args:
             # if entered with "id"- preffix
             query = args[0].replace("id", "").strip(", ")
-            if self.notes_book.find_notes_by_id(query):
-                notes_output(self.notes_book.find_notes_by_id(query))
-                return self.notes_book.find_notes_by_id(query)
+            notes = self.notes_book.find_notes_by_id(query)
+            if notes:
+                notes_output(notes)
+                return notes
             raise NoteNotFoundError
 
     @error_handler
     def find_notes_by_title(self, args: list[str]) -> dict | None:
         query = " ".join(args)
         if query:
-            if self.notes_book.find_notes_by_title(query):
-                notes_output(self.notes_book.find_notes_by_title(query))
-                return self.notes_book.find_notes_by_title(query)
+            notes = self.notes_book.find_notes_by_title(query)
+            if notes:
+                notes_output(notes)
+                return notes
             raise NoteNotFoundError
 
     @error_handler
@@ -79,8 +81,9 @@ class NotesBookService:
         if args:
             result = {}
             for query in args:
-                if self.notes_book.find_notes_by_tag(query):
-                    result.update(self.notes_book.find_notes_by_tag(query))
+                for tag in filter(None, query.split(",")):
+                    result.update(self.notes_book.find_notes_by_tag(tag))
+            if result:
                 notes_output(result)
                 return result
             raise NoteNotFoundError
@@ -97,13 +100,28 @@ class NotesBookService:
 
     @error_handler
     def elastic_search(self, args: list[str]) -> dict | None:
-        if args:
-            result = {}
-            for query in args:
-                if self.notes_book.find_notes_by_query(query):
-                    result.update(self.notes_book.find_notes_by_query(query))
-                notes_output(result)
-                return result
+        # The words were split by the prompt, quoted phrases are joined back
+        query = " ".join(args)
+        if query:
+            notes = self.notes_book.find_notes_by_query(query)
+            if notes:
+                notes_output(notes)
+                return notes
+            raise NoteNotFoundError
+
+    @error_handler
+    def search_notes(self, query: str, limit: int | None = 10) -> list | None:
+        """The most relevant notes first, with the matched words highlighted."""
+        if query:
+            hits = self.notes_book.rank_notes(query, limit)
+            if hits:
+                display_ranked_notes_table(
+                    [
+                        (hit.id, self.notes_book.data[hit.id], hit.score, hit.snippet)
+                        for hit in hits
+                    ]
+                )
+                return hits
             raise NoteNotFoundError
 
     @error_handler
@@ -141,6 +159,7 @@ class NotesBookService:
                                 f"Tag {old_tag} wasn't changed, because new value is absent!"
                                 + "If you want to delete tag, use another command!"
                             )
+                    self.notes_book.touch(note)
             else:
                 raise NoteNotFoundError
 
@@ -150,6 +169,7 @@ class NotesBookService:
         if note:
             for tag in tags:
                 note.add_tag(tag)
+            self.notes_book.touch(note)
             output_info(f"Tags {tags} have been added to note with ID {note_id}.")
         else:
             raise NoteNotFoundError
@@ -171,6 +191,7 @@ class NotesBookService:
             if note:
                 for tag in tags:
                     note.delete_tag(tag)
+                self.notes_book.touch(note)
 
     @error_handler
     def sort_note_by_date(self, args: list[str]) -> dict | None:
@@ -207,6 +228,9 @@ class NotesBookService:
                 return updated_result_desc
 
     def export_notes_to_folder(self, args: list[str]):
+        # Loaded on first use, not at startup
+        from utils.export_import import export_notes_to_folder
+
         if args:
             export_notes_to_folder(self.notes_book, args)
         else:
@@ -1,11 +1,29 @@
-from output.output import notes_output, output_error, output_info, output_warning
-from output.rich_table import (
-    default_contacts_table_fields,
-    display_birthdays_table,
-    display_contacts_table,
-    display_notes_table,
-)
-from output.show_contact import show_contact_card
+from output.formats import FORMATS, output_format, set_output_format
+
+# Everything that draws with rich is loaded on first use: the daemon client
+# only needs the formats and must not pay for importing rich
+_LAZY = {
+    "notes_output": "output.output",
+    "output_error": "output.output",
+    "output_info": "output.output",
+    "output_warning": "output.output",
+    "default_contacts_table_fields": "output.rich_table",
+    "display_birthdays_table": "output.rich_table",
+    "display_contacts_table": "output.rich_table",
+    "display_notes_table": "output.rich_table",
+    "display_ranked_notes_table": "output.rich_table",
+    "show_contact_card": "output.show_contact",
+    "show_contact_cards": "output.show_contact",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+
+        return getattr(import_module(_LAZY[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "output_error",
@@ -16,5 +34,10 @@ __all__ = [
     "display_birthdays_table",
     "default_contacts_table_fields",
     "display_notes_table",
+    "display_ranked_notes_table",
     "show_contact_card",
+    "show_contact_cards",
+    "FORMATS",
+    "output_format",
+    "set_output_format",
 ]
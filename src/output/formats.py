@@ -0,0 +1,80 @@
+"""
+Output formats
+==============
+
+`rich` (the default) draws panels and tables. The other formats are meant
+for piping the results to other programs: they never build a rich
+renderable, every message and every row is written to stdout as soon as
+it is there.
+
+    plain   `INFO: message`, a header line and rows with ` | ` between cells
+    tsv     a header line and tab-separated rows, messages go to stderr
+    jsonl   one JSON object per message or row, lists stay lists
+
+The format is picked once for the whole session:
+
+    python main.py --format tsv
+"""
+
+import json
+import sys
+from collections.abc import Iterable
+
+FORMATS = ("rich", "plain", "tsv", "jsonl")
+
+_format = "rich"
+
+
+def set_output_format(name: str):
+    global _format
+    if name not in FORMATS:
+        raise ValueError(f"Unknown output format {name!r}, use one of {FORMATS}")
+    _format = name
+
+
+def output_format() -> str:
+    return _format
+
+
+def is_rich() -> bool:
+    return _format == "rich"
+
+
+def emit_message(level: str, message: str):
+    """A message already cleaned of ANSI codes and line breaks."""
+    if _format == "jsonl":
+        _write(json.dumps({"level": level, "message": message}, ensure_ascii=False))
+    elif _format == "tsv":
+        # Keeps stdout parseable, the rows are the data
+        sys.stderr.write(f"{level.upper()}\t{message}\n")
+    else:
+        _write(f"{level.upper()}: {message}")
+
+
+def emit_rows(columns: list[str], rows: Iterable[list]):
+    """
+    Streams the rows of a table, their values are strings, numbers, lists
+    or None. The jsonl keys are the snake_cased column names.
+    """
+    if _format == "jsonl":
+        keys = [column.lower().replace(" ", "_") for column in columns]
+        for row in rows:
+            _write(json.dumps(dict(zip(keys, row)), ensure_ascii=False))
+        return
+    separator = "\t" if _format == "tsv" else " | "
+    _write(separator.join(columns))
+    for row in rows:
+        _write(separator.join(_text(value) for value in row))
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        value = ",".join(str(item) for item in value)
+    # A cell is never split over two lines or two columns
+    return " ".join(str(value).split())
+
+
+def _write(line: str):
+    sys.stdout.write(line + "\n")
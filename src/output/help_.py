@@ -67,7 +67,16 @@ def show_help_panels():
             "contacts remove email john@email.com John",
         ),
         ("contacts phone [Number]", "Find contact by phone", "contacts phone 1234567"),
-        ("contacts all", "Show all contacts", "contacts all"),
+        (
+            "contacts all [Fields] [--page-size N]",
+            "Show all contacts, a page at a time",
+            "contacts all --page-size 20",
+        ),
+        (
+            "contacts next | prev",
+            "Next or previous page of the last list",
+            "contacts next",
+        ),
         (
             "contacts add-birthday [Name] [Date]",
             "Add birthday",
@@ -78,22 +87,38 @@ def show_help_panels():
             "Show contact's birthday",
             "contacts show-birthday John",
         ),
+        (
+            "contacts ingest-photos [Directory]",
+            "Store photos once, by content",
+            "contacts ingest-photos photo",
+        ),
+        (
+            "contacts show [Name] | --all",
+            "Contact card with photo, all cards",
+            "contacts show --all",
+        ),
         (
             "contacts birthdays [N Next Days]",
             "Upcoming birthdays list in next N days",
             "contacts birthdays 10",
         ),
-        ("contacts undo", "Undo last action", "contacts undo"),
+        ("contacts undo [N Steps]", "Undo last N actions", "contacts undo 2"),
+        ("contacts redo [N Steps]", "Redo last N undone actions", "contacts redo"),
         (
-            "contacts sort [Field] [asc|desc]",
-            "Sort contacts",
-            "contacts sort name desc",
+            "contacts sort [Field] [asc|desc] [--limit N]",
+            "Sort contacts, first N only",
+            "contacts sort birthday desc --limit 5",
         ),
         (
             "contacts find [--name] [--phone] ...",
             "Search by fields or keyword",
             "contacts find --tag work",
         ),
+        (
+            "contacts find [Query] [--limit N] [--threshold Score] [--page-size N]",
+            "Best fuzzy matches first",
+            "contacts find jon --limit 5",
+        ),
         (
             "contacts export [file.csv]",
             "Export contacts to CSV",
@@ -148,7 +173,16 @@ def show_help_panels():
             "Add tags to note",
             "notes add tags tag1,tag2 1",
         ),
-        ("notes find [Query]", "Search notes smartly", "notes find shopping"),
+        (
+            "notes find [Query]",
+            'Search notes: words (AND), OR, "phrase"',
+            'notes find milk OR "fresh bread"',
+        ),
+        (
+            "notes search [Query] [--limit N]",
+            "Most relevant notes first, with snippets",
+            "notes search milk bread --limit 5",
+        ),
         ("notes find id [NoteID]", "Find note by ID", "notes find id 1"),
         ("notes find title [Text]", "Find notes by title", "notes find title Meeting"),
         (
@@ -240,7 +274,8 @@ contacts
 │
 ├── [cyan]find[/cyan] [*query]
 ├── [cyan]show birthdays[/cyan] [*n-days-forward]
-└── [cyan]undo[/cyan]                       [grey50]→ Reverts the last add/edit/delete command[/grey50]
+├── [cyan]undo[/cyan] [*n-steps]            [grey50]→ Reverts the last add/edit/delete commands[/grey50]
+└── [cyan]redo[/cyan] [*n-steps]            [grey50]→ Repeats the last undone commands[/grey50]
 
 [bold green]
 notes
@@ -13,7 +13,10 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 
+from output.formats import emit_message, emit_rows, is_rich
+
 console = Console()
+NOTE_COLUMNS = ["ID", "Title", "Context", "Tags", "Created At", "Updated At"]
 
 """
 ANSI cleaner function - temporary, before (if?) we remove all colorama
@@ -21,14 +24,26 @@ Without it rich draws borders incorrectly
 """
 
 
+ansi_escape = re.compile(r"\x1b\[[0-9;]*m")  # Removes colorama injections
+
+
+# Batch mode stops at the first command that shows an error
+errors_shown = 0
+
+
+def error_count() -> int:
+    return errors_shown
+
+
 def strip_ansi(text: str) -> str:
-    ansi_escape = re.compile(r"\x1b\[[0-9;]*m")  # Removes colorama injections
     return ansi_escape.sub("", text)
 
 
 def output_info(message: str):
     # Clean the message of all garbage
     clean = strip_ansi(message.strip().replace("\n", " ").replace("\r", ""))
+    if not is_rich():
+        return emit_message("info", clean)
     text = Text(clean, style="white")
     panel = Panel.fit(
         text,
@@ -43,6 +58,8 @@ def output_info(message: str):
 
 def output_warning(message: str):
     clean = strip_ansi(message.strip().replace("\n", " ").replace("\r", ""))
+    if not is_rich():
+        return emit_message("warning", clean)
     text = Text(clean, style="white")
     panel = Panel.fit(
         text,
@@ -56,7 +73,11 @@ def output_warning(message: str):
 
 
 def output_error(message: str):
+    global errors_shown
+    errors_shown += 1
     clean = strip_ansi(message.strip().replace("\n", " ").replace("\r", ""))
+    if not is_rich():
+        return emit_message("error", clean)
     text = Text(clean, style="white")
     panel = Panel.fit(
         text,
@@ -69,7 +90,21 @@ def output_error(message: str):
     console.print(panel)
 
 
+def note_row(id, note) -> list:
+    return [
+        id,
+        str(note.title),
+        str(note.context),
+        [str(tag) for tag in note.tags],
+        str(note.created_at),
+        str(note.updated_at),
+    ]
+
+
 def notes_output(notes: dict):        
+    if not is_rich():
+        rows = (note_row(id, note) for id, note in notes.items())
+        return emit_rows(NOTE_COLUMNS, rows)
     for id, note in notes.items():  
         tags = "#" + " #".join([str(tag) for tag in note.tags]) + "\n" if note.tags else ""
         panel = Panel(
@@ -1,6 +1,9 @@
 from rich import box
 from rich.console import Console
 from rich.table import Table
+from rich.text import Text
+
+from output.formats import emit_rows, is_rich, output_format
 
 console = Console()
 # Change colors later
@@ -24,6 +27,19 @@ def display_notes_table(records):
       - updated_at (record.date.value)
       - tags (record.tags)
     """
+    if not is_rich():
+        return emit_rows(
+            ["Title", "Context", "Updated At", "Tags"],
+            (
+                [
+                    str(record.title),
+                    str(record.context),
+                    str(record.updated_at),
+                    [str(tag) for tag in record.tags],
+                ]
+                for record in records
+            ),
+        )
 
     # Change colors later
     table = Table(
@@ -54,85 +70,136 @@ def display_notes_table(records):
     console.print(table)
 
 
+def display_ranked_notes_table(results):
+    """
+    Prints the ranked notes search, best match first.
+    `results` are (id, note, score, snippet) tuples, where the snippet has
+    `text` and the (start, end) `spans` of the matched words.
+    """
+    if not is_rich():
+        return emit_rows(
+            ["ID", "Title", "Score", "Snippet"],
+            (
+                [id, str(note.title), round(score, 4), snippet.text]
+                for id, note, score, snippet in results
+            ),
+        )
+    table = Table(
+        title="Notes",
+        show_lines=False,
+        box=box.ROUNDED,
+        header_style="bold white",
+        row_styles=["on #1a1a1a", "on #2a2a2a"],
+    )
+    table.add_column("ID", style="bold magenta", justify="right")
+    table.add_column("Title", style="bold cyan")
+    table.add_column("Score", style="yellow", justify="right")
+    table.add_column("Snippet", style="green", width=60)
+
+    for id, note, score, snippet in results:
+        text = Text(snippet.text)
+        for start, end in snippet.spans:
+            text.stylize("bold black on yellow", start, end)
+        table.add_row(id, str(note.title), f"{score:.2f}", text)
+
+    console.print(table)
+
+
+# Column -> (style, max width, its value in a record: a string, a list or None)
+contacts_table_columns = {
+    "Name": ("bold cyan", 12, lambda record: str(record.name)),
+    "Phones": ("green", 12, lambda record: [phone.value for phone in record.phones]),
+    "Birthday": (
+        "magenta",
+        12,
+        lambda record: str(record.birthday) if record.birthday else None,
+    ),
+    "Emails": ("yellow", 20, lambda record: [email.value for email in record.emails]),
+    "Address": (
+        "yellow",
+        25,
+        lambda record: str(record.address) if record.address else None,
+    ),
+    "Tags": ("red", 12, lambda record: [str(tag) for tag in record.tags]),
+    "Photo": ("red", 15, lambda record: record.photo.value if record.photo else None),
+}
+# Above this many rows the contacts are printed as plain fixed-width lines,
+# measuring and styling every cell of a rich Table is what makes it slow
+PLAIN_ROWS = 2000
+
+
+def _contact_cell(column: str, value) -> str:
+    if not value:
+        return "—"
+    if column == "Name":
+        return value.capitalize()
+    if column == "Photo":
+        return f"📷 {value}"
+    if isinstance(value, list):
+        return (" " if column == "Phones" else ", ").join(value)
+    return value
+
+
 # To display contacts as rich table
-def display_contacts_table(records, user_fields: list = []):
+def display_contacts_table(records, user_fields: list = [], caption: str = None):
     """
     Takes a list of `Record` objects and prints them in a formatted table.
-    Each record is expected to have:
-      - name (record.name.value)
-      - phones (list of record.phones)
-      - birthday (record.birthday)
-      - email (record.email)
-      - address (record.address)
-      - tags (record.tags)
-      - photo
+    Only the columns in `user_fields` (all of them if empty) are computed,
+    see `contacts_table_columns`. `caption` goes under the table, e.g. the
+    page of a paged listing.
     """
+    columns = [
+        column
+        for column in default_contacts_table_fields
+        if not user_fields or column in user_fields
+    ]
+    values = [contacts_table_columns[column][2] for column in columns]
+    if not is_rich():
+        emit_rows(columns, ([value(record) for value in values] for record in records))
+        if caption and output_format() == "plain":
+            print(caption)
+        return
+
+    rows = [
+        [_contact_cell(column, value(record)) for column, value in zip(columns, values)]
+        for record in records
+    ]
+    if len(rows) > PLAIN_ROWS:
+        return _print_plain_table(columns, rows, caption)
 
     table = Table(
         title="Contacts",
+        caption=caption,
         show_lines=False,
         header_style="bold white",
         row_styles=["on black", "on grey11"],
         box=box.ROUNDED,
     )
-    table.add_column("Name", style="bold cyan", max_width=12)
-    table.add_column("Phones", style="green", max_width=12)
-    table.add_column("Birthday", style="magenta", max_width=12)
-    table.add_column("Emails", style="yellow", max_width=20)
-    table.add_column("Address", style="yellow", max_width=25)
-    table.add_column("Tags", style="red", max_width=12)
-    table.add_column("Photo", style="red", max_width=15)
-
-    # Get Record attributes
-    for record in records:
-        name = str(record.name)
-
-        phones = getattr(record, "phones", None)
-        phones = " ".join([p.value for p in record.phones]) if record.phones else "—"
+    for column in columns:
+        style, max_width, _ = contacts_table_columns[column]
+        table.add_column(column, style=style, max_width=max_width)
+    for row in rows:
+        table.add_row(*row)
 
-        birthday = str(record.birthday) if record.birthday else "—"
-
-        emails = getattr(record, "emails", None)
-        emails = (
-            ", ".join([e.value for e in record.emails])
-            if hasattr(record, "emails") and record.emails
-            else "—"
-        )
-
-        address = (
-            str(record.address)
-            if hasattr(record, "address") and record.address
-            else "—"
-        )
+    console.print(table)
 
-        tags = getattr(record, "tags", None)
-        tags = ", ".join(tags) if tags else "—"
 
-        photo = getattr(record, "photo", None)
-        photo = f"📷 {photo.value}" if photo else "—"
+def _print_plain_table(columns: list[str], rows: list[list[str]], caption: str):
+    """The contacts table without markup, every column cut to its max width."""
+    widths = [contacts_table_columns[column][1] for column in columns]
 
-        table.add_row(
-            name.capitalize(), phones, birthday, emails, address, tags, photo
-        )  # <- Add email and address inside later and wrap like tags, the same way
-
-    global default_contacts_table_fields
-    if user_fields:
-        # Make a list of indexes of fields, that are not in user's choice
-        indexes = []
-        index = 0
-        for field in default_contacts_table_fields:
-            if field not in user_fields:
-                indexes.append(index)
-            index += 1
-
-        # Removing the fields, which a not in user's choice, by their index
-        while indexes:
-            table.columns.pop(indexes[0])
-            for i in range(len(indexes)):
-                indexes[i] -= 1
-            indexes.remove(indexes[0])
+    def line(values) -> str:
+        return " │ ".join(
+            value.ljust(width) if len(value) <= width else value[: width - 1] + "…"
+            for value, width in zip(values, widths)
+        ).rstrip()
 
-    console.print(table)
+    lines = [line(columns), "─┼─".join("─" * width for width in widths)]
+    lines.extend(line(row) for row in rows)
+    if caption:
+        lines.append(caption)
+    # Straight to the console's file, rich would split and wrap every line
+    console.file.write("\n".join(lines) + "\n")
 
 
 # To display birthdays as rich table
@@ -141,6 +208,18 @@ def display_birthdays_table(birthdays, days_to):
     Takes a list of dicts with keys: name, congratulation_date, days_to_user_congrats,
     and displays them as a rich table.
     """
+    if not is_rich():
+        return emit_rows(
+            ["Name", "Date", "Days Left"],
+            (
+                [
+                    entry["name"],
+                    entry["congratulation_date"],
+                    entry["days_to_user_congrats"],
+                ]
+                for entry in birthdays
+            ),
+        )
     table = Table(
         title=f"Birthdays in the Next {days_to} Days",
         show_lines=False,
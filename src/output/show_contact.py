@@ -1,44 +1,108 @@
+"""
+Contact cards with their ASCII photos
+=====================================
+
+A photo is a `.txt` file of ANSI colored text. Decoding it into rich `Text`
+lines is the slow part of a card, so the decoded lines are kept in a small
+LRU cache keyed by the file's path, mtime and size: a card shown again
+reads nothing, and an edited photo file is decoded anew. Photos kept in the
+photo store (`storage.photos`) are written to a terminal pre-rendered.
+
+`show_contact_cards` (`contacts show --all`) decodes the photos of all the
+cards on a thread pool first, then prints the cards one after another.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 from rich import box
 from rich.align import Align
 from rich.ansi import AnsiDecoder
 from rich.console import Console, Group
 from rich.panel import Panel
 from rich.table import Table
+from rich.text import Text
+
+from storage.photos import card_variant, read_text
 
 console = Console()
 
 DEFAULT_ASCII = "photo/nophoto.txt"
+PHOTO_CACHE_SIZE = 32
+PREFETCH_WORKERS = 4
 
 
 def fallback_print_ansi(ascii_art: str):
-    console = Console()
-    decoder = AnsiDecoder()
-    segments = list(decoder.decode(ascii_art))
-    group = Group(*segments)
-    console.print(group)
+    console.print(Group(*AnsiDecoder().decode(ascii_art)))
 
 
-def get_ascii_photo(record):
+def photo_path(record) -> str:
     if getattr(record, "photo", None):
-        path = record.photo.value.strip()
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                return f.read()  # ← DO NOT strip ANSI
-        except Exception as e:
-            return f"[Error reading file: {e}]"
+        return record.photo.value.strip()
+    return DEFAULT_ASCII
+
+
+def get_ascii_photo(record):
+    try:
+        with open(photo_path(record), "r", encoding="utf-8", errors="ignore") as f:
+            return f.read()  # ← DO NOT strip ANSI
+    except Exception as e:
+        return f"[Error reading file: {e}]"
+
+
+@lru_cache(maxsize=PHOTO_CACHE_SIZE)
+def _decoded_photo(path: str, mtime_ns: int, size: int) -> tuple[Text, ...]:
+    # mtime and size are only part of the key, a changed file misses the cache
+    return tuple(AnsiDecoder().decode(read_text(path)))  # ← DO NOT strip ANSI
+
+
+@lru_cache(maxsize=PHOTO_CACHE_SIZE)
+def _card_variant(path: str) -> str:
+    # Stored photos never change, the path is the whole key
+    return read_text(path)
+
+
+def get_photo_lines(record) -> tuple[Text, ...]:
+    """Decoded lines of the contact's photo, from the cache if unchanged."""
+    path = photo_path(record)
+    try:
+        stat = os.stat(path)
+        return _decoded_photo(path, stat.st_mtime_ns, stat.st_size)
+    except Exception as e:
+        return (Text(f"[Error reading file: {e}]"),)
+
+
+def print_photo(record):
+    """
+    A terminal gets the photo pre-rendered for the card when it's in the
+    photo store, anything else goes through rich.
+    """
+    variant = console.is_terminal and card_variant(photo_path(record))
+    if variant:
+        console.file.write(_card_variant(variant))
     else:
-        path = DEFAULT_ASCII
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                return f.read()  # ← DO NOT strip ANSI
-        except Exception as e:
-            return f"[Error reading file: {e}]"
+        console.print(Group(*get_photo_lines(record)))  # <-- best quality rendering!
+
+
+def prefetch_photos(records, workers: int = PREFETCH_WORKERS):
+    """Decodes the photos of the records into the cache, several at a time."""
+    unique = {photo_path(record): record for record in records}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Only as many as the cache keeps, the rest would be evicted unused
+        list(pool.map(get_photo_lines, list(unique.values())[:PHOTO_CACHE_SIZE]))
+
+
+def show_contact_cards(records):
+    records = list(records)
+    prefetch_photos(records)
+    for record in records:
+        show_contact_card(record)
 
 
 def show_contact_card(record):
-    # 1. Get and render color ASCII photo with raw ANSI
-    ascii_art = get_ascii_photo(record)
-    fallback_print_ansi(ascii_art)  # <-- best quality rendering!
+    # 1. Render color ASCII photo from raw ANSI, cached
+    print_photo(record)
 
     # 2. Build contact info table (right-aligned)
     contact_table = Table.grid(padding=(0, 1))
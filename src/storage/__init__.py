@@ -0,0 +1,3 @@
+from .journal import CONTACTS, JOURNAL_FILE, NOTES, Journal
+
+__all__ = ["Journal", "JOURNAL_FILE", "CONTACTS", "NOTES"]
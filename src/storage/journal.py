@@ -0,0 +1,170 @@
+"""
+Write-ahead journal for ContactsBook and Notes
+==============================================
+
+Every mutation of a book is appended to the journal as a small frame instead of
+re-pickling the whole book. A frame holds the full state of one changed entry
+(or a delete marker), so replaying frames is idempotent and the order of
+snapshot/journal writes never corrupts data.
+
+Frame layout:
+    <uint32 payload length><uint32 crc32 of payload><pickled payload>
+
+    payload = (target, op, key, value)
+        target - "contacts" or "notes"
+        op     - "put" or "del"
+        key    - book key of the entry
+        value  - the entry itself for "put", None for "del"
+
+Startup loads the last snapshot and replays the journal on top of it. Once the
+journal grows past `compact_every` frames, the snapshot callback folds it into
+a fresh snapshot and the journal is truncated.
+
+Inside `deferred()` (batch and daemon mode) frames are only buffered: the
+journal is synced, and compacted if needed, by `flush()` and when the block
+ends.
+
+Usage example:
+
+    journal = Journal("data/journal.log", snapshot=save_books)
+    journal.replay(book, notes)
+    journal.put("contacts", "john", record)
+    journal.close()
+"""
+
+import os
+import pickle
+import struct
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+
+JOURNAL_FILE = Path("data/journal.log")
+COMPACT_EVERY = 500
+
+CONTACTS = "contacts"
+NOTES = "notes"
+
+_PUT = "put"
+_DEL = "del"
+_HEADER = struct.Struct("<II")
+
+
+class Journal:
+    def __init__(
+        self,
+        path: str | Path = JOURNAL_FILE,
+        snapshot: Callable[[], None] | None = None,
+        compact_every: int = COMPACT_EVERY,
+        sync: bool = True,
+    ):
+        self.path = Path(path)
+        self.snapshot = snapshot
+        self.compact_every = compact_every
+        self.sync = sync
+        self.entries = 0
+        self.snapshot_requested = False
+        self.__deferred = False
+        self.__unsynced = 0
+        self.__file = None
+
+    def replay(self, book, notes) -> int:
+        """
+        Applies all complete frames of the journal to the given books.
+        A torn frame at the tail (crash in the middle of a write) is cut off.
+        """
+        if not self.path.exists():
+            return 0
+
+        applied = 0
+        good_offset = 0
+        with open(self.path, "rb") as file:
+            while True:
+                header = file.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                length, crc = _HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                target, op, key, value = pickle.loads(payload)
+                container = book if target == CONTACTS else notes
+                if op == _PUT:
+                    container.restore_entry(key, value)
+                else:
+                    container.discard_entry(key)
+                applied += 1
+                good_offset = file.tell()
+
+        if good_offset < self.path.stat().st_size:
+            with open(self.path, "r+b") as file:
+                file.truncate(good_offset)
+
+        self.entries = applied
+        return applied
+
+    def put(self, target: str, key: str, value):
+        self.__append((target, _PUT, key, value))
+
+    def delete(self, target: str, key: str):
+        self.__append((target, _DEL, key, None))
+
+    @contextmanager
+    def deferred(self):
+        """Frames written in the block are synced by `flush()` or when it ends."""
+        self.__deferred = True
+        try:
+            yield self
+        finally:
+            self.__deferred = False
+            self.flush()
+
+    def flush(self):
+        """Syncs the frames written so far, compacts if the journal is big enough."""
+        if self.__unsynced:
+            self.__file.flush()
+            if self.sync:
+                os.fsync(self.__file.fileno())
+            self.__unsynced = 0
+        if self.entries >= self.compact_every:
+            self.compact()
+
+    def request_snapshot(self):
+        """Marks that the books were changed in a way the journal can't describe."""
+        self.snapshot_requested = True
+
+    def compact(self):
+        """Folds the journal into a fresh snapshot and truncates it."""
+        if self.snapshot is None:
+            return
+        self.snapshot()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+            self.__unsynced = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "wb"):
+            pass
+        self.entries = 0
+        self.snapshot_requested = False
+
+    def close(self):
+        if self.snapshot_requested or self.entries >= self.compact_every:
+            self.compact()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+            self.__unsynced = 0
+
+    def __append(self, frame: tuple):
+        payload = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.__file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.__file = open(self.path, "ab")
+        self.__file.write(_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self.__file.write(payload)
+        self.entries += 1
+        self.__unsynced += 1
+        if not self.__deferred:
+            self.flush()
@@ -0,0 +1,117 @@
+"""
+Content-addressed photo store
+=============================
+
+ASCII photos are copied into `data/photos/` under the sha256 of their bytes,
+so the same art is kept once however many contacts, or copies of the file
+elsewhere, point at it:
+
+    data/photos/<sha256>.txt          the photo as it was given
+    data/photos/<sha256>.w66.ansi     pre-rendered for the 66-column card
+
+The card variant is the photo already cropped to the card width by rich, a
+terminal can get its bytes as they are. Stored files never change, a new
+photo gets a new name, so they are read through mmap and cached by path.
+
+Usage example:
+
+    stored = store_photo("~/art/john.txt")  # 'data/photos/3f2a….txt'
+    card = card_variant(stored)  # 'data/photos/3f2a….w66.ansi' or None
+    ingest_directory("~/art")  # {'~/art/john.txt': 'data/photos/3f2a….txt', …}
+"""
+
+import hashlib
+import io
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from threading import get_ident
+
+from rich.ansi import AnsiDecoder
+from rich.console import Console, Group
+
+PHOTO_DIR = Path("data/photos")
+# Widths the photos are pre-rendered for, the contact card is 66 columns wide
+CARD_WIDTH = 66
+VARIANT_WIDTHS = (CARD_WIDTH,)
+INGEST_WORKERS = 4
+
+
+@contextmanager
+def mapped(path: str | Path):
+    """The file's bytes mapped read-only, hashing them needs no copy."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""  # Empty files can't be mapped
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def read_text(path: str | Path) -> str:
+    with mapped(path) as data:
+        return str(data[:], "utf-8", errors="ignore")
+
+
+def render_variant(ascii_art: str, width: int) -> str:
+    """The ANSI art as rich prints it in `width` columns, lines cropped."""
+    buffer = io.StringIO()
+    console = Console(
+        file=buffer, width=width, force_terminal=True, color_system="truecolor"
+    )
+    console.print(Group(*AnsiDecoder().decode(ascii_art)), crop=True, no_wrap=True)
+    return buffer.getvalue()
+
+
+def is_stored(path: str | Path) -> bool:
+    return Path(path).parent == PHOTO_DIR
+
+
+def store_photo(path: str | Path) -> str:
+    """Copies the photo into the store once, returns the stored path."""
+    with mapped(Path(path).expanduser()) as data:
+        stored = PHOTO_DIR / f"{hashlib.sha256(data).hexdigest()}.txt"
+        if stored.exists():
+            return str(stored)
+        content = data[:]
+    PHOTO_DIR.mkdir(parents=True, exist_ok=True)
+    text = str(content, "utf-8", errors="ignore")
+    for width in VARIANT_WIDTHS:
+        _write_once(_variant_path(stored, width), render_variant(text, width))
+    # The photo itself last: once it's there, so are its variants
+    _write_once(stored, content)
+    return str(stored)
+
+
+def card_variant(path: str | Path, width: int = CARD_WIDTH) -> str | None:
+    """The pre-rendered variant of a stored photo, None for other photos."""
+    if not is_stored(path):
+        return None
+    variant = _variant_path(Path(path), width)
+    return str(variant) if variant.exists() else None
+
+
+def ingest_directory(
+    directory: str | Path, workers: int = INGEST_WORKERS
+) -> dict[str, str]:
+    """Stores every `.txt` photo of the directory tree, source -> stored path."""
+    sources = sorted(str(path) for path in Path(directory).expanduser().rglob("*.txt"))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(sources, pool.map(store_photo, sources)))
+
+
+def _variant_path(stored: Path, width: int) -> Path:
+    return stored.with_suffix(f".w{width}.ansi")
+
+
+def _write_once(path: Path, content: str | bytes):
+    # Written aside and renamed, a reader never sees half a file and two
+    # writers of the same content don't clash
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.{get_ident()}.tmp")
+    if isinstance(content, str):
+        temporary.write_text(content, encoding="utf-8")
+    else:
+        temporary.write_bytes(content)
+    os.replace(temporary, path)
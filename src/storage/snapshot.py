@@ -0,0 +1,289 @@
+"""
+Binary snapshot of ContactsBook and Notes
+=========================================
+
+Compact, schema-versioned replacement of pickling every Record/Note object.
+All strings go to one string table, entries are fixed-width rows of string
+ids, so saving is a few `array.tofile` calls and loading decodes the whole
+string table at once and builds the objects in a single pass, skipping the
+field validators (the data was validated when it was entered).
+
+Layout (little-endian):
+
+    header    MAGIC, version, counts (see `_HEADER`)
+    strings   uint32 cumulative end offsets + UTF-8 text
+    contacts  uint32 rows of `_CONTACT_COLUMNS`, birthdays are date ordinals
+    values    uint32 string ids of phones, emails and tags of all contacts
+    notes     uint32 rows of `_NOTE_COLUMNS`, float64 created/updated stamps
+    note tags uint32 string ids
+
+Usage example:
+
+    dump_books(book, notes, "books.snapshot")
+    book, notes = load_books("books.snapshot")
+"""
+
+import gc
+import os
+import struct
+import sys
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from common import Tag
+from contacts.ContactFields import Address, Birthday, Email, Name, Phone, Photo
+from contacts.ContactsBook import ContactsBook
+from contacts.Records import Record
+from notes.Note import Note
+from notes.Notes import Notes
+from notes.NotesFields import Context, Date, Title
+
+SNAPSHOT_FILE = Path("books.snapshot")
+
+MAGIC = b"CBSNAP"
+VERSION = 2
+
+# magic, version, strings, text bytes, contacts, values, notes, note tags, counter
+_HEADER = struct.Struct("<6sHIQIIIII")
+
+_CONTACT_COLUMNS = 11  # key, name, address, birthday, photo, phones, emails, tags
+_NOTE_COLUMNS = 5  # id, title, context, note tags
+_NONE = 0xFFFFFFFF
+# Contacts may hold tags as plain strings or as Tag objects, keep which one it was
+_TAG_OBJECT = 0x80000000
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _Strings:
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.strings: list[str] = []
+
+    def id(self, value) -> int:
+        if value is None:
+            return _NONE
+        value = str(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def _uint32(values=()) -> array:
+    return array("I", values)
+
+
+def _value(field):
+    if field is None:
+        return None
+    return getattr(field, "value", field)
+
+
+def dump_books(book: ContactsBook, notes: Notes, filename=SNAPSHOT_FILE):
+    strings = _Strings()
+    sid = strings.id
+
+    contacts = _uint32()
+    values = _uint32()
+    for key, record in book.data.items():
+        row = [sid(key), sid(record.name), sid(_value(record.address))]
+        row.append(record.birthday.ordinal if record.birthday else _NONE)
+        row.append(sid(_value(record.photo)))
+        for items in (record.phones, record.emails):
+            row += (len(values), len(items))
+            values.extend(sid(_value(item)) for item in items)
+        row += (len(values), len(record.tags))
+        values.extend(
+            sid(tag) | (_TAG_OBJECT if isinstance(tag, Tag) else 0)
+            for tag in record.tags
+        )
+        contacts.extend(row)
+
+    note_rows = _uint32()
+    note_stamps = array("d")
+    note_tags = _uint32()
+    for id, note in notes.data.items():
+        note_rows.extend(
+            (sid(id), sid(note.title.value), sid(note.context.value))
+            + (len(note_tags), len(note.tags))
+        )
+        note_tags.extend(sid(tag) for tag in note.tags)
+        note_stamps.extend(
+            (note.created_at.date.timestamp(), note.updated_at.date.timestamp())
+        )
+
+    text = "".join(strings.strings).encode("utf-8")
+    offsets = _uint32()
+    end = 0
+    for string in strings.strings:
+        end += len(string)
+        offsets.append(end)
+
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(strings.strings),
+        len(text),
+        len(book.data),
+        len(values),
+        len(notes.data),
+        len(note_tags),
+        notes.notes_counter,
+    )
+
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, "wb") as file:
+        file.write(header)
+        for part in (offsets, contacts, values, note_rows, note_stamps, note_tags):
+            _write(file, part)
+        file.write(text)
+    os.replace(tmp_filename, filename)
+
+
+def load_books(filename=SNAPSHOT_FILE) -> tuple[ContactsBook, Notes]:
+    with open(filename, "rb") as file:
+        header = file.read(_HEADER.size)
+        if len(header) < _HEADER.size or not header.startswith(MAGIC):
+            raise SnapshotError(f"{filename} is not a books snapshot")
+        (
+            _,
+            version,
+            strings_count,
+            text_size,
+            contacts_count,
+            values_count,
+            notes_count,
+            note_tags_count,
+            notes_counter,
+        ) = _HEADER.unpack(header)
+        if version != VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+
+        offsets = _read(file, "I", strings_count)
+        contacts = _read(file, "I", contacts_count * _CONTACT_COLUMNS)
+        values = _read(file, "I", values_count)
+        note_rows = _read(file, "I", notes_count * _NOTE_COLUMNS)
+        note_stamps = _read(file, "d", notes_count * 2)
+        note_tags = _read(file, "I", note_tags_count)
+        text = file.read(text_size).decode("utf-8")
+
+    strings = []
+    start = 0
+    for end in offsets.tolist():
+        strings.append(text[start:end])
+        start = end
+
+    # Nothing built here can be a garbage cycle, don't let the collector
+    # rescan the growing books after every few hundred new objects
+    with _gc_paused():
+        book = _build_contacts(strings, contacts.tolist(), values.tolist())
+        notes = _build_notes(
+            strings, note_rows.tolist(), note_stamps.tolist(), note_tags.tolist()
+        )
+    notes.notes_counter = notes_counter
+    return book, notes
+
+
+def _build_contacts(strings: list[str], rows: list[int], values: list[int]):
+    new = object.__new__
+
+    def trusted(field_class, string_id):
+        """Builds a field from an already validated value, skipping its setter."""
+        if string_id == _NONE:
+            return None
+        field = new(field_class)
+        field._value = strings[string_id]
+        return field
+
+    book = ContactsBook()
+    for row in range(0, len(rows), _CONTACT_COLUMNS):
+        (
+            key,
+            name,
+            address,
+            birthday,
+            photo,
+            phones_start,
+            phones_count,
+            emails_start,
+            emails_count,
+            tags_start,
+            tags_count,
+        ) = rows[row : row + _CONTACT_COLUMNS]
+
+        record = new(Record)
+        record.name = trusted(Name, name)
+        record.phones = [
+            Phone.from_text(strings[i])
+            for i in values[phones_start : phones_start + phones_count]
+        ]
+        record.emails = [
+            trusted(Email, i)
+            for i in values[emails_start : emails_start + emails_count]
+        ]
+        record.tags = [
+            Tag(strings[i & ~_TAG_OBJECT]) if i & _TAG_OBJECT else strings[i]
+            for i in values[tags_start : tags_start + tags_count]
+        ]
+        record.address = trusted(Address, address)
+        if birthday == _NONE:
+            record.birthday = None
+        else:
+            record.birthday = Birthday.from_ordinal(birthday)
+        record.photo = trusted(Photo, photo)
+        book.data[strings[key]] = record
+    return book
+
+
+def _build_notes(strings, rows: list[int], stamps: list[float], tags: list[int]):
+    notes = Notes()
+    from_timestamp = datetime.fromtimestamp
+    for row in range(0, len(rows), _NOTE_COLUMNS):
+        id, title, context, tags_start, tags_count = rows[row : row + _NOTE_COLUMNS]
+        note = object.__new__(Note)
+        note.title = Title(strings[title])
+        note.context = Context(strings[context])
+        note.tags = [
+            Tag(strings[i]) for i in tags[tags_start : tags_start + tags_count]
+        ]
+        stamp = row // _NOTE_COLUMNS * 2
+        note.created_at = Date(from_timestamp(stamps[stamp]))
+        note.updated_at = Date(from_timestamp(stamps[stamp + 1]))
+        note.id = int(strings[id])
+        notes.data[strings[id]] = note
+    return notes
+
+
+@contextmanager
+def _gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _write(file, part: array):
+    if sys.byteorder != "little":
+        part = array(part.typecode, part)
+        part.byteswap()
+    part.tofile(file)
+
+
+def _read(file, typecode: str, count: int) -> array:
+    part = array(typecode)
+    try:
+        part.fromfile(file, count)
+    except EOFError:
+        raise SnapshotError("Snapshot is truncated")
+    if sys.byteorder != "little":
+        part.byteswap()
+    return part
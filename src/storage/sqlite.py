@@ -0,0 +1,156 @@
+"""
+SQLite storage engine
+=====================
+
+Optional backend for ContactsBook and Notes (stdlib `sqlite3`). Entries are
+kept as pickled blobs next to indexed lookup columns, so the books don't have
+to be loaded into memory and `find`, ownership checks, birthdays, tag
+lookups and sorted listings are answered by SQL indexes, note searches and
+contact substring searches by FTS5 tables.
+
+The classes behind the mapping interface live next to their in-memory
+counterparts: `contacts.SqliteContactsBook` and `notes.SqliteNotes`.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+SQLITE_FILE = Path("books.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS contacts (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    birthday_md INTEGER,
+    record BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contacts_name ON contacts(name);
+CREATE INDEX IF NOT EXISTS contacts_birthday ON contacts(birthday_md);
+
+CREATE TABLE IF NOT EXISTS phones (
+    phone INTEGER NOT NULL,
+    key TEXT NOT NULL REFERENCES contacts(key) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS phones_phone ON phones(phone);
+CREATE INDEX IF NOT EXISTS phones_key ON phones(key);
+
+CREATE TABLE IF NOT EXISTS emails (
+    email TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES contacts(key) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS emails_email ON emails(email);
+CREATE INDEX IF NOT EXISTS emails_key ON emails(key);
+
+-- Sort key of every record for every field of `contacts.indexes.SORT_KEYS`
+CREATE TABLE IF NOT EXISTS contact_sort (
+    field TEXT NOT NULL,
+    value,
+    key TEXT NOT NULL REFERENCES contacts(key) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS contact_sort_value ON contact_sort(field, value, key);
+CREATE INDEX IF NOT EXISTS contact_sort_key ON contact_sort(key);
+
+-- Search text of every record, its trigrams narrow the substring searches
+CREATE TABLE IF NOT EXISTS contact_texts (
+    key TEXT PRIMARY KEY REFERENCES contacts(key) ON DELETE CASCADE,
+    text TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS contact_texts_fts USING fts5(
+    text, content = 'contact_texts', tokenize = 'trigram'
+);
+CREATE TRIGGER IF NOT EXISTS contact_texts_insert AFTER INSERT ON contact_texts
+BEGIN
+    INSERT INTO contact_texts_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS contact_texts_delete AFTER DELETE ON contact_texts
+BEGIN
+    INSERT INTO contact_texts_fts (contact_texts_fts, rowid, text)
+    VALUES ('delete', old.rowid, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS contact_texts_update AFTER UPDATE ON contact_texts
+BEGIN
+    INSERT INTO contact_texts_fts (contact_texts_fts, rowid, text)
+    VALUES ('delete', old.rowid, old.text);
+    INSERT INTO contact_texts_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    context TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    note BLOB NOT NULL
+);
+
+-- Full-text index over the lower-cased columns of notes, kept by the triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    title, context, tags, content = 'notes', content_rowid = 'id',
+    tokenize = "unicode61 remove_diacritics 0 tokenchars '_'"
+);
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, title, context, tags)
+    VALUES (new.id, new.title, new.context, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, title, context, tags)
+    VALUES ('delete', old.id, old.title, old.context, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, title, context, tags)
+    VALUES ('delete', old.id, old.title, old.context, old.tags);
+    INSERT INTO notes_fts (rowid, title, context, tags)
+    VALUES (new.id, new.title, new.context, new.tags);
+END;
+
+CREATE TABLE IF NOT EXISTS note_tags (
+    tag TEXT NOT NULL,
+    id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS note_tags_tag ON note_tags(tag);
+CREATE INDEX IF NOT EXISTS note_tags_id ON note_tags(id);
+"""
+
+
+def connect(filename: str | Path = SQLITE_FILE) -> sqlite3.Connection:
+    # Autocommit: every book mutation is a separate durable statement
+    connection = sqlite3.connect(filename, isolation_level=None)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def get_meta(connection: sqlite3.Connection, name: str, default: int = 0) -> int:
+    row = connection.execute(
+        "SELECT value FROM meta WHERE name = ?", (name,)
+    ).fetchone()
+    return row[0] if row else default
+
+
+def set_meta(connection: sqlite3.Connection, name: str, value: int):
+    connection.execute(
+        "INSERT INTO meta (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+        (name, value),
+    )
+
+
+@contextmanager
+def deferred_sync(connection: sqlite3.Connection):
+    """
+    Commits in the block still go to the WAL but skip its fsync, the WAL is
+    checkpointed into the database file once, when the block ends.
+    """
+    (synchronous,) = connection.execute("PRAGMA synchronous").fetchone()
+    connection.execute("PRAGMA synchronous = NORMAL")
+    try:
+        yield connection
+    finally:
+        connection.execute("PRAGMA wal_checkpoint(FULL)")
+        connection.execute(f"PRAGMA synchronous = {int(synchronous)}")
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from batch import run_batch
+from context import data_cxt_mngr
+from utils.session import is_interactive
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        # The books are kept relative to the working directory
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.report = StringIO()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def run_batch(self, commands: str) -> int:
+        with redirect_stdout(StringIO()):
+            return run_batch(StringIO(commands), report=self.report)
+
+    def test_commands_are_run_and_saved(self):
+        code = self.run_batch(
+            "# setup\n"
+            "contacts add phone 0671234567 john\n"
+            "\n"
+            "contacts add email john@example.com john\n"
+            "notes all\n"
+        )
+
+        self.assertEqual(code, 0)
+        report = self.report.getvalue().splitlines()
+        self.assertEqual(len(report), 5)  # Header, 3 commands, total
+        self.assertIn("contacts add email john@example.com john", report[2])
+        self.assertIn("3 commands, ok", report[-1])
+        with redirect_stdout(StringIO()), data_cxt_mngr() as (book, _, _):
+            self.assertEqual(
+                [email.value for email in book.find("john").emails],
+                ["john@example.com"],
+            )
+
+    def test_stops_at_the_first_failing_command(self):
+        code = self.run_batch(
+            "contacts add phone 0671234567 john\n"
+            "contacts remove\n"  # Would ask which contact
+            "contacts add phone 0671234568 jane\n"
+        )
+
+        self.assertEqual(code, 1)
+        self.assertIn("stopped at line 2", self.report.getvalue())
+        self.assertTrue(is_interactive())
+        with redirect_stdout(StringIO()), data_cxt_mngr() as (book, _, _):
+            self.assertEqual(list(book.data), ["john"])
+
+    def test_errors_fail_the_command(self):
+        code = self.run_batch("contacts add phone 123 john\nnotes all\n")
+
+        self.assertEqual(code, 1)
+        self.assertIn("1 commands, stopped at line 1", self.report.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
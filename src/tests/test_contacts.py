@@ -1,14 +1,30 @@
+import json
+import os
 import sys
+import tempfile
 import unittest
+from contextlib import redirect_stderr
+from datetime import date
 from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
 
 from rich import box
 from rich.console import Console
 from rich.table import Table
 from rich.theme import Theme
 
-from contacts import ContactsBook
+from common import Tag, TagRegistry
+from contacts import ContactsBook, PhoneBookService, Photo
+from contacts.ContactsBook import next_birthday
 from contacts.controller import conntroller
+from contacts.paging import Pager, by_sort_key
+from contacts.trigrams import required_literals
+from notes import Note, Notes
+from output import set_output_format
+from output.show_contact import get_photo_lines, print_photo
+from storage import CONTACTS, NOTES
+from storage.photos import card_variant, is_stored
 
 SCENARIOS = [
     (
@@ -60,6 +76,69 @@ SCENARIOS = [
         "Alice",
         "contacts sort name",
     ),
+    (
+        "test_sort_by_birthday",
+        "Сортування за днем народження",
+        "controller(commands: ['sort', 'birthday'])",
+        "No birthday last, in both directions",
+        "contacts sort birthday → desc",
+    ),
+    (
+        "test_sort_by_phone",
+        "Сортування за телефоном",
+        "controller(commands: ['sort', 'phone'])",
+        "Numeric order whatever the format",
+        "contacts sort phone",
+    ),
+    (
+        "test_sorted_index_follows_edits",
+        "Відсортований індекс",
+        "controller(commands: ['sort', 'name', 'desc', '--limit', '2'])",
+        "Top N in order after edits",
+        "contacts sort name desc --limit 2",
+    ),
+    (
+        "test_keyset_pages",
+        "Посторінковий перегляд",
+        "controller(commands: ['sort', 'name', '--page-size', '2'], ['next'])",
+        "Next page starts after the last shown",
+        "contacts sort name --page-size 2 → next → prev",
+    ),
+    (
+        "test_pages_skip_removed_contacts",
+        "Сторінки після видалення",
+        "controller(commands: ['find', '--tag', 'work', '--page-size', '1'], ['next'])",
+        "Removed contact skipped, no error",
+        "contacts find --tag work --page-size 1 → remove contact → next",
+    ),
+    (
+        "test_plain_table_for_many_rows",
+        "Швидкий вивід великих таблиць",
+        "controller(commands: ['all', 'phones'])",
+        "Only requested columns, cut to width",
+        "contacts all phones",
+    ),
+    (
+        "test_scripting_formats",
+        "Вивід для скриптів",
+        "main.py --format tsv|jsonl → controller(commands: ['all', 'phones'])",
+        "Rows and messages as TSV/JSON lines",
+        "python main.py --format jsonl",
+    ),
+    (
+        "test_photo_store",
+        "Сховище фото за вмістом",
+        "controller(commands: ['ingest-photos', DIR])",
+        "Copies stored once, card pre-rendered",
+        "contacts ingest-photos photo",
+    ),
+    (
+        "test_photo_cache",
+        "Кеш фото контактів",
+        "controller(commands: ['show', '--all'])",
+        "Decoded once, again after an edit",
+        "contacts show --all",
+    ),
     (
         "test_phone_existing",
         "Показати телефон",
@@ -134,9 +213,58 @@ SCENARIOS = [
         "test_add_then_undo",
         "Undo після додавання",
         "controller(commands: ['add', 'phone', '0671234567', 'UndoUser'])",
-        "Nothing to undo yet",
+        "has been undone",
         "contacts add ... → undo",
     ),
+    (
+        "test_phone_ownership_index",
+        "Власник телефону",
+        "controller(commands: ['add', ...], ['remove', 'phone', ...])",
+        "Phone owned in any format",
+        "contacts remove phone 0671234567 Owner",
+    ),
+    (
+        "test_rename_keeps_index",
+        "Перейменування контакту",
+        "PhoneBookService.edit_contact_field('Bob', 'name', 'Robert  Smith')",
+        "Found by new name only",
+        "contacts edit name",
+    ),
+    (
+        "test_birthday_buckets",
+        "Найближчі дні народження",
+        "ContactsBook._birthday_candidates(date(2025, 2, 27), 3)",
+        "Feb 29 shown on Feb 28",
+        "contacts birthdays 3",
+    ),
+    (
+        "test_find_ranked_limit",
+        "Нечіткий пошук з лімітом",
+        "controller(commands: ['find', 'johnn', '--limit', '1'])",
+        "Best match only",
+        "contacts find johnn --limit 1",
+    ),
+    (
+        "test_regex_search_trigrams",
+        "Пошук за регулярним виразом",
+        "PhoneBookService.find_contacts(r'anna\\d+@', mode='regex')",
+        "Only verified candidates",
+        "contacts find anna",
+    ),
+    (
+        "test_tag_registry_shared",
+        "Реєстр тегів контактів і нотаток",
+        "ContactsBook.find_by_tag('work'), Notes.find_notes_by_tag('work')",
+        "Exact and prefix tag owners",
+        "contacts find --tag work",
+    ),
+    (
+        "test_undo_redo_steps",
+        "Undo/redo кількох кроків",
+        "controller(commands: ['undo', '2'], ['redo'])",
+        "has been redone",
+        "contacts undo 2 → redo",
+    ),
     (
         "test_remove_field_success",
         "Видалення поля",
@@ -218,6 +346,105 @@ class TestContactsCLI(unittest.TestCase):
         self.commands("sort", "name")
         self.assertIn("Alice", self.get_output())
 
+    def test_sort_by_birthday(self):
+        for name, phone, birthday in (
+            ("Young", "0671234561", "01.01.2001"),
+            ("Nobody", "0671234562", None),
+            ("Old", "0671234563", "31.12.1999"),
+        ):
+            self.commands("add", "phone", phone, name)
+            if birthday:
+                self.commands("add", "birthday", birthday, name)
+        self.commands("sort", "birthday")
+        output = self.get_output()
+        self.assertLess(output.rindex("Old"), output.rindex("Young"))
+        self.assertLess(output.rindex("Young"), output.rindex("Nobody"))
+
+        def names(records):
+            return [str(record.name) for record in records]
+
+        self.assertEqual(
+            names(self.book.sorted_records("birthday", reverse=True)),
+            ["Young", "Old", "Nobody"],
+        )
+        index = self.book.index.sorted["birthday"]
+        for reverse, expected in ((False, ["Old", "Young"]), (True, ["Young", "Old"])):
+            pager = Pager(by_sort_key(index, self.book.data, reverse), 1)
+            shown = [names(pager.first()), names(pager.next()), names(pager.next())]
+            self.assertEqual(shown, [[name] for name in expected + ["Nobody"]])
+            self.assertIsNone(pager.next())
+
+    def test_sort_by_phone(self):
+        for name, phone in (
+            ("Kyivstar", "+380671234567"),
+            ("Lifecell", "0631234567"),
+            ("Vodafone", "380501234567"),
+        ):
+            self.commands("add", "phone", phone, name)
+        self.commands("sort", "phone")
+        output = self.get_output()
+        self.assertLess(output.rindex("Vodafone"), output.rindex("Lifecell"))
+        self.assertLess(output.rindex("Lifecell"), output.rindex("Kyivstar"))
+
+    def test_sorted_index_follows_edits(self):
+        for name, phone in (("Bob", "0671234561"), ("Ann", "0671234562")):
+            self.commands("add", "phone", phone, name)
+        self.assertEqual(
+            [str(r.name) for r in self.book.sorted_records("name")], ["Ann", "Bob"]
+        )
+        self.commands("add", "phone", "0671234563", "Cid")
+        self.commands("add", "phone", "0501234560", "Ann")
+        self.commands("remove", "phone", "0671234561", "Bob")
+        self.assertEqual(
+            [str(r.name) for r in self.book.sorted_records("phone", limit=2)],
+            ["Ann", "Cid"],
+        )
+        self.commands("sort", "name", "desc", "--limit", "2")
+        output = self.get_output()
+        self.assertLess(output.rindex("Cid"), output.rindex("Bob"))
+        self.assertNotIn("Ann", output[output.rindex("Cid") :])
+
+    def test_keyset_pages(self):
+        for i, name in enumerate(("Dan", "Bob", "Eve", "Ann", "Cid")):
+            self.commands("add", "phone", f"067123456{i}", name)
+        pager = Pager(by_sort_key(self.book.index.sorted["name"], self.book.data), 2)
+
+        def names(records):
+            return [str(record.name) for record in records]
+
+        self.assertEqual(names(pager.first()), ["Ann", "Bob"])
+        # A contact added before the cursor doesn't shift the next page
+        self.commands("add", "phone", "0501234567", "Amy")
+        self.assertEqual(names(pager.next()), ["Cid", "Dan"])
+        self.assertEqual(names(pager.next()), ["Eve"])
+        self.assertIsNone(pager.next())
+        self.assertEqual(names(pager.prev()), ["Cid", "Dan"])
+
+        self.commands("all", "--page-size", "4")
+        self.commands("next")
+        self.assertIn("Page 2 · contacts prev", self.get_output())
+        self.commands("next")
+        self.assertIn("No more pages", self.get_output())
+
+    def test_pages_skip_removed_contacts(self):
+        for name, phone in (
+            ("Ann", "0671234561"),
+            ("Bob", "0671234562"),
+            ("Zed", "0671234563"),
+        ):
+            self.commands("add", "phone", phone, name)
+            self.commands("add", "tags", "work", name)
+        self.commands("find", "--tag", "work", "--page-size", "1")
+        self.commands("remove", "contact", "Bob")
+        sys.stdout = StringIO()
+        self.commands("next")
+        output = self.get_output()
+        self.assertIn("Zed", output)
+        self.assertNotIn("Missing", output)
+        self.assertNotIn("Bob", output)
+        self.commands("next")
+        self.assertIn("No more pages", self.get_output())
+
     def test_phone_existing(self):
         self.commands("add", "phone", "0671234567", "Bob")
         self.commands("phone", "Bob")
@@ -261,6 +488,99 @@ class TestContactsCLI(unittest.TestCase):
         self.commands("all", "name", "phone")
         self.assertIn("Kate", self.get_output())
 
+    def test_plain_table_for_many_rows(self):
+        self.commands("add", "phone", "0671234567", "Bartholomewson")
+        self.commands("add", "phone", "0671234568", "Kate")
+        self.commands("add", "email", "kate@example.com", "Kate")
+        with patch("output.rich_table.PLAIN_ROWS", 1):
+            self.commands("all", "phones")
+        output = self.get_output()
+        table = output[output.index("Name         │ Phones") :]
+        self.assertIn("Bartholomew… │ 0671234567\n", table)
+        self.assertNotIn("kate@example.com", table)
+
+    def test_scripting_formats(self):
+        self.commands("add", "phone", "0671234567", "Kate")
+        self.commands("add", "phone", "+380501234567", "Kate")
+        sys.stdout.seek(0)
+        sys.stdout.truncate()
+        try:
+            set_output_format("tsv")
+            self.commands("all", "phones", "--page-size", "10")
+            self.assertEqual(
+                self.get_output(), "Name\tPhones\nKate\t0671234567,+380501234567\n"
+            )
+            # The errors the service methods catch don't break the rows either
+            errors = StringIO()
+            with redirect_stderr(errors):
+                self.commands("phone")
+            self.assertNotIn("\x1b", self.get_output())
+            self.assertIn("ERROR\tSome arguments was not provided", errors.getvalue())
+            sys.stdout.seek(0)
+            sys.stdout.truncate()
+            set_output_format("jsonl")
+            self.commands("all", "phones")
+            self.commands("next")
+            first, second = self.get_output().splitlines()
+            self.assertEqual(
+                json.loads(first),
+                {"name": "Kate", "phones": ["0671234567", "+380501234567"]},
+            )
+            self.assertEqual(json.loads(second)["level"], "info")
+        finally:
+            set_output_format("rich")
+
+    def test_photo_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "kate.txt"
+            path.write_text("\x1b[31mKate\x1b[0m")
+            self.commands("add", "phone", "0671234567", "Kate")
+            self.commands("add", "phone", "0671234568", "Bob")
+            record = self.book.find("Kate")
+            record.photo = Photo(str(path))
+
+            self.commands("show", "--all")
+            lines = get_photo_lines(record)
+            self.assertIs(get_photo_lines(record), lines)
+            self.assertEqual(str(lines[0]), "Kate")
+            self.assertIn("Contact Bob Details", self.get_output())
+
+            path.write_text("Kate, updated")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(str(get_photo_lines(record)[0]), "Kate, updated")
+
+    def test_photo_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            art = Path(tmp) / "art"
+            (art / "copies").mkdir(parents=True)
+            wide = "\x1b[32m" + "#" * 100 + "\x1b[0m\n"
+            for name, content in (
+                ("kate.txt", wide),
+                ("copies/kate.txt", wide),
+                ("bob.txt", "Bob\n"),
+            ):
+                (art / name).write_text(content)
+            for name, phone, photo in (
+                ("Kate", "0671234567", "kate.txt"),
+                ("Katie", "0671234568", "copies/kate.txt"),
+            ):
+                self.commands("add", "phone", phone, name)
+                self.book.find(name).photo = Photo(str(art / photo))
+
+            with patch("storage.photos.PHOTO_DIR", Path(tmp) / "photos"):
+                self.commands("ingest-photos", str(art))
+                self.assertIn("3 photos stored as 2 unique", self.get_output())
+                kate, katie = self.book.find("Kate"), self.book.find("Katie")
+                self.assertEqual(kate.photo.value, katie.photo.value)
+                self.assertTrue(is_stored(kate.photo.value))
+
+                variant = card_variant(kate.photo.value)
+                self.assertTrue(variant.endswith(".w66.ansi"))
+                with patch.object(Console, "is_terminal", True):
+                    print_photo(kate)
+                self.assertIn("#" * 66 + "\x1b[0m\n", self.get_output())
+                self.assertNotIn("#" * 67, self.get_output())
+
     def test_undo_no_state(self):
         self.commands("undo")
         output = self.get_output()
@@ -269,7 +589,157 @@ class TestContactsCLI(unittest.TestCase):
     def test_add_then_undo(self):
         self.commands("add", "phone", "0671234567", "UndoUser")
         self.commands("undo")
-        self.assertIn("Nothing to undo yet", self.get_output())
+        self.assertIn("has been undone", self.get_output())
+        self.assertIsNone(self.book.find("UndoUser"))
+
+    def test_undo_redo_steps(self):
+        self.commands("add", "phone", "0671234567", "Steps")
+        self.commands("remove", "phone", "0671234567", "Steps")
+        self.commands("remove", "contact", "Steps")
+        self.commands("undo", "2")
+        self.assertEqual(
+            [p.value for p in self.book.find("Steps").phones], ["0671234567"]
+        )
+        self.commands("redo")
+        self.assertIn("has been redone", self.get_output())
+        self.assertFalse(self.book.find("Steps").phones)
+        self.commands("redo", "5")
+        self.assertIsNone(self.book.find("Steps"))
+        self.commands("redo")
+        self.assertIn("Nothing to redo yet", self.get_output())
+
+    def test_phone_ownership_index(self):
+        self.commands("add", "phone", "0671234567", "Owner")
+        self.assertTrue(self.book.is_phone_owned("+38 067 123 45 67"))
+        self.assertEqual(str(self.book.find_by_phone("0671234567").name), "Owner")
+
+        self.commands("remove", "phone", "0671234567", "Owner")
+        self.assertFalse(self.book.is_phone_owned("0671234567"))
+        self.commands("undo")
+        self.assertTrue(self.book.is_phone_owned("0671234567"))
+
+    def test_rename_keeps_index(self):
+        self.commands("add", "phone", "0671234567", "Bob")
+        self.commands("add", "phone", "0671234568", "Alice")
+        service = PhoneBookService(self.book)
+        service.edit_contact_field("Bob", "name", "Robert  Smith")
+
+        record = self.book.find(" robert SMITH")
+        self.assertEqual(self.book.key_of(record), "robert smith")
+        self.assertIsNone(self.book.find("Bob"))
+        self.assertTrue(service.contact_exists("Robert Smith"))
+        self.assertIs(self.book.find_by_phone("0671234567"), record)
+
+        service.edit_contact_field("Robert Smith", "name", "alice")
+        self.assertIn("already exists", self.get_output())
+
+        self.commands("undo")
+        self.assertEqual(list(self.book.data), ["alice", "bob"])
+        self.assertIsNone(self.book.find("Robert Smith"))
+
+    def test_birthday_buckets(self):
+        service = PhoneBookService(self.book)
+        for name, phone, birthday in (
+            ("Leap", "0671234561", "29.02.2000"),
+            ("March", "0671234562", "01.03.1990"),
+            ("Summer", "0671234563", "15.07.1985"),
+        ):
+            self.commands("add", "phone", phone, name)
+            service.set_birthday([name, birthday])
+
+        def upcoming(today, days):
+            return [key for key, _ in self.book._birthday_candidates(today, days)]
+
+        self.assertEqual(upcoming(date(2025, 2, 27), 3), ["leap", "march"])
+        self.assertEqual(upcoming(date(2024, 2, 28), 1), [])
+        self.assertEqual(upcoming(date(2024, 2, 29), 1), ["leap"])
+        self.assertEqual(len(upcoming(date(2025, 1, 1), 1000)), 3)
+        self.assertEqual(
+            next_birthday(date(2000, 2, 29), date(2025, 3, 1)), date(2026, 2, 28)
+        )
+
+        service.set_birthday(["Summer", "02.03.1985"])
+        self.assertEqual(upcoming(date(2025, 3, 1), 2), ["march", "summer"])
+        self.assertEqual(upcoming(date(2025, 7, 15), 1), [])
+
+    def test_find_ranked_limit(self):
+        service = PhoneBookService(self.book)
+        self.commands("add", "phone", "0671234561", "Johnny")
+        self.commands("add", "phone", "0671234562", "Mary")
+        self.commands("add", "phone", "0671234563", "John")
+
+        names = [str(r.name) for r in service.find_contacts("johnn", mode="fuzzy")]
+        self.assertEqual(names, ["Johnny", "John"])
+        names = [str(r.name) for r in service.find_contacts("johnn", threshold=95)]
+        self.assertEqual(names, ["Johnny"])
+
+        sys.stdout = StringIO()
+        self.commands("find", "johnn", "--limit", "1")
+        self.assertIn("0671234561", self.get_output())
+        self.assertNotIn("0671234563", self.get_output())
+
+        # The corpus follows the book
+        service.edit_contact_field("Mary", "name", "Jonh Smith")
+        names = [str(r.name) for r in service.find_contacts("jonh", limit=1)]
+        self.assertEqual(names, ["Jonh Smith"])
+        self.commands("remove", "contact", "Jonh Smith")
+        self.assertFalse(service.find_contacts("smith"))
+
+    def test_regex_search_trigrams(self):
+        self.assertEqual(required_literals(r"anna\d+@ex(am)+ple|x"), [])
+        self.assertEqual(
+            required_literals(r"^Anna\d+@ex(amp)+le\.com$"),
+            ["anna", "@ex", "amp", "le.com"],
+        )
+
+        service = PhoneBookService(self.book)
+        for name, phone in (("Anna", "0671234561"), ("Hanna", "0671234562")):
+            self.commands("add", "phone", phone, name)
+        service.edit_contact_field("Anna", "email", "anna1@example.com")
+
+        def found(query, mode="regex"):
+            return [str(r.name) for r in service.find_contacts(query, mode=mode)]
+
+        self.assertEqual(found(r"anna\d+@"), ["Anna"])
+        self.assertEqual(found("anna"), ["Anna", "Hanna"])
+        self.assertEqual(found("nn"), ["Anna", "Hanna"])
+
+        # Edits reach the index
+        service.edit_contact_field("Hanna", "email", "anna2@example.com")
+        self.assertEqual(sorted(found(r"anna\d+@")), ["Anna", "Hanna"])
+        service.remove_contact_field("Anna", "email", "anna1@example.com")
+        self.assertEqual(found(r"anna\d+@"), ["Hanna"])
+        self.assertEqual(
+            [str(r.name) for r in service.search_contacts("2@ex")], ["Hanna"]
+        )
+
+    def test_tag_registry_shared(self):
+        self.commands("add", "phone", "0671234567", "Bob")
+        self.commands("add", "phone", "0671234568", "Alice")
+        notes = Notes()
+        registry = self.book.tag_registry = notes.tag_registry = TagRegistry()
+        self.book.add_tag_to_contact("bob", Tag("Homework"))
+        self.book.add_tag_to_contact("alice", Tag("work"))
+        note = Note(context="Quarterly report")
+        note.add_tag("Work")
+        notes.add_note(note)
+
+        self.assertEqual(self.book.find_by_tag("WORK"), {"alice"})
+        # A prefix, not a substring: no "homework" false positive
+        self.assertEqual(registry.find_prefix(CONTACTS, "wo"), {"alice"})
+        self.assertEqual(registry.find(NOTES, "work"), {"1"})
+        self.assertEqual(list(notes.find_notes_by_tag("wor")), ["1"])
+        service = PhoneBookService(self.book)
+        self.assertEqual(
+            [str(r.name) for r in service.find_contacts(tag="home")], ["Bob"]
+        )
+
+        # The built registry follows the edits
+        self.book.remove_tag_from_contact("alice", Tag("work"))
+        self.assertFalse(self.book.find_by_tag("work"))
+        notes.delete_note_by_id("1")
+        self.assertNotIn("work", registry.owners)
+        self.assertEqual(registry.find_prefix(CONTACTS, "h"), {"bob"})
 
     def test_remove_field_success(self):
         self.commands("add", "phone", "0671234567", "DeleteMe")
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from batch import run_batch
+from client import DaemonNotRunning, is_running, send
+from context import data_cxt_mngr
+from daemon import BooksDaemon
+from utils.session import set_interactive
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        # The books are kept relative to the working directory
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.socket_file = Path(self.tmp.name) / "daemon.sock"
+        set_interactive(False)
+
+    def tearDown(self):
+        set_interactive(True)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def serve(self, client, save_interval=60.0):
+        """Runs `client(send)` in a thread while the daemon serves."""
+
+        async def scenario():
+            stop = asyncio.Event()
+            daemon = BooksDaemon()
+            server = asyncio.create_task(
+                daemon.serve(self.socket_file, save_interval, stop=stop)
+            )
+            while not self.socket_file.exists():
+                await asyncio.sleep(0.01)
+            try:
+                return await asyncio.to_thread(
+                    client, lambda *args: send(*args, socket_file=self.socket_file)
+                )
+            finally:
+                stop.set()
+                await server
+
+        with redirect_stdout(StringIO()):
+            return asyncio.run(scenario())
+
+    def test_commands_are_served_and_saved(self):
+        def client(send):
+            added = send("contacts add phone 0671234567 ivan", "plain")
+            found = send("contacts find ivan", "tsv")
+            asking = send("contacts remove", "tsv")
+            return added, found, asking
+
+        added, found, asking = self.serve(client)
+
+        self.assertTrue(added["ok"])
+        self.assertTrue(found["ok"])
+        self.assertIn("ivan\t0671234567", found["output"])
+        self.assertFalse(asking["ok"])
+        # tsv messages go to stderr, they are sent back as well
+        self.assertEqual(asking["output"], "")
+        self.assertIn("ERROR\tInput required", asking["errors"])
+        self.assertFalse(self.socket_file.exists())
+        with redirect_stdout(StringIO()), data_cxt_mngr() as (book, _, _):
+            self.assertIsNotNone(book.find("ivan"))
+
+    def test_concurrent_clients_are_serialized(self):
+        names = [f"user{i}" for i in range(8)]
+
+        def client(send):
+            async def clients():
+                return await asyncio.gather(
+                    *(
+                        asyncio.to_thread(
+                            send, f"contacts add phone 06712345{i:02} {name}", "plain"
+                        )
+                        for i, name in enumerate(names)
+                    )
+                )
+
+            return asyncio.run(clients())
+
+        answers = self.serve(client)
+
+        self.assertTrue(all(answer["ok"] for answer in answers))
+        with redirect_stdout(StringIO()), data_cxt_mngr() as (book, _, _):
+            self.assertEqual(sorted(book.data), names)
+
+    def test_journal_is_synced_in_the_background(self):
+        journal = Path("data/journal.log")
+
+        def size() -> int:
+            return journal.stat().st_size if journal.exists() else 0
+
+        def add_and_wait(name: str, phone: str):
+            def client(send):
+                before = size()
+                send(f"contacts add phone {phone} {name}", "plain")
+                deadline = time.monotonic() + 0.5
+                while size() == before and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                return size() - before
+
+            return client
+
+        # Buffered while the daemon runs, synced when it stops
+        self.assertEqual(self.serve(add_and_wait("ivan", "0671234567")), 0)
+        self.assertGreater(size(), 0)
+
+        grown = self.serve(add_and_wait("petro", "0671234568"), save_interval=0.05)
+        self.assertGreater(grown, 0)
+
+    def test_batch_goes_through_the_daemon(self):
+        commands = StringIO("contacts add phone 0671234567 ivan\ncontacts remove\n")
+
+        def client(send):
+            code = run_batch(commands, report=None, socket_file=self.socket_file)
+            return code, send("contacts find ivan", "tsv")
+
+        code, found = self.serve(client)
+
+        # Stopped at the command asking for input, the first one is in the
+        # daemon's books: it was not written behind its back
+        self.assertEqual(code, 1)
+        self.assertIn("ivan\t0671234567", found["output"])
+
+    def test_refused_requests_have_the_same_keys(self):
+        daemon = BooksDaemon()
+        answers = [
+            daemon.execute("contacts all", "xml"),
+            asyncio.run(daemon.answer(b"{}")),
+            asyncio.run(daemon.answer(b"not json")),
+        ]
+        for answer in answers:
+            self.assertEqual(set(answer), {"ok", "output", "errors"})
+            self.assertFalse(answer["ok"])
+        self.assertIn("Unknown output format", answers[0]["errors"])
+        self.assertIn("Bad request", answers[1]["errors"])
+
+    def test_client_without_daemon(self):
+        self.assertFalse(is_running(self.socket_file))
+        with self.assertRaises(DaemonNotRunning):
+            send("contacts all", socket_file=self.socket_file)
+
+
+if __name__ == "__main__":
+    unittest.main()
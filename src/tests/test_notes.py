@@ -0,0 +1,147 @@
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+import contacts  # noqa: F401, notes can't be imported before contacts
+from notes import Note, Notes, SqliteNotes, notes_controller
+from notes.fulltext import cut_snippet, parse_query, token_offsets
+from notes.service import NotesBookService
+from storage.sqlite import connect
+
+
+class TestNotesIndex(unittest.TestCase):
+    def make_notes(self) -> Notes:
+        return Notes()
+
+    def setUp(self):
+        self.notes = self.make_notes()
+        with redirect_stdout(StringIO()):
+            for title, context in (
+                ("Groceries", "Buy fresh milk and bread #home"),
+                ("Work", "Milk the deadline, buy time"),
+                ("Reading", "Bread and wine, a novel"),
+            ):
+                self.notes.add_note(Note(title=title, context=context))
+
+    def test_parse_query(self):
+        self.assertEqual(
+            parse_query('a "B c" OR d | "e'),
+            [[("a",), ("b", "c")], [("d",)], [("e",)]],
+        )
+        self.assertEqual(parse_query("milk or bread"), [[("milk",)], [("bread",)]])
+
+    def test_and_or_phrase(self):
+        find = self.notes.find_notes_by_query
+        self.assertEqual(list(find("milk bread")), ["1"])
+        self.assertEqual(list(find("wine OR deadline")), ["2", "3"])
+        self.assertEqual(list(find('"buy fresh"')), ["1"])
+        self.assertFalse(find('"fresh buy"'))
+        # Terms are prefixes of the indexed words
+        self.assertEqual(list(self.notes.find_notes_by_title("grocer")), ["1"])
+        self.assertEqual(list(self.notes.find_notes_by_tag("hom")), ["1"])
+        self.assertFalse(self.notes.find_notes_by_context("groceries"))
+
+    def test_index_follows_edits(self):
+        self.assertEqual(list(self.notes.find_notes_by_query("milk")), ["1", "2"])
+        note = self.notes.data["2"]
+        note.change_context("Meeting at noon")
+        note.add_tag("office")
+        self.notes.touch(note)
+        self.notes.delete_note_by_id("3")
+        with redirect_stdout(StringIO()):
+            self.notes.add_note(Note(context="Noon coffee"))
+
+        self.assertEqual(list(self.notes.find_notes_by_query("milk")), ["1"])
+        self.assertEqual(list(self.notes.find_notes_by_query("noon")), ["2", "4"])
+        self.assertEqual(list(self.notes.find_notes_by_tag("office")), ["2"])
+        self.assertFalse(self.notes.find_notes_by_query("wine"))
+
+    def test_edited_terms_are_unlinked(self):
+        self.notes.find_notes_by_query("milk")
+        self.notes.delete_note_by_id("3")
+        self.assertNotIn("novel", self.notes.index.fields["context"].postings)
+
+    def test_tags_match_by_prefix_only(self):
+        note = self.notes.data["2"]
+        note.add_tag("work")
+        self.notes.touch(note)
+        self.assertEqual(list(self.notes.find_notes_by_tag("WO")), ["2"])
+        self.assertEqual(list(self.notes.find_notes_by_tag("work")), ["2"])
+        self.assertFalse(self.notes.find_notes_by_tag("ork"))
+        self.assertFalse(self.notes.find_notes_by_tag("works"))
+
+    def test_controller_or_query(self):
+        output = StringIO()
+        with redirect_stdout(output):
+            # Lower-cased like the prompt and the batch lines
+            notes_controller(self.notes)("find", "wine", "or", "deadline")
+        self.assertIn("Work", output.getvalue())
+        self.assertIn("Reading", output.getvalue())
+        self.assertNotIn("Groceries", output.getvalue())
+
+    def test_service_finds_tags_once(self):
+        service = NotesBookService(self.notes)
+        with redirect_stdout(StringIO()):
+            service.add_tags_to_note_by_id("3", ["books"])
+            found = service.find_notes_by_tags(["home,books"])
+        self.assertEqual(sorted(found), ["1", "3"])
+
+    def test_rank_boosts_title(self):
+        with redirect_stdout(StringIO()):
+            self.notes.add_note(Note(title="Milk", context="Dairy #shop"))
+        hits = self.notes.rank_notes("milk")
+        # Title match first, then the shorter context
+        self.assertEqual([hit.id for hit in hits], ["4", "2", "1"])
+        self.assertGreater(hits[0].score, hits[1].score)
+        self.assertEqual(len(self.notes.rank_notes("milk OR bread", limit=2)), 2)
+        self.assertEqual(self.notes.rank_notes("nothing"), [])
+
+    def test_snippet_highlights_matches(self):
+        hit, *_ = self.notes.rank_notes("fresh milk")
+        text, spans = hit.snippet
+        self.assertEqual([text[start:end] for start, end in spans], ["fresh", "milk"])
+
+        context = "word " * 40 + "Milk here" + " word" * 40
+        tokens, starts = token_offsets(context)
+        snippet = cut_snippet(context, starts, [tokens.index("milk")], width=30)
+        self.assertTrue(snippet.text.startswith("…"))
+        self.assertTrue(snippet.text.endswith("…"))
+        (start, end), *_ = snippet.spans
+        self.assertEqual(snippet.text[start:end], "Milk")
+
+    def test_index_not_pickled(self):
+        self.notes.find_notes_by_query("milk")
+        self.assertNotIn("_index", self.notes.__getstate__())
+
+
+class TestSqliteNotesIndex(TestNotesIndex):
+    """The same queries answered from the FTS5 table."""
+
+    def make_notes(self) -> Notes:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.connection = connect(Path(self.tmp.name) / "books.sqlite3")
+        return SqliteNotes(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def test_searches_stay_in_sqlite(self):
+        self.notes.find_notes_by_query("milk OR wine")
+        self.notes.rank_notes("milk")
+        # Nothing loaded the whole notebook into an in-memory index
+        self.assertIsNone(self.notes._index)
+
+    @unittest.skip("no in-memory index behind the searches")
+    def test_edited_terms_are_unlinked(self):
+        pass
+
+    @unittest.skip("stored in SQLite, never pickled")
+    def test_index_not_pickled(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
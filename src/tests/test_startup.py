@@ -0,0 +1,28 @@
+import unittest
+
+from benchmarks.bench_startup import measure
+
+# Seconds, well above what a fast start takes today (about 0.35s for both)
+# so that only a real regression, like an eager heavy import, fails them
+IMPORT_BUDGET = 1.0
+PROMPT_BUDGET = 1.5
+RUNS = 3
+
+
+class TestStartup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = [measure() for _ in range(RUNS)]
+
+    def test_heavy_modules_are_lazy(self):
+        for result in self.results:
+            self.assertEqual(result["heavy"], [])
+
+    def test_time_to_prompt_budget(self):
+        # The best run, the others may have shared the CPU with something else
+        self.assertLess(min(r["import"] for r in self.results), IMPORT_BUDGET)
+        self.assertLess(min(r["prompt"] for r in self.results), PROMPT_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,494 @@
+import pickle
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from common import Tag
+from contacts import ContactsBook, PhoneBookService, Record, SqliteContactsBook
+from contacts.ContactFields import Birthday, Phone, Photo
+from context import sqlite_cxt_mngr
+from exceptions import RecordNotFound
+from notes import Date, Note, Notes, SqliteNotes, Title
+from storage import CONTACTS, NOTES, Journal
+from storage.photos import is_stored
+from storage.snapshot import SnapshotError, dump_books, load_books
+from storage.sqlite import connect, set_meta
+
+
+def make_record(name: str, phone: str) -> Record:
+    record = Record(name)
+    record.add_phone(phone)
+    return record
+
+
+def legacy_pickle(obj, as_class: type) -> bytes:
+    """Pickles obj as if it was an instance of as_class, with a __dict__."""
+    legacy = f"{type(obj).__module__}\n{type(obj).__name__}\n".encode()
+    current = f"{as_class.__module__}\n{as_class.__name__}\n".encode()
+    return pickle.dumps(obj, protocol=2).replace(legacy, current)
+
+
+class LegacyField:
+    def __init__(self, value):
+        self._value = value
+        self._max_length = 50
+
+
+class LegacyDate:
+    def __init__(self, value):
+        self._Date__date = value
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "journal.log"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replay_restores_mutations(self):
+        book = ContactsBook()
+        notes = Notes()
+        book.journal = notes.journal = Journal(self.path, sync=False)
+
+        book.add_record(make_record("Alice", "0671234567"))
+        book.add_record(make_record("Bob", "0671234568"))
+        alice = book.find("alice")
+        alice.add_phone("0501112233")
+        book.touch(alice)
+        book.delete("bob")
+        notes.add_note(Note(context="Buy milk"))
+        book.journal.close()
+
+        restored_book, restored_notes = ContactsBook(), Notes()
+        applied = Journal(self.path).replay(restored_book, restored_notes)
+
+        self.assertEqual(applied, 5)
+        self.assertEqual(list(restored_book.data), ["alice"])
+        self.assertEqual(
+            [p.value for p in restored_book.data["alice"].phones],
+            ["0671234567", "0501112233"],
+        )
+        self.assertEqual(restored_notes.data["1"].context.value, "Buy milk")
+
+        # Counter continues after the replayed notes
+        restored_notes.add_note(Note(context="Second"))
+        self.assertIn("2", restored_notes.data)
+
+    def test_torn_tail_is_cut_off(self):
+        journal = Journal(self.path, sync=False)
+        journal.put(CONTACTS, "alice", make_record("Alice", "0671234567"))
+        journal.put(NOTES, "1", Note(context="Lost"))
+        journal.close()
+        with open(self.path, "r+b") as file:
+            file.truncate(self.path.stat().st_size - 3)
+
+        book, notes = ContactsBook(), Notes()
+        self.assertEqual(Journal(self.path).replay(book, notes), 1)
+        self.assertIn("alice", book.data)
+        self.assertFalse(notes.data)
+
+    def test_compaction_snapshots_and_truncates(self):
+        snapshots = []
+        journal = Journal(
+            self.path, snapshot=lambda: snapshots.append(1), compact_every=2
+        )
+        journal.put(CONTACTS, "alice", make_record("Alice", "0671234567"))
+        self.assertFalse(snapshots)
+        journal.delete(CONTACTS, "alice")
+
+        self.assertEqual(snapshots, [1])
+        self.assertEqual(self.path.stat().st_size, 0)
+        journal.close()
+
+    def test_deferred_frames_are_synced_at_the_end(self):
+        snapshots = []
+        journal = Journal(
+            self.path, snapshot=lambda: snapshots.append(1), compact_every=3
+        )
+        with journal.deferred():
+            journal.put(CONTACTS, "alice", make_record("Alice", "0671234567"))
+            journal.put(CONTACTS, "bob", make_record("Bob", "0671234568"))
+            # Buffered, nothing reached the file yet
+            self.assertEqual(self.path.stat().st_size, 0)
+            journal.delete(CONTACTS, "bob")
+            self.assertFalse(snapshots)
+        # Compacted once, at the end of the block
+        self.assertEqual(snapshots, [1])
+
+        with journal.deferred():
+            journal.put(CONTACTS, "carol", make_record("Carol", "0671234569"))
+        journal.close()
+        book = ContactsBook()
+        self.assertEqual(Journal(self.path).replay(book, Notes()), 1)
+        self.assertIn("carol", book.data)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "books.snapshot"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        book = ContactsBook()
+        record = make_record("Олена", "0671234567")
+        record.add_phone("+380501112233")
+        record.add_email("olena@example.com")
+        record.add_birthday("29.02.2000")
+        record.add_address("Kyiv, Khreshchatyk 1")
+        record.add_tag("friends")
+        record.add_tag(Tag("work"))
+        book.data["олена"] = record
+        book.data["bob"] = make_record("Bob", "0671234568")
+
+        notes = Notes()
+        note = Note(title="Plans", context="Visit #family soon")
+        notes.add_note(note)
+        notes.add_note(Note(context="Deleted"))
+        notes.delete_note_by_id("2")
+
+        dump_books(book, notes, self.path)
+        loaded_book, loaded_notes = load_books(self.path)
+
+        loaded = loaded_book.data["олена"]
+        self.assertEqual(list(loaded_book.data), ["олена", "bob"])
+        self.assertEqual(str(loaded.name), "Олена")
+        self.assertEqual(
+            [p.value for p in loaded.phones], ["0671234567", "+380501112233"]
+        )
+        self.assertEqual([e.value for e in loaded.emails], ["olena@example.com"])
+        self.assertEqual(loaded.birthday.value, "29.02.2000")
+        self.assertEqual(str(loaded.address), "Kyiv, Khreshchatyk 1")
+        self.assertEqual(loaded.tags, ["friends", Tag("work")])
+        self.assertIsInstance(loaded.tags[1], Tag)
+        self.assertIsNone(loaded_book.data["bob"].birthday)
+
+        loaded_note = loaded_notes.data["1"]
+        self.assertEqual(loaded_note.title.value, "Plans")
+        self.assertEqual(loaded_note.context.value, note.context.value)
+        self.assertEqual(loaded_note.tags, [Tag("family")])
+        self.assertIs(loaded_note.tags[0], Tag("family"))
+        self.assertEqual(str(loaded_note.created_at), str(note.created_at))
+        self.assertEqual(loaded_notes.notes_counter, 2)
+
+    def test_tags_are_interned(self):
+        self.assertIs(Tag(" Work "), Tag("work"))
+        with self.assertRaises(AttributeError):
+            Tag("work")._value = "home"
+        record = make_record("Alice", "0671234567")
+        record.add_tag("Work")
+        self.assertIs(record.tags[0], Tag("work"))
+        (loaded,) = pickle.loads(pickle.dumps([record]))
+        self.assertIs(loaded.tags[0], Tag("work"))
+
+        # Tags pickled with their __dict__ before interning are interned on load
+        legacy = Tag.__new__(Tag)
+        legacy.__setstate__({"_value": "work"})
+        self.assertIsNot(legacy, Tag("work"))
+        self.assertEqual(legacy, Tag("work"))
+        restored = object.__new__(Record)
+        restored.__setstate__(dict(record.__getstate__(), tags=[legacy, "plain"]))
+        self.assertIs(restored.tags[0], Tag("work"))
+        self.assertEqual(restored.tags[1], "plain")
+
+    def test_slotted_model_reads_legacy_pickles(self):
+        record = make_record("Alice", "0671234567")
+        note = Note(title="Plans", context="Visit family")
+        for obj in (record, record.name, record.phones[0], note, note.title):
+            self.assertFalse(hasattr(obj, "__dict__"))
+
+        title = pickle.loads(legacy_pickle(LegacyField("Plans"), Title))
+        self.assertEqual(title.value, "Plans")
+        self.assertEqual(title._max_length, 50)
+        phone = pickle.loads(legacy_pickle(LegacyField("0671234567"), Phone))
+        self.assertEqual(phone.value, "0671234567")
+        stamp = pickle.loads(legacy_pickle(LegacyDate(note.created_at.date), Date))
+        self.assertEqual(stamp.date, note.created_at.date)
+
+        # Records saved before the email, address and photo fields
+        restored = object.__new__(Record)
+        restored.__setstate__({"name": record.name, "phones": record.phones})
+        self.assertEqual(restored.emails, [])
+        self.assertIsNone(restored.photo)
+        self.assertEqual(pickle.loads(pickle.dumps(restored)).tags, [])
+
+    def test_birthday_is_stored_parsed(self):
+        birthday = Birthday("1.2.2000")
+        self.assertEqual(birthday.ordinal, date(2000, 2, 1).toordinal())
+        self.assertEqual((birthday.month, birthday.day), (2, 1))
+        self.assertEqual(str(birthday), "01.02.2000")
+
+        legacy = pickle.loads(legacy_pickle(LegacyField("29.02.2000"), Birthday))
+        self.assertEqual((legacy.month, legacy.day), (2, 29))
+        self.assertEqual(pickle.loads(pickle.dumps(legacy)).value, "29.02.2000")
+
+    def test_phone_is_stored_canonical(self):
+        phone = Phone("+380671234567")
+        self.assertEqual(phone.number, 380671234567)
+        self.assertEqual(str(phone), "+380671234567")
+        self.assertEqual(phone, Phone("0671234567"))
+        self.assertEqual(phone, "38 067 123 45 67")
+        self.assertEqual(len({phone, Phone("80671234567")}), 1)
+
+        record = make_record("Olena", "0671234567")
+        record.add_phone("+380671234567")
+        self.assertEqual(record.phones, [phone])
+        self.assertIs(record.find_phone("380671234567"), record.phones[0])
+
+        legacy = pickle.loads(legacy_pickle(LegacyField("0671234567"), Phone))
+        self.assertEqual(legacy.number, 380671234567)
+        self.assertEqual(pickle.loads(pickle.dumps(legacy)).value, "0671234567")
+
+    def test_rejects_foreign_files(self):
+        self.path.write_bytes(b"not a snapshot at all, just some bytes here")
+        with self.assertRaises(SnapshotError):
+            load_books(self.path)
+
+        # Only the shipped version is read
+        dump_books(ContactsBook(), Notes(), self.path)
+        data = bytearray(self.path.read_bytes())
+        data[6:8] = (1).to_bytes(2, "little")
+        self.path.write_bytes(bytes(data))
+        with self.assertRaises(SnapshotError):
+            load_books(self.path)
+
+
+class TestUndoHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "undo_state.pkl"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_history_survives_restart(self):
+        book = ContactsBook()
+        book.journal = Journal(Path(self.tmp.name) / "journal.log", sync=False)
+        service = PhoneBookService(book)
+        with redirect_stdout(StringIO()):
+            service.add_contact_from_dict({"name": "Alice", "phone": "0671234567"})
+            service.set_birthday(["Alice", "01.02.2000"])
+        book.history.save(self.path)
+        book.journal.close()
+
+        restarted = ContactsBook()
+        Journal(book.journal.path).replay(restarted, Notes())
+        restarted.history.load(self.path)
+        restarted.history.undo(restarted)
+        self.assertIsNone(restarted.find("Alice").birthday)
+        restarted.history.undo(restarted)
+        self.assertIsNone(restarted.find("Alice"))
+
+    def test_legacy_undo_file_is_ignored(self):
+        legacy = ContactsBook()
+        legacy.data["alice"] = make_record("Alice", "0671234567")
+        self.path.write_bytes(pickle.dumps(legacy))
+        book = ContactsBook()
+        book.history.load(self.path)
+        self.assertFalse(book.history.done)
+
+    def test_changes_without_a_key_are_refused(self):
+        record = make_record("Alice", "0671234567")
+        history = ContactsBook().history
+        with self.assertRaises(ValueError):
+            history.push("edit", (None, record), ("alice", record))
+        with self.assertRaises(ValueError):
+            history.push("add", None, (None, record))
+        self.assertFalse(history.done)
+
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self.tmp.name) / "books.sqlite3"
+        self.connection = connect(self.db)
+        self.book = SqliteContactsBook(self.connection)
+        self.notes = SqliteNotes(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def reopen(self):
+        self.connection.close()
+        self.connection = connect(self.db)
+        self.book = SqliteContactsBook(self.connection)
+        self.notes = SqliteNotes(self.connection)
+
+    def test_contacts_lookups_survive_reopen(self):
+        self.book.add_record(make_record("John  Doe", "0671234567"))
+        record = self.book.find("john doe")
+        record.add_email("john@doe.com")
+        self.book.touch(record)
+        self.reopen()
+
+        self.assertEqual(len(self.book), 1)
+        self.assertEqual(str(self.book.find(" JOHN doe ").name), "John  Doe")
+        self.assertTrue(self.book.is_phone_owned("0671234567"))
+        self.assertTrue(self.book.is_email_owned("John@Doe.com"))
+        self.assertTrue(self.book.is_phone_owned("+38 067 123 45 67"))
+        self.assertEqual(str(self.book.find_by_email("john@doe.com").name), "John  Doe")
+        self.assertFalse(self.book.is_phone_owned("0670000000"))
+
+        # Keys are canonical names
+        self.book.delete("john doe")
+        self.assertIsNone(self.book.find("john doe"))
+        self.assertFalse(self.book.is_phone_owned("0671234567"))
+
+    def test_touch_uncached_records(self):
+        self.book.add_record(make_record("Sam", "0671234567"))
+        self.reopen()
+
+        # Streamed records are not in the identity cache
+        record = next(iter(self.book.data.values()))
+        record.add_email("sam@example.com")
+        self.book.touch(record)
+        self.reopen()
+        self.assertTrue(self.book.is_email_owned("sam@example.com"))
+
+        with redirect_stdout(StringIO()), self.assertRaises(RecordNotFound):
+            self.book.touch(make_record("Ghost", "0671234568"))
+
+    def test_history_is_saved_when_the_session_fails(self):
+        undo_file = Path(self.tmp.name) / "undo_state.pkl"
+        with redirect_stdout(StringIO()), self.assertRaises(RuntimeError):
+            with sqlite_cxt_mngr(sqlite_file=self.db, undo_file=undo_file) as loaded:
+                PhoneBookService(loaded.book).add_contact_from_dict(
+                    {"name": "Alice", "phone": "0671234567"}
+                )
+                raise RuntimeError("crash")
+
+        history = ContactsBook().history
+        history.load(undo_file)
+        self.assertEqual([change.description for change in history.done], ["add Alice"])
+
+    def test_upcoming_birthdays(self):
+        soon = date.today() + timedelta(days=2)
+        later = date.today() + timedelta(days=40)
+        for name, day in (("Soon", soon), ("Later", later)):
+            record = make_record(name, "0671234567")
+            record.add_birthday(day.replace(year=2000).strftime("%d.%m.%Y"))
+            self.book.add_record(record)
+
+        names = [item["name"] for item in self.book.find_next_n_days_bithdays(7)]
+        self.assertEqual(names, ["soon"])
+
+    def test_ingest_photos(self):
+        art = Path(self.tmp.name) / "art"
+        art.mkdir()
+        (art / "sam.txt").write_text("Sam\n")
+        record = make_record("Sam", "0671234567")
+        record.photo = Photo(str(art / "sam.txt"))
+        self.book.add_record(record)
+        self.reopen()
+
+        service = PhoneBookService(self.book)
+        with (
+            patch("storage.photos.PHOTO_DIR", Path(self.tmp.name) / "photos"),
+            redirect_stdout(StringIO()) as output,
+        ):
+            service.ingest_photos([str(art)])
+            self.assertIn("1 contacts now use the store", output.getvalue())
+            # Written to the database, not only to the record in memory
+            connection = connect(self.db)
+            stored = SqliteContactsBook(connection).find("sam").photo.value
+            connection.close()
+            self.assertTrue(is_stored(stored))
+
+            service.undo()
+            self.reopen()
+        self.assertEqual(self.book.find("sam").photo.value, str(art / "sam.txt"))
+
+    def test_sorted_pages_and_searches_match_the_memory_book(self):
+        memory = ContactsBook()
+        for name, phone, birthday in (
+            ("Dan", "0671234561", "01.01.2001"),
+            ("bob", "0501234562", None),
+            ("Eve", "0631234563", "31.12.1999"),
+            ("Ann", "0671234564", None),
+            ("Cid", "0671234560", "01.01.2001"),
+        ):
+            for book in (memory, self.book):
+                record = make_record(name, phone)
+                if birthday:
+                    record.add_birthday(birthday)
+                book.add_record(record)
+        record = self.book.find("eve")
+        record.add_email("eve@example.com")
+        self.book.touch(record)
+        memory.find("eve").add_email("eve@example.com")
+        memory.touch(memory.find("eve"))
+        self.book.delete("dan")
+        memory.delete("dan")
+        self.reopen()
+
+        for field in ("name", "phone", "email", "birthday"):
+            for reverse in (False, True):
+                expected = memory.sorted_index(field)
+                found = self.book.sorted_index(field)
+                self.assertEqual(found.keys(reverse), expected.keys(reverse))
+                self.assertEqual(found.keys(reverse, 2), expected.keys(reverse, 2))
+                after, pages = None, 0
+                while page := found.page(after, 2, reverse):
+                    self.assertEqual(page, expected.page(after, 2, reverse))
+                    after, pages = page[-1], pages + 1
+                self.assertEqual(pages, 2)
+
+        service = PhoneBookService(self.book)
+        self.assertEqual(service.find_contact_keys("example", mode="regex"), ["eve"])
+        self.assertEqual(service.find_contact_keys("050", mode="regex"), ["bob"])
+        self.assertEqual(self.book.search_candidates(["0671234564"]), ["ann"])
+        self.assertEqual(self.book.search_candidates(["0671234561"]), [])
+        self.assertIsNone(self.book.search_candidates(["an"]))
+        # Nothing built the in-memory indexes over the whole book
+        self.assertIsNone(self.book._index)
+
+    def test_lookups_are_filled_on_open(self):
+        self.book.add_record(make_record("John", "0671234567"))
+        # Like a database written before the sort and text tables existed
+        self.connection.execute("DELETE FROM contact_sort")
+        self.connection.execute("DELETE FROM contact_texts")
+        set_meta(self.connection, "lookup_version", 2)
+        self.reopen()
+        self.assertEqual(self.book.sorted_index("phone").keys(), ["john"])
+        self.assertEqual(self.book.search_candidates(["john"]), ["john"])
+
+    def test_notes_search_and_counter(self):
+        self.notes.add_note(Note(title="Groceries", context="Buy milk"))
+        self.notes.add_note(Note(context="Call mom"))
+        note = self.notes.data["1"]
+        note.add_tag("home")
+        self.notes.touch(note)
+        self.notes.delete_note_by_id("2")
+        self.reopen()
+
+        self.assertEqual(list(self.notes.find_notes_by_tag("hom")), ["1"])
+        self.assertEqual(list(self.notes.find_notes_by_title("grocer")), ["1"])
+        self.assertEqual(list(self.notes.find_notes_by_query("milk")), ["1"])
+        self.assertFalse(self.notes.find_notes_by_context("mom"))
+
+        self.notes.add_note(Note(context="Third"))
+        self.assertIn("3", self.notes.data)
+
+    def test_full_text_table_is_filled_on_open(self):
+        self.notes.add_note(Note(title="Groceries", context="Buy milk"))
+        # Like a database written before the table existed
+        self.connection.execute(
+            "INSERT INTO notes_fts (notes_fts) VALUES ('delete-all')"
+        )
+        set_meta(self.connection, "fts_version", 0)
+        self.assertFalse(self.notes.find_notes_by_query("milk"))
+        self.reopen()
+        self.assertEqual(list(self.notes.find_notes_by_query('"buy milk"')), ["1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
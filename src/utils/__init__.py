@@ -1,13 +1,23 @@
-from .export_import import(
-    export_contacts_to_csv,
-    import_contacts_from_csv,
-    export_notes_to_folder,
-)
 from .search import elastic_search
 
-__add__ = [
-    export_contacts_to_csv,
-    import_contacts_from_csv,
-    export_notes_to_folder,
-    elastic_search,
-]
\ No newline at end of file
+# csv export/import is loaded on first use: `utils.search` is needed at
+# startup, the export code only when a command asks for it
+_EXPORT_IMPORT = (
+    "export_contacts_to_csv",
+    "import_contacts_from_csv",
+    "export_notes_to_folder",
+)
+
+
+def __getattr__(name):
+    if name in _EXPORT_IMPORT:
+        from . import export_import
+
+        return getattr(export_import, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    *_EXPORT_IMPORT,
+    "elastic_search",
+]
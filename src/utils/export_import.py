@@ -1,6 +1,7 @@
 import re
 import csv
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from output import default_contacts_table_fields
 from decorators import error_handler
@@ -9,7 +10,10 @@ from output import output_error, output_info
 
 from contacts.ContactsBook import ContactsBook
 from contacts.Records import Record
-from notes import Notes
+
+if TYPE_CHECKING:
+    # notes imports this module through its service
+    from notes import Notes
 
 
 @error_handler
@@ -143,7 +147,7 @@ def import_contacts_from_csv(book: ContactsBook, args: list = ["./data/contacts.
 
 
 @error_handler
-def export_notes_to_folder(notes_book: Notes, args: list = ["./data/notes"]):
+def export_notes_to_folder(notes_book: "Notes", args: list = ["./data/notes"]):
     folder_name, *_ = args
     if not notes_book:
         output_info(f"Export to '{folder_name}' is impossible. NotesBook is empty yet!")
@@ -0,0 +1,36 @@
+"""
+Interactive or batch session
+============================
+
+Commands ask for what they are missing (a name, a confirmation, which of
+several matches) through `ask`. In a batch nobody is there to answer, so
+`ask` fails the command instead of waiting for input, and so does every
+error `error_handler` reports.
+
+Usage example:
+
+    set_interactive(False)
+    ask("Confirm import [y]: ")  # raises InputRequired
+"""
+
+from prompt_toolkit import prompt
+
+from exceptions import InputRequired
+
+_interactive = True
+
+
+def set_interactive(interactive: bool):
+    global _interactive
+    _interactive = interactive
+
+
+def is_interactive() -> bool:
+    return _interactive
+
+
+def ask(message: str, **kwargs) -> str:
+    """prompt_toolkit's prompt, or InputRequired outside of the interactive mode."""
+    if not _interactive:
+        raise InputRequired(message)
+    return prompt(message, **kwargs)